@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from bot.models import TgUser
+from bot.models import TgUser, OutboxMessage
 from django.urls import reverse
 
 
@@ -20,3 +20,10 @@ class TgUserAdmin(admin.ModelAdmin):
                 url=reverse('admin:core_user_change', kwargs={'object_id': user.id}),
                 username=user.username
             )
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ('id', 'chat_id', 'status', 'attempts', 'created', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ['chat_id', 'dedup_key']
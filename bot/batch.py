@@ -0,0 +1,56 @@
+import threading
+from collections import Counter
+
+from bot.models import TgUser
+
+'''
+Пакетная работа с TgUser в цикле бота.
+Пачка обновлений getUpdates обрабатывается как единое целое: TgUser всех ее чатов читаются одним запросом,
+а недостающие создаются одним bulk_create. Состояние диалогов хранится отдельно, в bot.state.
+Пачки обрабатываются внахлест (bot.runtime), поэтому TgUser чата держится, пока чат есть
+хотя бы в одной незавершенной пачке: add при начале пачки, release при ее завершении.
+'''
+
+
+class TgUserBatch:
+    def __init__(self, chat_ids=()):
+        self.users: dict[int, TgUser] = {}
+        self.created: set[int] = set()
+        self.refs: Counter[int] = Counter()
+        self._lock = threading.Lock()
+        self.add(chat_ids)
+
+    @staticmethod
+    def _load(chat_ids: set[int]) -> tuple[dict[int, TgUser], set[int]]:
+        queryset = TgUser.objects.select_related('user')
+        users = {tg_user.chat_id: tg_user for tg_user in queryset.filter(chat_id__in=chat_ids)}
+        missing = chat_ids - users.keys()
+        if missing:
+            # чат мог появиться параллельно, поэтому после вставки без конфликтов перечитываем
+            TgUser.objects.bulk_create([TgUser(chat_id=chat_id) for chat_id in missing], ignore_conflicts=True)
+            users.update((tg_user.chat_id, tg_user) for tg_user in queryset.filter(chat_id__in=missing))
+        return users, missing
+
+    def add(self, chat_ids) -> None:
+        """Читает TgUser чатов новой пачки, уже загруженные перечитываются"""
+        chat_ids = set(chat_ids)
+        if not chat_ids:
+            return
+        users, created = self._load(chat_ids)
+        with self._lock:
+            self.users.update(users)
+            self.created = (self.created - chat_ids) | created
+            self.refs.update(chat_ids)
+
+    def release(self, chat_ids) -> None:
+        """Забывает TgUser чатов завершенной пачки, если их нет в других незавершенных"""
+        with self._lock:
+            for chat_id in set(chat_ids):
+                self.refs[chat_id] -= 1
+                if self.refs[chat_id] <= 0:
+                    del self.refs[chat_id]
+                    self.users.pop(chat_id, None)
+                    self.created.discard(chat_id)
+
+    def get(self, chat_id: int) -> tuple[TgUser, bool]:
+        return self.users[chat_id], chat_id in self.created
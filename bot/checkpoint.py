@@ -0,0 +1,68 @@
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from bot.models import BotCheckpoint, ProcessedUpdate
+from bot.tg.schemas import UpdateObj
+
+'''
+Сохранение прогресса runbot между перезапусками.
+После каждой пачки id ее обновлений пишутся одним запросом в ProcessedUpdate,
+а раз в BOT_CHECKPOINT_INTERVAL секунд максимальный id переносится в BotCheckpoint,
+и записи ProcessedUpdate до него удаляются.
+При старте offset берется из BotCheckpoint, а обновления, которые Telegram отдаст повторно
+(обработанные после последней контрольной точки), отбрасываются по ProcessedUpdate.
+'''
+
+
+class UpdateCheckpoint:
+    def __init__(self, name: str = 'runbot', interval: float | None = None):
+        self.name = name
+        self.interval = interval if interval is not None else settings.BOT_CHECKPOINT_INTERVAL
+        self.update_id: int | None = None
+        self.processed: set[int] = set()
+        self._saved_at = time.monotonic()
+
+    def load(self) -> int:
+        """Читает контрольную точку, возвращает offset для getUpdates"""
+        self.update_id = BotCheckpoint.objects.filter(name=self.name).values_list('update_id', flat=True).first()
+        processed = ProcessedUpdate.objects.all()
+        if self.update_id is not None:
+            processed = processed.filter(update_id__gt=self.update_id)
+        self.processed = set(processed.values_list('update_id', flat=True))
+        return self.update_id + 1 if self.update_id is not None else 0
+
+    def new(self, updates: list[UpdateObj]) -> list[UpdateObj]:
+        """Обновления пачки, которые еще не обрабатывались, без повторов внутри пачки"""
+        seen: set[int] = set()
+        new = []
+        for update in updates:
+            if self.update_id is not None and update.update_id <= self.update_id:
+                continue
+            if update.update_id not in self.processed and update.update_id not in seen:
+                seen.add(update.update_id)
+                new.append(update)
+        return new
+
+    def commit(self, updates: list[UpdateObj]) -> None:
+        """Отмечает пачку обработанной, раз в интервал сохраняет контрольную точку"""
+        update_ids = [update.update_id for update in updates]
+        if update_ids:
+            ProcessedUpdate.objects.bulk_create(
+                [ProcessedUpdate(update_id=update_id) for update_id in update_ids], ignore_conflicts=True,
+            )
+            self.processed.update(update_ids)
+        if time.monotonic() - self._saved_at >= self.interval:
+            self.save()
+
+    def save(self) -> None:
+        self._saved_at = time.monotonic()
+        if not self.processed:
+            return
+        update_id = max(self.processed)
+        with transaction.atomic():
+            BotCheckpoint.objects.update_or_create(name=self.name, defaults={'update_id': update_id})
+            ProcessedUpdate.objects.filter(update_id__lte=update_id).delete()
+        self.update_id = update_id
+        self.processed.clear()
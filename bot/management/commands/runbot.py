@@ -1,9 +1,25 @@
+import asyncio
 import logging
-from django.core.management import BaseCommand
+import signal
+import time
+from dataclasses import replace
+from typing import Awaitable, Callable
 
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+from bot.batch import TgUserBatch
+from bot.checkpoint import UpdateCheckpoint
 from bot.models import TgUser
+from bot.outbox import OutboxDispatcher
+from bot.pages import render_goals_page
+from bot.state import DialogState, get_state_store
+from bot.runtime import BotRuntime
+from bot.sharding import ShardedBotRuntime
 from bot.tg.client import TgClient
-from bot.tg.schemas import Message
+from bot.tg.scheduler import SendScheduler
+from bot.tg.schemas import Message, UpdateObj
+from bot.webhook import WebhookInbox
 from goals.models import Goal, Category
 
 logger = logging.getLogger(__name__)
@@ -15,20 +31,118 @@ class Command(BaseCommand):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.tg_client = TgClient()
+        # все исходящие сообщения идут через планировщик с лимитами Bot API
+        self.sender = SendScheduler(self.tg_client)
+        self.outbox = OutboxDispatcher(self.sender)
+        self.state_store = get_state_store()
+        self.checkpoint = UpdateCheckpoint()
+        self.tg_users = TgUserBatch()
         self.logger = logging.getLogger(__name__)
 
+    def add_arguments(self, parser):
+        parser.add_argument('--sync', action='store_true', help='Обрабатывать обновления по одному в одном потоке')
+        parser.add_argument('--concurrency', type=int, default=settings.BOT_CONCURRENCY,
+                            help='Сколько чатов обрабатывается одновременно')
+        parser.add_argument('--workers', type=int, default=settings.BOT_WORKERS,
+                            help='Число процессов-обработчиков, чаты распределяются между ними по chat_id; '
+                                 'SIGTTIN/SIGTTOU добавляют и убирают процесс')
+
     def handle(self, *args, **options):
-        offset = 0
         logger.info('Bot start handling')
+        if settings.BOT_MODE == 'webhook':
+            # обновления принимает веб-приложение и сохраняет в БД, runbot - их единственный обработчик
+            if options['sync']:
+                raise CommandError('--sync is not supported with BOT_MODE=webhook')
+            self.tg_client.set_webhook(settings.BOT_WEBHOOK_URL, settings.BOT_WEBHOOK_SECRET,
+                                       max_connections=settings.BOT_CONCURRENCY)
+            self.checkpoint = UpdateCheckpoint(name='webhook')
+            inbox = WebhookInbox(self.checkpoint)
+            runtime = self.build_runtime(options['concurrency'], checkpoint=self.checkpoint,
+                                         workers=options['workers'], fetch_updates=inbox.fetch)
+        else:
+            self.tg_client.delete_webhook()
+            if options['sync']:
+                self.handle_sync()
+                return
+            runtime = self.build_runtime(options['concurrency'], checkpoint=self.checkpoint,
+                                         workers=options['workers'])
+        try:
+            asyncio.run(self.run_async(runtime))
+        except KeyboardInterrupt:
+            logger.info('Bot stopped')
+
+    def build_runtime(self, concurrency: int, checkpoint: UpdateCheckpoint | None = None,
+                      workers: int = 1,
+                      fetch_updates: Callable[[int], Awaitable[list[UpdateObj]]] | None = None) -> BotRuntime:
+        if workers > 1:
+            return ShardedBotRuntime(self.tg_client, workers, concurrency=concurrency,
+                                     max_pending=settings.BOT_MAX_PENDING, checkpoint=checkpoint,
+                                     sender=self.sender, fetch_updates=fetch_updates)
+        return BotRuntime(self.tg_client, lambda update: self.handle_message(update.message),
+                          concurrency=concurrency, max_pending=settings.BOT_MAX_PENDING,
+                          begin_batch=self.begin_batch, end_batch=self.end_batch, checkpoint=checkpoint,
+                          fetch_updates=fetch_updates)
 
+    async def run_async(self, runtime: BotRuntime):
+        # очередь исходящих сообщений из веб-запросов разбирается рядом с long polling
+        outbox_task = asyncio.create_task(self.outbox.run())
+        metrics_task = asyncio.create_task(self.log_metrics_periodically())
+        if isinstance(runtime, ShardedBotRuntime):
+            loop = asyncio.get_running_loop()
+            loop.add_signal_handler(signal.SIGTTIN, lambda: runtime.resize(runtime.size + 1))
+            loop.add_signal_handler(signal.SIGTTOU, lambda: runtime.resize(runtime.size - 1))
+        try:
+            await runtime.run()
+        finally:
+            metrics_task.cancel()
+            self.outbox.stop()
+            await outbox_task
+            await asyncio.to_thread(self.sender.close)
+
+    def log_metrics(self):
+        """Пишет в лог накопленные с запуска счетчики запросов к Bot API и состояние очереди отправки"""
+        logger.info('Send scheduler: %s', ' '.join(f'{name}={value}' for name, value in self.sender.metrics().items()))
+        for command, data in sorted(self.tg_client.metrics.snapshot().items()):
+            logger.info('Bot API %s: requests=%d errors=%d retries=%d avg=%.3fs max=%.3fs', command,
+                        data['requests'], data['errors'], data['retries'],
+                        data['total_seconds'] / max(data['requests'], 1), data['max_seconds'])
+
+    async def log_metrics_periodically(self):
+        if not settings.BOT_METRICS_INTERVAL:
+            return
         while True:
-            res = self.tg_client.get_updates(offset=offset)
-            for item in res.result:
-                offset = item.update_id + 1
-                self.handle_message(item.message)
+            await asyncio.sleep(settings.BOT_METRICS_INTERVAL)
+            self.log_metrics()
+
+    def handle_sync(self):
+        offset = self.checkpoint.load()
+        logged_at = time.monotonic()
+        while True:
+            if settings.BOT_METRICS_INTERVAL and time.monotonic() - logged_at >= settings.BOT_METRICS_INTERVAL:
+                logged_at = time.monotonic()
+                self.log_metrics()
+            self.outbox.drain()
+            res = self.tg_client.get_updates(offset=offset, timeout=int(settings.OUTBOX_POLL_INTERVAL))
+            if not res.result:
+                continue
+            offset = res.result[-1].update_id + 1
+            updates = self.checkpoint.new(res.result)
+            if updates:
+                self.begin_batch(updates)
+                for item in updates:
+                    self.handle_message(item.message)
+                self.end_batch(updates)
+            self.checkpoint.commit(updates)
+
+    def begin_batch(self, updates: list[UpdateObj]):
+        self.tg_users.add(update.message.chat.id for update in updates)
+
+    def end_batch(self, updates: list[UpdateObj]):
+        self.tg_users.release(update.message.chat.id for update in updates)
+        self.state_store.write_back()
 
     def handle_message(self, msg: Message):
-        tg_user, created = TgUser.objects.get_or_create(chat_id=msg.chat.id)
+        tg_user, created = self.tg_users.get(msg.chat.id)
         logger.info(f'Created: {created}')
 
         if tg_user.user:
@@ -37,51 +151,59 @@ class Command(BaseCommand):
             self.handle_unauthorized(tg_user, msg)
 
     def handle_unauthorized(self, tg_user: TgUser, msg: Message):
-        self.tg_client.send_message(msg.chat.id, 'Hello!')
+        self.sender.send_message(msg.chat.id, 'Hello!')
         code = tg_user.set_verification_code()
-        self.tg_client.send_message(tg_user.chat_id, f'Your verification code is {code}')
+        self.sender.send_message(tg_user.chat_id, f'Your verification code is {code}')
 
     def handle_authorized(self, tg_user: TgUser, msg: Message):
         logger.info('Authorized')
-        if tg_user.state == 0:
+        dialog = self.state_store.load(tg_user)
+        if dialog.state == 0:
             if msg.text == '/goals':
-                goals = Goal.objects.filter(category__board__participants__user=tg_user.user,
-                                            category__is_deleted=False, ).exclude(status=Goal.Status.archived)
-                self.tg_client.send_message(tg_user.chat_id, f'Ваши цели: {[goal.title for goal in goals]}')
+                self.send_goals_page(tg_user, DialogState(goal_pages=[0]))
+            elif msg.text == '/next':
+                if dialog.goal_next is None:
+                    self.sender.send_message(tg_user.chat_id, 'Больше целей нет')
+                else:
+                    self.send_goals_page(tg_user, replace(dialog, goal_pages=[*dialog.goal_pages, dialog.goal_next]))
+            elif msg.text == '/prev':
+                if len(dialog.goal_pages) < 2:
+                    self.sender.send_message(tg_user.chat_id, 'Это первая страница')
+                else:
+                    self.send_goals_page(tg_user, replace(dialog, goal_pages=dialog.goal_pages[:-1]))
             elif msg.text == '/create':
-                categories = Category.objects.filter(board__participants__user=tg_user.user, is_deleted=False)
-                self.tg_client.send_message(tg_user.chat_id,
-                                            f'Выберите категорию: {[category.title for category in categories]}\n'
+                categories = dict(Category.objects.filter(board__participants__user=tg_user.user, is_deleted=False)
+                                  .values_list('title', 'id'))
+                self.sender.send_message(tg_user.chat_id,
+                                            f'Выберите категорию: {list(categories)}\n'
                                             )
-                tg_user.state = 1
-                tg_user.save()
+                self.state_store.set(tg_user.chat_id, DialogState(state=1, categories=categories))
             else:
-                self.tg_client.send_message(tg_user.chat_id, f'Unknown command')
-        elif tg_user.state == 1:
-            self.choice_category(tg_user, msg)
-        elif tg_user.state == 2:
-            self.create_goal(tg_user, msg)
-
-    def choice_category(self, tg_user: TgUser, msg):
-        if Category.objects.filter(title=msg.text, board__participants__user=tg_user.user,
-                                   is_deleted=False).exists():
-            category = Category.objects.get(title=msg.text, board__participants__user=tg_user.user,
-                                            is_deleted=False)
-            tg_user.category = category
-            tg_user.state = 2
-            tg_user.save()
-
-            self.tg_client.send_message(tg_user.chat_id, f'Ведите название цели: ')
+                self.sender.send_message(tg_user.chat_id, f'Unknown command')
+        elif dialog.state == 1:
+            self.choice_category(tg_user, dialog, msg)
+        elif dialog.state == 2:
+            self.create_goal(tg_user, dialog, msg)
+
+    def send_goals_page(self, tg_user: TgUser, dialog: DialogState):
+        text, dialog.goal_next = render_goals_page(tg_user.user_id, after=dialog.goal_pages[-1],
+                                                   number=len(dialog.goal_pages))
+        self.sender.send_message(tg_user.chat_id, text)
+        self.state_store.set(tg_user.chat_id, dialog)
+
+    def choice_category(self, tg_user: TgUser, dialog: DialogState, msg):
+        # категории пользователя уже получены на шаге /create
+        if msg.text in dialog.categories:
+            self.state_store.set(tg_user.chat_id, DialogState(state=2, category_id=dialog.categories[msg.text]))
+
+            self.sender.send_message(tg_user.chat_id, f'Ведите название цели: ')
         else:
-            self.tg_client.send_message(tg_user.chat_id, 'категория не найдена')
-            tg_user.state = 0
-            tg_user.save()
+            self.sender.send_message(tg_user.chat_id, 'категория не найдена')
+            self.state_store.set(tg_user.chat_id, DialogState())
 
-    def create_goal(self, tg_user: TgUser, msg):
+    def create_goal(self, tg_user: TgUser, dialog: DialogState, msg):
 
-        goal = Goal.objects.create(category=tg_user.category, title=msg.text,
+        goal = Goal.objects.create(category_id=dialog.category_id, title=msg.text,
                                    user=tg_user.user)
-        self.tg_client.send_message(tg_user.chat_id, f'ваша цель {goal.id} {goal.title} создана')
-        tg_user.state = 0
-        tg_user.category = None
-        tg_user.save()
+        self.sender.send_message(tg_user.chat_id, f'ваша цель {goal.id} {goal.title} создана')
+        self.state_store.set(tg_user.chat_id, DialogState())
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.2 on 2026-10-17 19:14
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0004_alter_tguser_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chat_id', models.BigIntegerField(verbose_name='Chat ID')),
+                ('text', models.TextField(verbose_name='Текст')),
+                ('dedup_key', models.CharField(blank=True, default=None, max_length=255, null=True, unique=True, verbose_name='Ключ дедупликации')),
+                ('status', models.PositiveSmallIntegerField(choices=[(1, 'Ожидает отправки'), (2, 'Отправлено'), (3, 'Не отправлено')], default=1, verbose_name='Статус')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попыток отправки')),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Отправить не раньше')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Последняя ошибка')),
+                ('created', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата создания')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата отправки')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('status', 1)), fields=['available_at', 'id'], name='outbox_pending'), models.Index(condition=models.Q(('status', 1)), fields=['chat_id', 'id'], name='outbox_pending_chat')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.2 on 2026-10-17 19:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0006_botcheckpoint_processedupdate'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='outboxmessage',
+            name='outbox_pending',
+        ),
+        migrations.RemoveIndex(
+            model_name='outboxmessage',
+            name='outbox_pending_chat',
+        ),
+        migrations.AlterField(
+            model_name='outboxmessage',
+            name='status',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'Ожидает отправки'), (2, 'Отправлено'), (3, 'Не отправлено'), (4, 'Отправляется')], default=1, verbose_name='Статус'),
+        ),
+        migrations.AddIndex(
+            model_name='outboxmessage',
+            index=models.Index(condition=models.Q(('status__in', [1, 4])), fields=['available_at', 'id'], name='outbox_pending'),
+        ),
+        migrations.AddIndex(
+            model_name='outboxmessage',
+            index=models.Index(condition=models.Q(('status__in', [1, 4])), fields=['chat_id', 'id'], name='outbox_pending_chat'),
+        ),
+    ]
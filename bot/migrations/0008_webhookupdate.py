@@ -0,0 +1,21 @@
+# Generated by Django 4.2.2 on 2026-10-17 20:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0007_outbox_lease'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookUpdate',
+            fields=[
+                ('update_id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='Update ID')),
+                ('payload', models.JSONField(verbose_name='Обновление')),
+                ('received', models.DateTimeField(auto_now_add=True, verbose_name='Дата получения')),
+            ],
+        ),
+    ]
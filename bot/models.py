@@ -1,6 +1,7 @@
 import os
 
 from django.db import models
+from django.utils import timezone
 
 from core.models import User
 from goals.models import Category
@@ -22,3 +23,59 @@ class TgUser(models.Model):
         self.verification_code = code
         self.save(update_fields=('verification_code',))
         return code
+
+
+class OutboxMessage(models.Model):
+    """
+    Исходящее сообщение в Telegram. Пишется в одной транзакции с изменением,
+    о котором оно сообщает, и отправляется ботом в фоне (bot.outbox).
+    """
+
+    class Status(models.IntegerChoices):
+        pending = 1, 'Ожидает отправки'
+        sent = 2, 'Отправлено'
+        failed = 3, 'Не отправлено'
+        # захвачено диспетчером до available_at (аренда), после этого снова доступно
+        sending = 4, 'Отправляется'
+
+    chat_id = models.BigIntegerField(verbose_name='Chat ID')
+    text = models.TextField(verbose_name='Текст')
+    dedup_key = models.CharField(verbose_name='Ключ дедупликации', max_length=255, unique=True, null=True,
+                                 blank=True, default=None)
+    status = models.PositiveSmallIntegerField(verbose_name='Статус', choices=Status.choices, default=Status.pending)
+    attempts = models.PositiveSmallIntegerField(verbose_name='Попыток отправки', default=0)
+    available_at = models.DateTimeField(verbose_name='Отправить не раньше', default=timezone.now)
+    last_error = models.TextField(verbose_name='Последняя ошибка', blank=True, default='')
+    created = models.DateTimeField(verbose_name='Дата создания', default=timezone.now)
+    sent_at = models.DateTimeField(verbose_name='Дата отправки', null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # очередь на отправку: только неотправленные, в порядке создания
+            models.Index(fields=['available_at', 'id'], name='outbox_pending',
+                         condition=models.Q(status__in=[1, 4])),
+            models.Index(fields=['chat_id', 'id'], name='outbox_pending_chat',
+                         condition=models.Q(status__in=[1, 4])),
+        ]
+
+
+class BotCheckpoint(models.Model):
+    """Последнее обработанное обновление getUpdates, с него runbot продолжает после перезапуска"""
+    name = models.CharField(verbose_name='Имя', max_length=50, unique=True)
+    update_id = models.BigIntegerField(verbose_name='Update ID')
+    updated = models.DateTimeField(verbose_name='Дата обновления', auto_now=True)
+
+
+class ProcessedUpdate(models.Model):
+    """Обработанные обновления после последнего BotCheckpoint, чтобы не обработать их повторно"""
+    update_id = models.BigIntegerField(verbose_name='Update ID', primary_key=True)
+
+
+class WebhookUpdate(models.Model):
+    """
+    Обновление, принятое webhook, до обработки в runbot (bot.webhook).
+    update_id - первичный ключ, поэтому повторная доставка Telegram не создает второй записи.
+    """
+    update_id = models.BigIntegerField(verbose_name='Update ID', primary_key=True)
+    payload = models.JSONField(verbose_name='Обновление')
+    received = models.DateTimeField(verbose_name='Дата получения', auto_now_add=True)
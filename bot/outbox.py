@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import random
+from concurrent.futures import wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction, close_old_connections
+from django.db.models import Exists, Min, OuterRef
+from django.utils import timezone
+
+from bot.models import OutboxMessage
+from bot.tg.client import TgClient, TgClientError
+from bot.tg.scheduler import SendAborted, SendScheduler
+
+logger = logging.getLogger(__name__)
+
+'''
+Transactional outbox для сообщений в Telegram.
+Веб-запрос только записывает OutboxMessage в своей транзакции, а бот разбирает таблицу пачками:
+- пачка захватывается короткой транзакцией: SELECT ... FOR UPDATE SKIP LOCKED и перевод строк в sending
+  с арендой до now + OUTBOX_LEASE, поэтому диспетчеров может быть несколько, а строки упавшего
+  диспетчера снова берутся в работу после окончания аренды;
+- отправка идет вне транзакции: вся пачка разом ставится в SendScheduler, чаты отправляются параллельно,
+  а сообщения одного чата склеиваются; результаты пишутся второй короткой транзакцией;
+- в чат сообщения уходят строго в порядке id: если у чата есть более раннее неотправленное
+  сообщение вне пачки (отложено после ошибки или занято другим диспетчером), его поздние сообщения ждут,
+  а если сообщение пачки не ушло, следующие за ним сообщения чата не отправляются (SendAborted);
+- ошибки сети, 429 и 5xx повторяются с экспоненциальной задержкой до OUTBOX_MAX_ATTEMPTS раз,
+  остальные ошибки Bot API сразу переводят сообщение в failed;
+- dedup_key уникален, повторная постановка того же сообщения ничего не делает.
+'''
+
+ACTIVE_STATUSES = (OutboxMessage.Status.pending, OutboxMessage.Status.sending)
+
+
+def enqueue_message(chat_id: int, text: str, dedup_key: str | None = None) -> None:
+    """Ставит сообщение в очередь на отправку, вызывать внутри транзакции бизнес-изменения"""
+    OutboxMessage.objects.bulk_create(
+        [OutboxMessage(chat_id=chat_id, text=text, dedup_key=dedup_key)], ignore_conflicts=True,
+    )
+
+
+def is_retriable(error: Exception) -> bool:
+    if not isinstance(error, TgClientError):
+        return True
+    return error.status_code is None or error.status_code == 429 or error.status_code >= 500
+
+
+class OutboxDispatcher:
+    def __init__(self, sender: SendScheduler | None = None, batch_size: int | None = None):
+        self.sender = sender if sender else SendScheduler(TgClient())
+        self.batch_size = batch_size if batch_size else settings.OUTBOX_BATCH_SIZE
+        self._stopping = False
+
+    def claim_batch(self) -> list[OutboxMessage]:
+        """Захватывает пачку готовых к отправке сообщений: sending с арендой на OUTBOX_LEASE секунд"""
+        with transaction.atomic():
+            now = timezone.now()
+            # чаты, у которых более раннее сообщение отложено после ошибки или отправляется, не берем в пачку
+            delayed_earlier = OutboxMessage.objects.filter(
+                status__in=ACTIVE_STATUSES, chat_id=OuterRef('chat_id'), id__lt=OuterRef('id'),
+                available_at__gt=now,
+            )
+            # sending с истекшей арендой - строки упавшего диспетчера
+            batch = list(
+                OutboxMessage.objects.filter(status__in=ACTIVE_STATUSES, available_at__lte=now)
+                .exclude(Exists(delayed_earlier))
+                .order_by('id').select_for_update(skip_locked=True)[:self.batch_size]
+            )
+            if not batch:
+                return []
+
+            # самое раннее неотправленное сообщение каждого чата вне пачки (например, занятое другим диспетчером)
+            blocked = dict(
+                OutboxMessage.objects.filter(status__in=ACTIVE_STATUSES,
+                                             chat_id__in={message.chat_id for message in batch})
+                .exclude(id__in=[message.id for message in batch])
+                .values('chat_id').annotate(first_id=Min('id')).values_list('chat_id', 'first_id')
+            )
+            claimed = [message for message in batch if message.id <= blocked.get(message.chat_id, message.id)]
+
+            lease = now + timedelta(seconds=settings.OUTBOX_LEASE)
+            for message in claimed:
+                message.status = OutboxMessage.Status.sending
+                message.available_at = lease
+                message.attempts += 1
+            OutboxMessage.objects.bulk_update(claimed, fields=['status', 'available_at', 'attempts'])
+        return claimed
+
+    def dispatch_batch(self) -> int:
+        """Отправляет одну пачку сообщений, возвращает количество обработанных"""
+        batch = self.claim_batch()
+        if not batch:
+            return 0
+
+        futures = self.sender.send_messages([(message.chat_id, message.text) for message in batch], ordered=True)
+        wait(futures)
+        now = timezone.now()
+        for message, future in zip(batch, futures):
+            self._apply_result(message, future.exception(), now)
+
+        OutboxMessage.objects.bulk_update(
+            batch, fields=['status', 'attempts', 'available_at', 'last_error', 'sent_at'],
+        )
+        return len(batch)
+
+    def _apply_result(self, message: OutboxMessage, error: BaseException | None, now) -> None:
+        if error is None:
+            message.status = OutboxMessage.Status.sent
+            message.sent_at = timezone.now()
+            message.last_error = ''
+            return
+
+        message.status = OutboxMessage.Status.pending
+        if isinstance(error, SendAborted):
+            # не отправлялось: ждет повтора более раннего сообщения чата, попытка не считается
+            message.attempts -= 1
+            message.available_at = now
+            return
+
+        logger.warning('Outbox message %s failed: %s', message.id, error)
+        message.last_error = str(error)
+        if is_retriable(error) and message.attempts < settings.OUTBOX_MAX_ATTEMPTS:
+            delay = min(settings.OUTBOX_BACKOFF_MAX, settings.OUTBOX_BACKOFF_BASE * 2 ** message.attempts)
+            message.available_at = now + timedelta(seconds=random.uniform(delay / 2, delay))
+        else:
+            message.status = OutboxMessage.Status.failed
+
+    def drain(self) -> int:
+        """Отправляет пачки, пока в очереди есть готовые к отправке сообщения"""
+        total = 0
+        while count := self.dispatch_batch():
+            total += count
+        return total
+
+    def _drain_in_thread(self) -> int:
+        close_old_connections()
+        try:
+            return self.drain()
+        finally:
+            close_old_connections()
+
+    async def run(self) -> None:
+        """Фоновая задача бота: разбирает очередь и засыпает, когда она пуста"""
+        while not self._stopping:
+            try:
+                await asyncio.to_thread(self._drain_in_thread)
+            except Exception:
+                logger.exception('Outbox dispatch failed')
+            await asyncio.sleep(settings.OUTBOX_POLL_INTERVAL)
+
+    def stop(self) -> None:
+        self._stopping = True
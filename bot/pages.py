@@ -0,0 +1,46 @@
+from django.conf import settings
+
+from goals.membership import get_board_roles
+from goals.models import Goal
+
+'''
+Вывод списка целей в боте постранично.
+Из БД читаются только id и название, курсором частями по BOT_GOALS_CHUNK_SIZE строк,
+и строки набираются в страницу, пока она влезает в одно сообщение Telegram.
+Страница начинается после id последней цели предыдущей (keyset), поэтому память и время
+на страницу не зависят от общего числа целей.
+'''
+
+
+def goals_queryset(user_id: int, after: int = 0):
+    return Goal.objects.filter(
+        board_id__in=get_board_roles(user_id), category__is_deleted=False, id__gt=after,
+    ).exclude(status=Goal.Status.archived).order_by('id').values_list('id', 'title')
+
+
+def render_goals_page(user_id: int, after: int = 0, number: int = 1) -> tuple[str, int | None]:
+    """Текст страницы целей после цели after и id, после которого начинается следующая страница"""
+    header = f'Ваши цели, страница {number}:'
+    footer = '\n/next - следующая страница' + ('\n/prev - предыдущая страница' if number > 1 else '')
+    limit = settings.TG_MESSAGE_MAX_LENGTH - len(footer)
+
+    lines, length, last_id, next_after = [header], len(header), after, None
+    rows = goals_queryset(user_id, after).iterator(chunk_size=settings.BOT_GOALS_CHUNK_SIZE)
+    try:
+        for goal_id, title in rows:
+            line = f'{goal_id}. {title}'
+            if length + 1 + len(line) > limit:
+                next_after = last_id
+                break
+            lines.append(line)
+            length += 1 + len(line)
+            last_id = goal_id
+    finally:
+        # закрываем курсор, не дочитывая оставшиеся строки
+        rows.close()
+
+    if len(lines) == 1:
+        return ('Целей нет' if number == 1 else 'Больше целей нет'), None
+    if next_after is None:
+        footer = '\n/prev - предыдущая страница' if number > 1 else ''
+    return '\n'.join(lines) + footer, next_after
@@ -0,0 +1,215 @@
+import asyncio
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable
+
+from django.db import close_old_connections
+
+from bot.checkpoint import UpdateCheckpoint
+from bot.tg.client import TgClient, AsyncTgClient
+from bot.tg.schemas import UpdateObj
+
+logger = logging.getLogger(__name__)
+
+
+class ChatDispatcher:
+    """
+    Обрабатывает обновления параллельно для разных чатов и строго по порядку внутри одного чата.
+    У каждого чата своя очередь, которую разбирает одна задача; сами обработчики синхронные
+    (ORM, отправка сообщений) и выполняются в пуле из concurrency потоков.
+    """
+
+    def __init__(self, handler: Callable[[UpdateObj], None], concurrency: int = 8):
+        self.handler = handler
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='bot-handler')
+        self.queues: dict[int, deque[tuple[UpdateObj, asyncio.Future]]] = {}
+        self.tasks: set[asyncio.Task] = set()
+
+    @property
+    def pending(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    def dispatch(self, update: UpdateObj) -> asyncio.Future:
+        """Ставит обновление в очередь его чата, возвращает future, который завершится после обработки"""
+        handled = asyncio.get_running_loop().create_future()
+        chat_id = update.message.chat.id
+        if chat_id in self.queues:
+            self.queues[chat_id].append((update, handled))
+            return handled
+        self.queues[chat_id] = deque([(update, handled)])
+        task = asyncio.create_task(self._drain_chat(chat_id))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return handled
+
+    async def _drain_chat(self, chat_id: int) -> None:
+        queue = self.queues[chat_id]
+        loop = asyncio.get_running_loop()
+        try:
+            while queue:
+                update, handled = queue[0]
+                try:
+                    await loop.run_in_executor(self.executor, self._handle, update)
+                except Exception:
+                    logger.exception('Failed to handle update %s', update.update_id)
+                queue.popleft()
+                handled.set_result(None)
+        finally:
+            del self.queues[chat_id]
+
+    def _handle(self, update: UpdateObj) -> None:
+        self._call(self.handler, update)
+
+    @staticmethod
+    def _call(func: Callable, *args):
+        # у каждого потока пула свое соединение с БД, закрываем протухшие как в цикле запроса Django
+        close_old_connections()
+        try:
+            return func(*args)
+        finally:
+            close_old_connections()
+
+    async def run_sync(self, func: Callable, *args):
+        """Выполняет синхронную функцию в пуле обработчиков"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self._call, func, *args)
+
+    async def join(self) -> None:
+        while self.tasks:
+            await asyncio.gather(*self.tasks)
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+
+
+class PendingBatch:
+    def __init__(self, updates: list[UpdateObj]):
+        self.updates = updates
+        self.done = False
+
+
+class BotRuntime:
+    """
+    Асинхронный цикл long polling: получает пачку обновлений и раздает ее ChatDispatcher.
+    Пачка обрабатывается как единое целое: begin_batch вызывается до обработчиков (например, чтобы
+    загрузить данные всех чатов пачки одним запросом), end_batch - после того, как все обновления
+    пачки обработаны. Следующая пачка запрашивается, не дожидаясь обработки предыдущих, пока в работе
+    меньше max_pending обновлений, поэтому медленный чат не задерживает остальные.
+    Порядок внутри чата сохраняется: пачки раздаются по очередям чатов в порядке получения.
+    С checkpoint offset восстанавливается при старте, а уже обработанные обновления пропускаются;
+    пачки отмечаются обработанными только непрерывным префиксом, поэтому контрольная точка
+    не обгоняет пачку, которая еще обрабатывается.
+    fetch_updates заменяет getUpdates: в режиме webhook пачки берутся из bot.webhook.WebhookInbox.
+    """
+
+    def __init__(self, tg_client: TgClient, handler: Callable[[UpdateObj], None],
+                 concurrency: int = 8, poll_timeout: int = 60, max_pending: int = 1000,
+                 begin_batch: Callable[[list[UpdateObj]], None] | None = None,
+                 end_batch: Callable[[list[UpdateObj]], None] | None = None,
+                 checkpoint: UpdateCheckpoint | None = None,
+                 fetch_updates: Callable[[int], Awaitable[list[UpdateObj]]] | None = None):
+        self.tg_client = tg_client
+        self.async_client = AsyncTgClient(tg_client)
+        self.dispatcher = ChatDispatcher(handler, concurrency=concurrency)
+        self.begin_batch = begin_batch
+        self.end_batch = end_batch
+        self.checkpoint = checkpoint
+        self.poll_timeout = poll_timeout
+        self.max_pending = max_pending
+        self.fetch_updates = fetch_updates or self.get_updates
+        self.offset = 0
+        # пачки в порядке получения, голова удаляется, когда она и все перед ней обработаны
+        self.batches: deque[PendingBatch] = deque()
+        self.batch_tasks: set[asyncio.Task] = set()
+        self._commit_lock = asyncio.Lock()
+        self._error: BaseException | None = None
+        self._stopping = False
+
+    async def run(self) -> None:
+        try:
+            await self.start()
+            while not self._stopping:
+                await self.poll_once()
+            await self.join()
+            if self.checkpoint:
+                await self.dispatcher.run_sync(self.checkpoint.save)
+        finally:
+            self.dispatcher.close()
+
+    async def start(self) -> None:
+        if self.checkpoint:
+            self.offset = await self.dispatcher.run_sync(self.checkpoint.load)
+
+    async def get_updates(self, offset: int) -> list[UpdateObj]:
+        return (await self.async_client.get_updates(offset=offset, timeout=self.poll_timeout)).result
+
+    @property
+    def pending(self) -> int:
+        return sum(len(batch.updates) for batch in self.batches if not batch.done)
+
+    async def poll_once(self) -> int:
+        """Получает и раздает следующую пачку, не дожидаясь ее обработки"""
+        while self.pending >= self.max_pending and not self._error:
+            await asyncio.wait(self.batch_tasks, return_when=asyncio.FIRST_COMPLETED)
+        if self._error:
+            # пачка, упавшая вне обработчиков, останавливает контрольную точку, дальше работать нельзя
+            raise self._error
+        updates = await self.fetch_updates(self.offset)
+        if not updates:
+            return 0
+        self.offset = updates[-1].update_id + 1
+        return await self.submit(updates)
+
+    async def submit(self, updates: list[UpdateObj]) -> int:
+        """Раздает пачку обработчикам, ее завершение ждет отдельная задача"""
+        if self.checkpoint:
+            updates = self.checkpoint.new(updates)
+        batch = PendingBatch(updates)
+        self.batches.append(batch)
+        handled = await self.start_batch(updates) if updates else None
+        task = asyncio.create_task(self._complete_batch(batch, handled))
+        self.batch_tasks.add(task)
+        task.add_done_callback(self._batch_task_done)
+        return len(updates)
+
+    def _batch_task_done(self, task: asyncio.Task) -> None:
+        self.batch_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self._error = self._error or task.exception()
+
+    async def start_batch(self, updates: list[UpdateObj]) -> Awaitable[None]:
+        """Запускает обработку непустой пачки, возвращает ожидание ее завершения"""
+        if self.begin_batch:
+            await self.dispatcher.run_sync(self.begin_batch, updates)
+        # раздача без await между обновлениями: пачки попадают в очереди чатов в порядке получения
+        handled = [self.dispatcher.dispatch(item) for item in updates]
+        return self._end_batch(updates, handled)
+
+    async def _end_batch(self, updates: list[UpdateObj], handled: list[asyncio.Future]) -> None:
+        await asyncio.gather(*handled)
+        if self.end_batch:
+            await self.dispatcher.run_sync(self.end_batch, updates)
+
+    async def _complete_batch(self, batch: PendingBatch, handled: Awaitable[None] | None) -> None:
+        if handled is not None:
+            await handled
+        batch.done = True
+        async with self._commit_lock:
+            while self.batches and self.batches[0].done:
+                head = self.batches.popleft()
+                if self.checkpoint:
+                    await self.dispatcher.run_sync(self.checkpoint.commit, head.updates)
+
+    async def join(self) -> None:
+        """Ждет обработки всех полученных пачек"""
+        while self.batch_tasks:
+            await asyncio.gather(*self.batch_tasks)
+
+    async def process_batch(self, updates: list[UpdateObj]) -> int:
+        """Обрабатывает пачку обновлений целиком, вместе с уже полученными"""
+        count = await self.submit(updates)
+        await self.join()
+        return count
+
+    def stop(self) -> None:
+        self._stopping = True
@@ -0,0 +1,18 @@
+import os
+
+'''
+Точка входа процесса-обработчика бота (bot.sharding).
+Процессы запускаются через spawn: чистый интерпретатор не наследует ни соединения с БД,
+ни блокировки потоков родителя (outbox, планировщик отправки), поэтому Django настраивается здесь заново,
+до импорта моделей.
+'''
+
+
+def main(*args) -> None:
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todolist.settings')
+    import django
+
+    django.setup()
+    from bot.sharding import run_worker
+
+    run_worker(*args)
@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import multiprocessing
+import queue
+import signal
+from collections import defaultdict
+from typing import Awaitable, Callable
+
+from django.conf import settings
+
+from bot import shard_worker
+from bot.checkpoint import UpdateCheckpoint
+from bot.runtime import BotRuntime
+from bot.tg.client import TgClient
+from bot.tg.scheduler import SendScheduler
+from bot.tg.schemas import UpdateObj
+
+logger = logging.getLogger(__name__)
+
+'''
+Несколько процессов-обработчиков бота, каждый владеет своей частью чатов: chat_id % число процессов.
+Обновления получает один процесс (long polling или очередь webhook) и раскладывает пачку по процессам;
+как и в BotRuntime, следующая пачка запрашивается, не дожидаясь подтверждений по предыдущим,
+а контрольная точка сдвигается за пачку, когда ее подтвердили все процессы, которым она досталась.
+Подтверждения процесс отправляет в порядке получения пачек, поэтому они сопоставляются по очереди.
+Все обновления чата попадают в один процесс, поэтому порядок внутри чата сохраняется,
+а разные чаты обрабатываются на разных ядрах.
+При изменении числа процессов (resize) текущие процессы после обработки всех пачек завершаются штатно
+и запускаются новые с новым разбиением. Состояние диалогов при этом переживает перестроение,
+только если оно хранится вне процесса: BOT_STATE_BACKEND=cache или BOT_STATE_WRITE_BACK_INTERVAL.
+У каждого процесса свой SendScheduler, поэтому общий лимит TG_GLOBAL_RATE делится поровну
+между процессами-обработчиками и родителем (его планировщик отправляет outbox).
+Процессы запускаются через spawn (bot.shard_worker) и читают настройки из того же окружения, что и родитель.
+'''
+
+
+def shard_for(chat_id: int, shards: int) -> int:
+    return chat_id % shards
+
+
+def run_worker(index: int, inbox: multiprocessing.Queue, acks: multiprocessing.Queue, concurrency: int,
+               global_rate: float) -> None:
+    # останавливает процесс родитель, отправляя None, Ctrl+C не должен прерывать пачку
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    from bot.management.commands.runbot import Command
+
+    command = Command()
+    command.sender.set_global_rate(global_rate)
+    runtime = command.build_runtime(concurrency)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        # у процесса свой TgClient, его счетчики пишутся в лог отдельно
+        metrics_task = asyncio.create_task(command.log_metrics_periodically())
+        while (batch := await loop.run_in_executor(None, inbox.get)) is not None:
+            try:
+                await runtime.process_batch([UpdateObj.model_validate(update) for update in batch])
+            except Exception:
+                logger.exception('Shard %s failed to process batch', index)
+            acks.put(len(batch))
+        metrics_task.cancel()
+
+    try:
+        asyncio.run(main())
+    finally:
+        runtime.dispatcher.close()
+        command.state_store.write_back(force=True)
+        command.sender.close()
+        logger.info('Shard %s stopped', index)
+
+
+class ShardWorker:
+    def __init__(self, index: int, concurrency: int, global_rate: float, context):
+        self.index = index
+        self.global_rate = global_rate
+        self.inbox = context.Queue()
+        self.acks = context.Queue()
+        self.process = context.Process(target=shard_worker.main,
+                                       args=(index, self.inbox, self.acks, concurrency, global_rate),
+                                       name=f'bot-shard-{index}', daemon=True)
+
+    def start(self) -> None:
+        self.process.start()
+
+    def submit(self, updates: list[UpdateObj]) -> None:
+        self.inbox.put([update.model_dump() for update in updates])
+
+    def wait_ack(self) -> None:
+        while True:
+            try:
+                self.acks.get(timeout=1)
+                return
+            except queue.Empty:
+                if not self.process.is_alive():
+                    raise RuntimeError(f'Shard {self.index} exited with code {self.process.exitcode}')
+
+    def stop(self) -> None:
+        if self.process.is_alive():
+            self.inbox.put(None)
+        self.process.join()
+
+
+class ShardedBotRuntime(BotRuntime):
+    """
+    BotRuntime, который вместо обработки в своем процессе раздает пачку процессам ShardWorker.
+    Интерфейс тот же, что у BotRuntime, в том числе fetch_updates для webhook.
+    """
+
+    def __init__(self, tg_client: TgClient, workers: int, concurrency: int = 8, poll_timeout: int = 60,
+                 max_pending: int = 1000, checkpoint: UpdateCheckpoint | None = None,
+                 sender: SendScheduler | None = None,
+                 fetch_updates: Callable[[int], Awaitable[list[UpdateObj]]] | None = None):
+        super().__init__(tg_client, lambda update: None, concurrency=1, poll_timeout=poll_timeout,
+                         max_pending=max_pending, checkpoint=checkpoint, fetch_updates=fetch_updates)
+        # планировщик родителя, его доля общего лимита меняется вместе с числом процессов
+        self.sender = sender
+        self.worker_concurrency = concurrency
+        self.size = workers
+        self.workers: list[ShardWorker] = []
+        # spawn, а не fork: при fork дочерний процесс унаследовал бы соединения с БД потоков родителя
+        # и блокировки, захваченные его потоками в момент fork
+        self.context = multiprocessing.get_context('spawn')
+
+    def resize(self, workers: int) -> None:
+        """Новое число процессов применяется перед следующей пачкой"""
+        self.size = max(1, workers)
+
+    def _start_workers(self) -> None:
+        global_rate = settings.TG_GLOBAL_RATE / (self.size + 1)
+        if self.sender is not None:
+            self.sender.set_global_rate(global_rate)
+        self.workers = [ShardWorker(index, self.worker_concurrency, global_rate, self.context)
+                        for index in range(self.size)]
+        for worker in self.workers:
+            worker.start()
+        logger.info('Started %s bot shards', self.size)
+
+    def _stop_workers(self) -> None:
+        for worker in self.workers:
+            worker.stop()
+        self.workers = []
+
+    def _workers_ready(self) -> bool:
+        return len(self.workers) == self.size and all(worker.process.is_alive() for worker in self.workers)
+
+    def _ensure_workers(self) -> None:
+        if not self._workers_ready():
+            self._stop_workers()
+            self._start_workers()
+
+    async def start(self) -> None:
+        await super().start()
+        await self._ensure_workers_async()
+
+    async def _ensure_workers_async(self) -> None:
+        # запуск и остановка процессов блокируют, цикл событий в это время обслуживает остальное
+        await asyncio.to_thread(self._ensure_workers)
+
+    async def start_batch(self, updates: list[UpdateObj]) -> Awaitable[None]:
+        if not self._workers_ready():
+            # перестроение только без пачек в работе, иначе их подтверждения потеряются
+            await self.join()
+            await self._ensure_workers_async()
+        parts: dict[int, list[UpdateObj]] = defaultdict(list)
+        for update in updates:
+            parts[shard_for(update.message.chat.id, len(self.workers))].append(update)
+        for index, part in parts.items():
+            self.workers[index].submit(part)
+        return asyncio.gather(*(asyncio.to_thread(self.workers[index].wait_ack) for index in parts))
+
+    async def run(self) -> None:
+        try:
+            await super().run()
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        self._stop_workers()
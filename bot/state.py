@@ -0,0 +1,146 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Case, When, Value, PositiveSmallIntegerField, BigIntegerField
+
+from bot.models import TgUser
+
+'''
+Хранилище состояния диалогов бота (/create -> выбор категории -> название цели).
+Состояние короткоживущее, поэтому хранится не в TgUser, а в памяти процесса или в кэше Django
+и само истекает через BOT_STATE_TTL секунд. Если задан BOT_STATE_WRITE_BACK_INTERVAL,
+измененные состояния раз в интервал пишутся одним запросом в TgUser.state/category,
+и после перезапуска бота диалог продолжается с сохраненного шага.
+'''
+
+
+@dataclass
+class DialogState:
+    state: int = 0
+    category_id: int | None = None
+    # категории, предложенные на шаге /create: название -> id, выбор категории не ходит в БД
+    categories: dict[str, int] = field(default_factory=dict)
+    # постраничный вывод /goals: с каких id начинались открытые страницы и где начинается следующая
+    goal_pages: list[int] = field(default_factory=list)
+    goal_next: int | None = None
+
+
+class StateStore(ABC):
+    def __init__(self, ttl: int | None = None, write_back_interval: float | None = None):
+        self.ttl = ttl if ttl is not None else settings.BOT_STATE_TTL
+        self.write_back_interval = (write_back_interval if write_back_interval is not None
+                                    else settings.BOT_STATE_WRITE_BACK_INTERVAL)
+        self._dirty: dict[int, DialogState] = {}
+        self._dirty_lock = threading.Lock()
+        self._written_at = time.monotonic()
+
+    @abstractmethod
+    def get(self, chat_id: int) -> DialogState | None:
+        ...
+
+    @abstractmethod
+    def _set(self, chat_id: int, state: DialogState) -> None:
+        ...
+
+    @abstractmethod
+    def _delete(self, chat_id: int) -> None:
+        ...
+
+    def set(self, chat_id: int, state: DialogState) -> None:
+        if state == DialogState():
+            self._delete(chat_id)
+        else:
+            self._set(chat_id, state)
+        if self.write_back_interval:
+            with self._dirty_lock:
+                self._dirty[chat_id] = state
+
+    def load(self, tg_user: TgUser) -> DialogState:
+        """Состояние чата; без записи в БД диалог после истечения TTL начинается сначала"""
+        state = self.get(tg_user.chat_id)
+        if state is None and self.write_back_interval and tg_user.state:
+            state = DialogState(state=tg_user.state, category_id=tg_user.category_id)
+        return state if state is not None else DialogState()
+
+    def write_back(self, force: bool = False) -> int:
+        """Пишет измененные состояния в TgUser, если подошел интервал"""
+        if not self.write_back_interval:
+            return 0
+        if not force and time.monotonic() - self._written_at < self.write_back_interval:
+            return 0
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, {}
+            self._written_at = time.monotonic()
+        if dirty:
+            TgUser.objects.filter(chat_id__in=dirty).update(
+                state=Case(*(When(chat_id=chat_id, then=Value(state.state)) for chat_id, state in dirty.items()),
+                           output_field=PositiveSmallIntegerField()),
+                category_id=Case(*(When(chat_id=chat_id, then=Value(state.category_id))
+                                   for chat_id, state in dirty.items()), output_field=BigIntegerField()),
+            )
+        return len(dirty)
+
+
+class MemoryStateStore(StateStore):
+    """Состояние в памяти процесса: для одного процесса бота, все обновления чата приходят в него"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._data: dict[int, tuple[float, DialogState]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, chat_id: int) -> DialogState | None:
+        with self._lock:
+            item = self._data.get(chat_id)
+            if item is None:
+                return None
+            expires, state = item
+            if expires <= time.monotonic():
+                del self._data[chat_id]
+                return None
+            return state
+
+    def _set(self, chat_id: int, state: DialogState) -> None:
+        with self._lock:
+            self._data[chat_id] = (time.monotonic() + self.ttl, state)
+            if len(self._data) > settings.BOT_STATE_MAX_SIZE:
+                self._purge_expired()
+
+    def _delete(self, chat_id: int) -> None:
+        with self._lock:
+            self._data.pop(chat_id, None)
+
+    def _purge_expired(self) -> None:
+        now = time.monotonic()
+        for chat_id in [chat_id for chat_id, (expires, _) in self._data.items() if expires <= now]:
+            del self._data[chat_id]
+
+
+class CacheStateStore(StateStore):
+    """Состояние в кэше Django, общем для нескольких процессов бота, если кэш общий"""
+
+    def __init__(self, alias: str | None = None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache = caches[alias or settings.BOT_STATE_CACHE]
+
+    @staticmethod
+    def _key(chat_id: int) -> str:
+        return f'bot-state:{chat_id}'
+
+    def get(self, chat_id: int) -> DialogState | None:
+        return self.cache.get(self._key(chat_id))
+
+    def _set(self, chat_id: int, state: DialogState) -> None:
+        self.cache.set(self._key(chat_id), state, timeout=self.ttl)
+
+    def _delete(self, chat_id: int) -> None:
+        self.cache.delete(self._key(chat_id))
+
+
+def get_state_store() -> StateStore:
+    backends = {'memory': MemoryStateStore, 'cache': CacheStateStore}
+    return backends[settings.BOT_STATE_BACKEND]()
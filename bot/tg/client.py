@@ -1,39 +1,168 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
 from enum import Enum
 
 import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
 
-from bot.tg.schemas import GetUpdatesResponse, SendMessageResponse
-from todolist import settings
+from bot.tg.schemas import GetUpdatesResponse, SendMessageResponse, WebhookResponse
 
-# import logging
-#
-# logging.basicConfig(filename='bot.log', level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 
 class Command(str, Enum):
     GET_UPDATES = 'getUpdates'
     SEND_MESSAGE = 'sendMessage'
+    SET_WEBHOOK = 'setWebhook'
+    DELETE_WEBHOOK = 'deleteWebhook'
+
+
+# повтор этих методов после потерянного ответа безопасен; sendMessage повторяется только если
+# запрос точно не дошел до Telegram (ошибка соединения) или Telegram сам попросил повторить (429)
+IDEMPOTENT_COMMANDS = frozenset({Command.GET_UPDATES, Command.SET_WEBHOOK, Command.DELETE_WEBHOOK})
+
+
+class TgClientError(ValueError):
+    def __init__(self, command: Command, status_code: int | None, description: str):
+        super().__init__(f'{command.value} failed ({status_code}): {description}')
+        self.status_code = status_code
+        self.description = description
+
+
+class TransportMetrics:
+    """Счетчики и суммарная задержка запросов к Bot API по методам, потокобезопасные"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: dict[str, dict[str, float]] = defaultdict(
+            lambda: {'requests': 0, 'errors': 0, 'retries': 0, 'total_seconds': 0.0, 'max_seconds': 0.0}
+        )
+
+    def observe(self, command: Command, seconds: float, error: bool = False) -> None:
+        with self._lock:
+            data = self._data[command.value]
+            data['requests'] += 1
+            data['errors'] += int(error)
+            data['total_seconds'] += seconds
+            data['max_seconds'] = max(data['max_seconds'], seconds)
+
+    def retry(self, command: Command) -> None:
+        with self._lock:
+            self._data[command.value]['retries'] += 1
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            return {command: dict(data) for command, data in self._data.items()}
 
 
 class TgClient:
-    def __init__(self, token: str | None = None):
+    """
+    Клиент Bot API поверх одной requests.Session с пулом соединений:
+    TCP/TLS соединения переиспользуются между вызовами и потоками.
+    - у запросов раздельные таймауты на соединение и чтение, для getUpdates
+      таймаут чтения больше таймаута long polling;
+    - ошибки соединения и 429 повторяются до TG_MAX_RETRIES раз с экспоненциальной
+      задержкой со случайным разбросом, при 429 выдерживается retry_after из ответа Telegram;
+    - таймаут чтения и 5xx повторяются только для IDEMPOTENT_COMMANDS: sendMessage мог
+      уже отправить сообщение, и повтор его бы продублировал.
+    """
+
+    def __init__(self, token: str | None = None, session: requests.Session | None = None):
         self.token = token if token else settings.BOT_TOKEN
+        self.session = session if session else self._build_session()
+        self.metrics = TransportMetrics()
+
+    @staticmethod
+    def _build_session() -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.TG_POOL_SIZE, max_retries=0)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
 
     def get_url(self, method: str) -> str:
-        return f'https://api.telegram.org/bot{self.token}/{method}'
+        return f'{settings.TG_API_URL}/bot{self.token}/{method}'
 
     def get_updates(self, offset: int = 0, timeout: int = 60) -> GetUpdatesResponse:
-        data = self._get(Command.GET_UPDATES, offset=offset, timeout=timeout)
+        read_timeout = timeout + settings.TG_READ_TIMEOUT
+        data = self._get(Command.GET_UPDATES, read_timeout=read_timeout, offset=offset, timeout=timeout)
         return GetUpdatesResponse(**data)
 
     def send_message(self, chat_id: int, text: str) -> SendMessageResponse:
         data = self._get(Command.SEND_MESSAGE, chat_id=chat_id, text=text)
         return SendMessageResponse(**data)
 
-    def _get(self, command: Command, **params) -> dict:
+    def set_webhook(self, url: str, secret_token: str, max_connections: int = 40) -> WebhookResponse:
+        data = self._get(Command.SET_WEBHOOK, url=url, secret_token=secret_token, max_connections=max_connections)
+        return WebhookResponse(**data)
+
+    def delete_webhook(self) -> WebhookResponse:
+        data = self._get(Command.DELETE_WEBHOOK)
+        return WebhookResponse(**data)
+
+    def _get(self, command: Command, read_timeout: float | None = None, **params) -> dict:
         url = self.get_url(command.value)
-        response = requests.get(url, params=params)
-        if not response.ok:
-            print(response.json())
-            raise ValueError
-        return response.json()
+        timeout = (settings.TG_CONNECT_TIMEOUT, read_timeout or settings.TG_READ_TIMEOUT)
+
+        for attempt in range(settings.TG_MAX_RETRIES + 1):
+            started = time.monotonic()
+            try:
+                response = self.session.get(url, params=params, timeout=timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.metrics.observe(command, time.monotonic() - started, error=True)
+                error, delay = TgClientError(command, None, str(e)), self._backoff(attempt)
+                # ConnectTimeout - тоже ConnectionError, а ReadTimeout значит, что запрос мог дойти
+                if not isinstance(e, requests.ConnectionError) and command not in IDEMPOTENT_COMMANDS:
+                    raise error
+            else:
+                data = self._json(response)
+                self.metrics.observe(command, time.monotonic() - started, error=not response.ok)
+                if response.ok:
+                    return data
+                error = TgClientError(command, response.status_code, data.get('description', response.text))
+                if response.status_code != 429 and (response.status_code < 500 or command not in IDEMPOTENT_COMMANDS):
+                    raise error
+                retry_after = data.get('parameters', {}).get('retry_after')
+                delay = retry_after if retry_after is not None else self._backoff(attempt)
+
+            if attempt == settings.TG_MAX_RETRIES:
+                raise error
+            logger.warning('%s, retry in %.2f s', error, delay)
+            self.metrics.retry(command)
+            time.sleep(delay)
+
+    @staticmethod
+    def _json(response: requests.Response) -> dict:
+        try:
+            return response.json()
+        except ValueError:
+            return {}
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        return random.uniform(0, min(settings.TG_BACKOFF_MAX, settings.TG_BACKOFF_BASE * 2 ** attempt))
+
+
+class AsyncTgClient:
+    """
+    Асинхронный двойник TgClient с тем же API: вызовы выполняются в потоках,
+    поэтому пул соединений, таймауты, повторы и метрики общие с синхронным клиентом.
+    """
+
+    def __init__(self, client: TgClient | None = None):
+        self.client = client if client else TgClient()
+
+    @property
+    def metrics(self) -> TransportMetrics:
+        return self.client.metrics
+
+    async def get_updates(self, offset: int = 0, timeout: int = 60) -> GetUpdatesResponse:
+        return await asyncio.to_thread(self.client.get_updates, offset=offset, timeout=timeout)
+
+    async def send_message(self, chat_id: int, text: str) -> SendMessageResponse:
+        return await asyncio.to_thread(self.client.send_message, chat_id, text)
@@ -0,0 +1,222 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+
+from bot.tg.client import TgClient
+from bot.tg.schemas import SendMessageResponse
+
+logger = logging.getLogger(__name__)
+
+
+class SendAborted(Exception):
+    """Сообщение не отправлялось: более раннее сообщение того же чата с ordered=True не ушло"""
+
+
+class TokenBucket:
+    """Ведро токенов: rate токенов в секунду, не больше capacity накопленных"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Через сколько секунд будет доступен токен"""
+        self._refill(now)
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+    def consume(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class SendScheduler:
+    """
+    Очередь исходящих сообщений с ограничением частоты отправки.
+    - общий лимит Bot API (TG_GLOBAL_RATE в секунду) и лимит на чат (TG_CHAT_RATE с запасом TG_CHAT_BURST)
+      соблюдаются ведрами токенов;
+    - сообщения одного чата уходят по порядку и по одному запросу за раз, а пока чат ждет лимита
+      или предыдущей отправки, накопившиеся сообщения склеиваются в одно, если влезают в TG_MESSAGE_MAX_LENGTH;
+    - send_message не блокирует вызывающего и возвращает Future с ответом Telegram;
+    - если отправка сообщения с ordered=True не удалась, оставшиеся в очереди чата сообщения с ordered=True
+      не отправляются, их Future завершаются SendAborted: повтор первого не окажется после них.
+    """
+
+    def __init__(self, client: TgClient, global_rate: float | None = None, chat_rate: float | None = None,
+                 chat_burst: float | None = None, max_length: int | None = None, workers: int | None = None):
+        self.client = client
+        global_rate = global_rate or settings.TG_GLOBAL_RATE
+        self.global_bucket = TokenBucket(global_rate, max(global_rate, 1))
+        self.chat_rate = chat_rate or settings.TG_CHAT_RATE
+        self.chat_burst = chat_burst or settings.TG_CHAT_BURST
+        self.max_length = max_length or settings.TG_MESSAGE_MAX_LENGTH
+        self.executor = ThreadPoolExecutor(max_workers=workers or settings.TG_POOL_SIZE,
+                                           thread_name_prefix='tg-send')
+        self.condition = threading.Condition()
+        self.queues: dict[int, deque[tuple[str, Future, bool]]] = {}
+        self.chat_buckets: dict[int, TokenBucket] = {}
+        self.in_flight: set[int] = set()
+        self._counters = {'requests': 0, 'messages': 0, 'coalesced': 0, 'errors': 0}
+        self._worker: threading.Thread | None = None
+        self._closing = False
+
+    def set_global_rate(self, rate: float) -> None:
+        """Меняет общий лимит, например когда TG_GLOBAL_RATE делят несколько процессов бота"""
+        with self.condition:
+            self.global_bucket = TokenBucket(rate, max(rate, 1))
+            self.condition.notify_all()
+
+    def send_message(self, chat_id: int, text: str, ordered: bool = False) -> Future:
+        return self.send_messages([(chat_id, text)], ordered=ordered)[0]
+
+    def send_messages(self, messages: list[tuple[int, str]], ordered: bool = False) -> list[Future]:
+        """Ставит сообщения в очередь разом, сообщения одного чата сразу могут склеиться"""
+        futures = []
+        with self.condition:
+            if self._closing:
+                raise RuntimeError('SendScheduler is closed')
+            for chat_id, text in messages:
+                future: Future = Future()
+                self.queues.setdefault(chat_id, deque()).append((text, future, ordered))
+                futures.append(future)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='tg-scheduler', daemon=True)
+                self._worker.start()
+            self.condition.notify_all()
+        return futures
+
+    def metrics(self) -> dict[str, int]:
+        """Глубина очереди и счетчики отправок"""
+        with self.condition:
+            depths = [len(queue) for queue in self.queues.values()]
+            return {
+                'queued': sum(depths),
+                'chats': len(depths),
+                'max_chat_depth': max(depths, default=0),
+                'in_flight': len(self.in_flight),
+                **self._counters,
+            }
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Ждет, пока очередь не опустеет, возвращает False по таймауту"""
+        with self.condition:
+            return self.condition.wait_for(lambda: not self.queues and not self.in_flight, timeout=timeout)
+
+    def close(self) -> None:
+        self.flush()
+        with self.condition:
+            self._closing = True
+            self.condition.notify_all()
+        if self._worker is not None:
+            self._worker.join()
+        self.executor.shutdown(wait=True)
+
+    def _run(self) -> None:
+        while True:
+            with self.condition:
+                while True:
+                    if self._closing:
+                        return
+                    chat_id, wait = self._next_ready()
+                    if chat_id is not None and wait <= 0:
+                        break
+                    self.condition.wait(timeout=wait)
+                items = self._take(chat_id)
+            self.executor.submit(self._send, chat_id, items)
+
+    def _next_ready(self) -> tuple[int | None, float | None]:
+        """Чат, который можно отправить раньше всех, и сколько до этого ждать"""
+        now = time.monotonic()
+        best_chat, best_wait = None, None
+        for chat_id in self.queues:
+            if chat_id in self.in_flight:
+                continue
+            bucket = self.chat_buckets.get(chat_id)
+            wait = bucket.delay(now) if bucket else 0.0
+            if best_wait is None or wait < best_wait:
+                best_chat, best_wait = chat_id, wait
+                if wait == 0:
+                    break
+        if best_chat is None:
+            return None, None
+        return best_chat, max(best_wait, self.global_bucket.delay(now))
+
+    def _take(self, chat_id: int) -> list[tuple[str, Future, bool]]:
+        now = time.monotonic()
+        self.global_bucket.consume(now)
+        bucket = self.chat_buckets.setdefault(chat_id, TokenBucket(self.chat_rate, self.chat_burst))
+        bucket.consume(now)
+
+        queue = self.queues[chat_id]
+        items = [queue.popleft()]
+        length = len(items[0][0])
+        while queue and length + 1 + len(queue[0][0]) <= self.max_length:
+            items.append(queue.popleft())
+            length += 1 + len(items[-1][0])
+        if not queue:
+            del self.queues[chat_id]
+        self.in_flight.add(chat_id)
+        return items
+
+    def _send(self, chat_id: int, items: list[tuple[str, Future, bool]]) -> None:
+        texts = [text for text, _, _ in items]
+        futures = [future for _, future, _ in items]
+        aborted: list[Future] = []
+        try:
+            response: SendMessageResponse = self.client.send_message(chat_id, '\n'.join(texts))
+        except Exception as e:
+            logger.warning('Failed to send %s message(s) to chat %s: %s', len(texts), chat_id, e)
+            error = e
+        else:
+            error = None
+        with self.condition:
+            self._counters['requests'] += 1
+            self._counters['messages'] += len(texts)
+            self._counters['coalesced'] += len(texts) - 1
+            self._counters['errors'] += int(error is not None)
+            if error is not None and any(ordered for _, _, ordered in items):
+                aborted = self._abort_ordered(chat_id)
+            self.in_flight.discard(chat_id)
+            self._prune_buckets()
+            self.condition.notify_all()
+        for future in futures:
+            if error is None:
+                future.set_result(response)
+            else:
+                future.set_exception(error)
+        for future in aborted:
+            future.set_exception(SendAborted(f'Earlier message to chat {chat_id} was not sent'))
+
+    def _abort_ordered(self, chat_id: int) -> list[Future]:
+        queue = self.queues.get(chat_id)
+        if not queue:
+            return []
+        aborted = [future for _, future, ordered in queue if ordered]
+        remaining = deque(item for item in queue if not item[2])
+        if remaining:
+            self.queues[chat_id] = remaining
+        else:
+            del self.queues[chat_id]
+        return aborted
+
+    def _prune_buckets(self) -> None:
+        # полное ведро ничем не отличается от нового, храним только ведра недавно писавших чатов
+        if len(self.chat_buckets) < 10000:
+            return
+        now = time.monotonic()
+        for chat_id in [chat_id for chat_id, bucket in self.chat_buckets.items()
+                        if chat_id not in self.queues and chat_id not in self.in_flight and bucket.is_full(now)]:
+            del self.chat_buckets[chat_id]
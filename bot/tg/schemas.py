@@ -23,3 +23,8 @@ class SendMessageResponse(BaseModel):
 class GetUpdatesResponse(BaseModel):
     ok: bool
     result: list[UpdateObj]
+
+
+class WebhookResponse(BaseModel):
+    ok: bool
+    result: bool
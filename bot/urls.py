@@ -1,7 +1,8 @@
 from django.urls import path
 
-from bot.views import VerificationView
+from bot.views import VerificationView, WebhookView
 
 urlpatterns = [
     path('verify', VerificationView.as_view(), name='verify-user'),
+    path('webhook', WebhookView.as_view(), name='bot-webhook'),
 ]
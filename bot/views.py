@@ -1,10 +1,23 @@
+import hmac
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpRequest, HttpResponse, Http404
 from django.shortcuts import render
+from django.views.decorators.csrf import csrf_exempt
+from django.utils.decorators import method_decorator
+from django.views import View
+from pydantic import ValidationError
 from rest_framework.generics import GenericAPIView
 from rest_framework.request import Request
 from rest_framework.response import Response
-from bot.models import TgUser
+from bot.models import TgUser, WebhookUpdate
 from bot.serializers import TgUserSerializer
-from bot.tg.client import TgClient
+from bot.outbox import enqueue_message
+from bot.tg.schemas import UpdateObj
+
+logger = logging.getLogger(__name__)
 
 
 class VerificationView(GenericAPIView):
@@ -15,9 +28,36 @@ class VerificationView(GenericAPIView):
         s: TgUserSerializer = self.get_serializer(data=request.data)
         s.is_valid(raise_exception=True)
 
-        s.tg_user.user = request.user
-        s.tg_user.save()
+        # сообщение отправит бот из outbox, ответ не ждет Telegram
+        with transaction.atomic():
+            s.tg_user.user = request.user
+            s.tg_user.save()
+            enqueue_message(s.tg_user.chat_id, 'verification_have been completed',
+                            dedup_key=f'verification:{s.tg_user.id}:{s.validated_data["verification_code"]}')
+
+        return Response(self.get_serializer(s.tg_user).data)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class WebhookView(View):
+    """Прием обновлений от Telegram: обновление сохраняется для runbot (bot.webhook), ответ не ждет обработки"""
+
+    def post(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        if settings.BOT_MODE != 'webhook' or not settings.BOT_WEBHOOK_SECRET:
+            raise Http404
+        token = request.headers.get('X-Telegram-Bot-Api-Secret-Token', '')
+        if not hmac.compare_digest(token, settings.BOT_WEBHOOK_SECRET):
+            return HttpResponse(status=403)
 
-        TgClient().send_message(s.tg_user.chat_id, 'verification_have been completed')
+        try:
+            update = UpdateObj.model_validate_json(request.body)
+        except ValidationError:
+            # обновления без текстового сообщения бот не обрабатывает, подтверждаем, чтобы Telegram их не повторял
+            logger.info('Skip webhook update: %s', request.body[:200])
+            return HttpResponse()
 
-        return Response(self.get_serializer(s.tg_user).data)
\ No newline at end of file
+        # повторная доставка того же update_id не создает второй записи
+        WebhookUpdate.objects.bulk_create(
+            [WebhookUpdate(update_id=update.update_id, payload=update.model_dump(mode='json'))], ignore_conflicts=True,
+        )
+        return HttpResponse()
@@ -0,0 +1,53 @@
+import asyncio
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from bot.checkpoint import UpdateCheckpoint
+from bot.models import WebhookUpdate
+from bot.tg.schemas import UpdateObj
+
+'''
+Прием обновлений через webhook.
+Представление (bot.views.WebhookView) только сохраняет обновление в WebhookUpdate и сразу отвечает Telegram,
+поэтому его может обслуживать сколько угодно воркеров сервера.
+Обрабатывает обновления один потребитель - runbot с BOT_MODE=webhook: WebhookInbox заменяет в BotRuntime
+getUpdates и отдает пачки по возрастанию update_id, дальше тот же конвейер, что и при long polling
+(с --workers - ShardedBotRuntime). Так обновления чата обрабатываются по порядку в одном месте,
+общий лимит отправки соблюдает один процесс, а повторы update_id отсекаются в БД: первичным ключом
+WebhookUpdate при приеме и контрольной точкой UpdateCheckpoint(name='webhook') при обработке.
+Строки удаляются, когда их update_id попал в сохраненную контрольную точку, поэтому после перезапуска
+runbot продолжает с необработанных обновлений.
+'''
+
+
+class WebhookInbox:
+    def __init__(self, checkpoint: UpdateCheckpoint, batch_size: int | None = None,
+                 poll_interval: float | None = None):
+        self.checkpoint = checkpoint
+        self.batch_size = batch_size or settings.BOT_WEBHOOK_BATCH_SIZE
+        self.poll_interval = poll_interval if poll_interval is not None else settings.BOT_WEBHOOK_POLL_INTERVAL
+        self._cleaned_up_to: int | None = None
+
+    async def fetch(self, offset: int) -> list[UpdateObj]:
+        """Пачка принятых обновлений начиная с offset, при пустой очереди - после паузы"""
+        updates = await asyncio.to_thread(self._fetch_in_thread, offset)
+        if not updates:
+            await asyncio.sleep(self.poll_interval)
+        return updates
+
+    def _fetch_in_thread(self, offset: int) -> list[UpdateObj]:
+        close_old_connections()
+        try:
+            return self.fetch_sync(offset)
+        finally:
+            close_old_connections()
+
+    def fetch_sync(self, offset: int) -> list[UpdateObj]:
+        saved = self.checkpoint.update_id
+        if saved is not None and saved != self._cleaned_up_to:
+            WebhookUpdate.objects.filter(update_id__lte=saved).delete()
+            self._cleaned_up_to = saved
+        payloads = (WebhookUpdate.objects.filter(update_id__gte=offset).order_by('update_id')
+                    .values_list('payload', flat=True)[:self.batch_size])
+        return [UpdateObj.model_validate(payload) for payload in payloads]
@@ -0,0 +1,109 @@
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from rest_framework.request import Request
+
+from goals.events import publish_goals_changed
+from goals.membership import get_membership
+from goals.models import Category, Goal, Comment, DeletedObject
+from goals.search import update_search_vector
+from goals.serializers import GoalBatchItemSerializer
+from goals.versions import bump_board_versions
+
+'''
+Пакетное создание и изменение целей.
+Каждая операция валидируется отдельно, ошибки возвращаются по индексу операции.
+Права проверяются по ролям пользователя, загруженным один раз на запрос,
+категории и изменяемые цели читаются одним запросом на всю пачку,
+а запись идет через bulk_create/bulk_update в одной транзакции.
+'''
+
+
+def apply_goal_batch(request: Request, operations: list[dict]) -> list[dict]:
+    membership = get_membership(request)
+    results: list[dict | None] = [None] * len(operations)
+    valid: dict[int, dict] = {}
+
+    for index, operation in enumerate(operations):
+        serializer = GoalBatchItemSerializer(data=operation)
+        if serializer.is_valid():
+            valid[index] = serializer.validated_data
+        else:
+            results[index] = {'index': index, 'errors': serializer.errors}
+
+    category_ids = {attrs['category'] for attrs in valid.values() if 'category' in attrs}
+    categories = Category.objects.filter(id__in=category_ids, is_deleted=False).in_bulk()
+    goal_ids = {attrs['id'] for attrs in valid.values() if 'id' in attrs}
+    goals = Goal.objects.filter(
+        id__in=goal_ids, board_id__in=list(membership.write_roles),
+    ).exclude(status=Goal.Status.archived).in_bulk()
+
+    now = timezone.now()
+    to_create: dict[int, Goal] = {}
+    to_update: dict[int, Goal] = {}
+    update_fields = {'updated'}
+
+    for index, attrs in valid.items():
+        attrs = dict(attrs)
+        goal_id = attrs.pop('id', None)
+        if 'category' in attrs:
+            category = categories.get(attrs.pop('category'))
+            if category is None:
+                results[index] = {'index': index, 'errors': {'category': ['Category not exists']}}
+                continue
+            if not membership.can_write(category.board_id):
+                results[index] = {'index': index, 'errors': {'category': ['Permission denied']}}
+                continue
+            attrs['category'] = category
+            attrs['board_id'] = category.board_id
+
+        if goal_id is None:
+            to_create[index] = Goal(user=request.user, created=now, updated=now, **attrs)
+            continue
+
+        goal = goals.get(goal_id)
+        if goal is None:
+            results[index] = {'index': index, 'errors': {'id': ['Goal not exists']}}
+            continue
+        if not membership.can_write(goal.board_id):
+            results[index] = {'index': index, 'errors': {'id': ['Permission denied']}}
+            continue
+        for field, value in attrs.items():
+            setattr(goal, field, value)
+        goal.updated = now
+        update_fields.update('board' if field == 'board_id' else field for field in attrs)
+        to_update[index] = goal
+
+    with transaction.atomic():
+        Goal.objects.bulk_create(to_create.values())
+        if to_update:
+            Goal.objects.bulk_update(to_update.values(), fields=sorted(update_fields))
+            moved = {goal.id: goal._loaded_board_id for goal in to_update.values()
+                     if goal._loaded_board_id is not None and goal._loaded_board_id != goal.board_id}
+            if moved:
+                # для старых досок записываем, что цели и их комментарии с них пропали
+                DeletedObject.objects.bulk_create(
+                    [DeletedObject(kind=DeletedObject.Kind.goal, object_id=goal_id, board_id=board_id, updated=now)
+                     for goal_id, board_id in moved.items()]
+                    + [DeletedObject(kind=DeletedObject.Kind.comment, object_id=comment_id, board_id=moved[goal_id],
+                                     updated=now)
+                       for comment_id, goal_id in Comment.objects.filter(goal_id__in=moved).values_list('id', 'goal_id')]
+                )
+            if 'board' in update_fields:
+                # цели могли перейти на другую доску - комментарии следуют за ними
+                Comment.objects.filter(goal_id__in=[goal.id for goal in to_update.values()]).update(
+                    board_id=Subquery(Goal.objects.filter(id=OuterRef('goal_id')).values('board_id')[:1]),
+                    updated=now,
+                )
+        # bulk-операции не отправляют сигналы, поэтому поисковый вектор, версии досок и события обновляем сами
+        update_search_vector(goal.id for goal in [*to_create.values(), *to_update.values()])
+        board_ids = ({goal.board_id for goal in to_create.values()}
+                     | {board_id for goal in to_update.values() for board_id in (goal.board_id, goal._loaded_board_id)})
+        bump_board_versions(board_ids)
+        publish_goals_changed(board_ids)
+
+    for index, goal in to_create.items():
+        results[index] = {'index': index, 'id': goal.id, 'result': 'created'}
+    for index, goal in to_update.items():
+        results[index] = {'index': index, 'id': goal.id, 'result': 'updated'}
+    return results
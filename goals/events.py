@@ -0,0 +1,157 @@
+import asyncio
+import json
+import logging
+
+import psycopg2
+from django.conf import settings
+from django.db import connection, connections
+
+logger = logging.getLogger(__name__)
+
+'''
+События изменений досок для клиентов (SSE, goals.views.BoardEventsView).
+Запись публикует компактное событие {"board": id, "type": "goal.created", "id": 5} через pg_notify
+в своей транзакции: Postgres доставляет уведомление только после коммита и никогда - после отката.
+Каждый процесс ASGI сервера держит одно соединение с LISTEN (BoardEventHub) и раздает события
+подписчикам своей доски, поэтому все процессы видят одни и те же события без внешнего брокера.
+Событие только сообщает, что изменилось; сами данные клиент забирает через goals/sync.
+Если подписчик не успевает читать или соединение LISTEN переподключалось, ему приходит resync.
+Хаб живет в цикле событий процесса, поэтому потоки отдаются только под ASGI сервером
+(uvicorn todolist.asgi:application), под WSGI у каждого запроса был бы свой цикл.
+'''
+
+RESYNC = {'type': 'resync'}
+
+
+def publish_board_events(events: list[dict]) -> None:
+    """Публикует события одним запросом, они будут доставлены после коммита текущей транзакции"""
+    if not events:
+        return
+    payloads = [json.dumps(event, separators=(',', ':')) for event in events]
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_notify(%s, payload) FROM unnest(%s::text[]) AS payload',
+                       [settings.BOARD_EVENTS_CHANNEL, payloads])
+
+
+def publish_board_event(board_id: int, event_type: str, object_id: int | None = None) -> None:
+    event = {'board': board_id, 'type': event_type}
+    if object_id is not None:
+        event['id'] = object_id
+    publish_board_events([event])
+
+
+def publish_goals_changed(board_ids) -> None:
+    """Для bulk-операций: одно событие на доску вместо события на каждую цель"""
+    publish_board_events([{'board': board_id, 'type': 'goals.changed'}
+                          for board_id in sorted({board_id for board_id in board_ids if board_id is not None})])
+
+
+class BoardEventHub:
+    """
+    Соединение LISTEN процесса и подписчики по доскам.
+    Уведомления читаются в цикле событий (add_reader по сокету соединения), без отдельного потока.
+    """
+
+    reconnect_delay = 1.0
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.subscribers: dict[int, set[asyncio.Queue]] = {}
+        self.conn = None
+        self._connecting: asyncio.Task | None = None
+
+    async def subscribe(self, board_id: int) -> asyncio.Queue:
+        await self._ensure_connected()
+        queue = asyncio.Queue(maxsize=settings.BOARD_EVENTS_QUEUE_SIZE)
+        self.subscribers.setdefault(board_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, board_id: int, queue: asyncio.Queue) -> None:
+        queues = self.subscribers.get(board_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[board_id]
+
+    async def _ensure_connected(self) -> None:
+        if self.conn is not None:
+            return
+        if self._connecting is None or self._connecting.done():
+            self._connecting = self.loop.create_task(self._connect())
+        await asyncio.shield(self._connecting)
+
+    async def _connect(self) -> None:
+        def connect():
+            conn = psycopg2.connect(**connections['default'].get_connection_params())
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(f'LISTEN {settings.BOARD_EVENTS_CHANNEL}')
+            return conn
+
+        self.conn = await asyncio.to_thread(connect)
+        self.loop.add_reader(self.conn.fileno(), self._on_readable)
+
+    def _on_readable(self) -> None:
+        try:
+            self.conn.poll()
+        except psycopg2.Error:
+            logger.exception('Board events connection lost')
+            self._disconnect()
+            self.loop.create_task(self._reconnect())
+            return
+        while self.conn.notifies:
+            notify = self.conn.notifies.pop(0)
+            try:
+                event = json.loads(notify.payload)
+            except ValueError:
+                logger.warning('Skip board event: %s', notify.payload[:200])
+                continue
+            self.deliver(event)
+
+    def deliver(self, event: dict) -> None:
+        for queue in self.subscribers.get(event.get('board'), ()):
+            self._put(queue, event)
+
+    @staticmethod
+    def _put(queue: asyncio.Queue, event: dict) -> None:
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # подписчик отстал: события заменяются одним resync
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(RESYNC)
+
+    def _disconnect(self) -> None:
+        if self.conn is not None:
+            self.loop.remove_reader(self.conn.fileno())
+            self.conn.close()
+            self.conn = None
+
+    async def _reconnect(self) -> None:
+        while self.conn is None:
+            await asyncio.sleep(self.reconnect_delay)
+            try:
+                await self._ensure_connected()
+            except psycopg2.Error:
+                logger.exception('Failed to reconnect board events listener')
+        # пока соединения не было, события могли потеряться
+        for queues in self.subscribers.values():
+            for queue in queues:
+                self._put(queue, RESYNC)
+
+    def close(self) -> None:
+        self._disconnect()
+
+
+_hub: BoardEventHub | None = None
+
+
+def get_event_hub() -> BoardEventHub:
+    """Хаб для цикла событий текущего процесса ASGI сервера"""
+    global _hub
+    if _hub is None or _hub.loop is not asyncio.get_running_loop():
+        if _hub is not None:
+            _hub.close()
+        _hub = BoardEventHub()
+    return _hub
@@ -0,0 +1,95 @@
+import csv
+import datetime
+import io
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from goals.models import Category, Goal, Comment
+
+'''
+Выгрузка доски целиком: категории, цели и комментарии в NDJSON или CSV.
+Строки читаются серверным курсором (iterator) частями по EXPORT_CHUNK_SIZE, только нужные поля
+через values(), и сразу уходят клиенту буферами по EXPORT_BUFFER_SIZE байт,
+поэтому память не зависит от размера доски, а выгрузка идет одним проходом без COUNT и OFFSET.
+Под ASGI буферы читаются из синхронного генератора через sync_to_async в одном потоке,
+чтобы серверный курсор оставался на своем соединении.
+'''
+
+EXPORT_FIELDS = {
+    'category': (Category, ('id', 'title', 'user_id', 'is_deleted', 'created', 'updated')),
+    'goal': (Goal, ('id', 'category_id', 'title', 'description', 'due_date', 'status', 'priority', 'user_id',
+                    'created', 'updated')),
+    'comment': (Comment, ('id', 'goal_id', 'text', 'user_id', 'created', 'updated')),
+}
+
+CSV_COLUMNS = ['type', 'id', 'category_id', 'goal_id', 'title', 'description', 'text', 'due_date', 'status',
+               'priority', 'is_deleted', 'user_id', 'created', 'updated']
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def export_rows(board_id: int):
+    """Строки доски по порядку: категории, затем цели, затем комментарии"""
+    for row_type, (model, fields) in EXPORT_FIELDS.items():
+        rows = model.objects.filter(board_id=board_id).order_by().values(*fields)
+        for row in rows.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE):
+            yield {'type': row_type, **row}
+
+
+def _buffered(lines):
+    buffer, size = [], 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= settings.EXPORT_BUFFER_SIZE:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def _encode_value(value):
+    # isoformat, а не DjangoJSONEncoder: он обрезает время до миллисекунд
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+def ndjson_chunks(board_id: int):
+    return _buffered(json.dumps(row, default=_encode_value, ensure_ascii=False, separators=(',', ':')) + '\n'
+                     for row in export_rows(board_id))
+
+
+def csv_chunks(board_id: int):
+    def lines():
+        output = io.StringIO()
+        writer = csv.DictWriter(output, fieldnames=CSV_COLUMNS)
+        writer.writeheader()
+        for row in export_rows(board_id):
+            writer.writerow(row)
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+        yield output.getvalue()
+
+    return _buffered(lines())
+
+
+def export_chunks(board_id: int, export_format: str):
+    return ndjson_chunks(board_id) if export_format == 'ndjson' else csv_chunks(board_id)
+
+
+async def aiter_chunks(chunks):
+    """Асинхронная обертка: каждый буфер читается в потоке thread_sensitive, как и остальной ORM"""
+    get_next = sync_to_async(next, thread_sensitive=True)
+    sentinel = object()
+    try:
+        while (chunk := await get_next(chunks, sentinel)) is not sentinel:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close, thread_sensitive=True)()
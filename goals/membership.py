@@ -0,0 +1,173 @@
+import threading
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.request import Request
+
+from core.models import User
+from goals.models import BoardParticipant
+
+WRITE_ROLES = (BoardParticipant.Role.owner, BoardParticipant.Role.writer)
+
+'''
+Кэш ролей пользователя на досках в два уровня:
+- L1 - локальный кэш процесса (locmem) с коротким TTL,
+- L2 - общий кэш (например, redis), подключается настройкой BOARD_ROLES_L2_CACHE.
+Роли в L2 лежат под ключом с версией пользователя. При изменении участников доски версия
+меняется (сразу и еще раз после коммита), поэтому запрос, прочитавший из БД старые роли
+до коммита, кладет их под старую версию, и их больше никто не прочитает.
+Ключ пользователя в L1 удаляется, в L1 других процессов запись живет не дольше своего TTL.
+Кэш служит только для чтения: права на запись (can_write, is_owner) проверяются по ролям из БД.
+'''
+
+_stats: Counter = Counter()
+_stats_lock = threading.Lock()
+
+
+def _count(name: str) -> None:
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def role_cache_stats() -> dict[str, int]:
+    with _stats_lock:
+        return {name: _stats[name] for name in ('l1_hits', 'l2_hits', 'misses')}
+
+
+def _roles_key(user_id: int) -> str:
+    return f'board-roles:{user_id}'
+
+
+def _version_key(user_id: int) -> str:
+    return f'board-roles-version:{user_id}'
+
+
+def _role_caches() -> list:
+    aliases = [settings.BOARD_ROLES_L1_CACHE, settings.BOARD_ROLES_L2_CACHE]
+    return [caches[alias] for alias in aliases if alias]
+
+
+def _roles_version(cache, user_id: int) -> str:
+    """
+    Текущая версия ролей пользователя в L2. Версия случайная, а не счетчик:
+    если ключ версии вытеснен, новая версия не совпадет ни с одной из прежних.
+    """
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex)
+        version = cache.get(key)
+    return version
+
+
+def load_board_roles(user_id: int) -> dict[int, int]:
+    """Роли пользователя {board_id: role} из БД, без кэша"""
+    return dict(BoardParticipant.objects.filter(user_id=user_id).values_list('board_id', 'role'))
+
+
+def get_board_roles(user_id: int) -> dict[int, int]:
+    """Роли пользователя {board_id: role}: из L1, затем из L2, затем из БД"""
+    key = _roles_key(user_id)
+    l1, *l2 = _role_caches()
+
+    roles = l1.get(key)
+    if roles is not None:
+        _count('l1_hits')
+        return roles
+
+    l2_key = None
+    if l2:
+        # версия читается до запроса в БД: если роли поменяются после него, версия уже будет другой
+        l2_key = f'{key}:{_roles_version(l2[0], user_id)}'
+        roles = l2[0].get(l2_key)
+        if roles is not None:
+            _count('l2_hits')
+            l1.set(key, roles)
+            return roles
+
+    _count('misses')
+    roles = load_board_roles(user_id)
+    l1.set(key, roles)
+    if l2_key is not None:
+        l2[0].set(l2_key, roles)
+    return roles
+
+
+def invalidate_board_roles(*user_ids: int) -> None:
+    """
+    Меняет версию ролей пользователей сразу и еще раз после коммита транзакции,
+    чтобы роли, прочитанные параллельным запросом до коммита, остались под устаревшей версией.
+    """
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+
+    def _invalidate():
+        l1, *l2 = _role_caches()
+        l1.delete_many([_roles_key(user_id) for user_id in user_ids])
+        if l2:
+            l2[0].set_many({_version_key(user_id): uuid.uuid4().hex for user_id in user_ids}, timeout=None)
+
+    _invalidate()
+    transaction.on_commit(_invalidate)
+
+
+class BoardMembership:
+    """
+    Роли пользователя на досках в виде словаря {board_id: role}.
+    Словарь загружается один раз при первом обращении (из кэша ролей или БД),
+    дальше все проверки прав на чтение читают его из памяти.
+    Права на запись проверяются по ролям из БД, они тоже загружаются один раз на запрос.
+    """
+
+    def __init__(self, user: User):
+        self.user = user
+        self._roles: dict[int, int] | None = None
+        self._write_roles: dict[int, int] | None = None
+
+    @property
+    def roles(self) -> dict[int, int]:
+        if self._roles is None:
+            self._roles = get_board_roles(self.user.id) if self.user.is_authenticated else {}
+        return self._roles
+
+    @property
+    def write_roles(self) -> dict[int, int]:
+        if self._write_roles is None:
+            self._write_roles = load_board_roles(self.user.id) if self.user.is_authenticated else {}
+        return self._write_roles
+
+    @property
+    def board_ids(self) -> list[int]:
+        return list(self.roles)
+
+    def role(self, board_id: int) -> int | None:
+        return self.roles.get(board_id)
+
+    def can_read(self, board_id: int) -> bool:
+        return board_id in self.roles
+
+    def can_write(self, board_id: int) -> bool:
+        return self.write_roles.get(board_id) in WRITE_ROLES
+
+    def writable_board_ids(self) -> list[int]:
+        return [board_id for board_id, role in self.write_roles.items() if role in WRITE_ROLES]
+
+    def is_owner(self, board_id: int) -> bool:
+        return self.write_roles.get(board_id) == BoardParticipant.Role.owner
+
+    def reset(self) -> None:
+        self._roles = None
+        self._write_roles = None
+
+
+def get_membership(request: Request) -> BoardMembership:
+    """Один BoardMembership на запрос: его используют и permissions, и сериализаторы"""
+    membership: BoardMembership | None = getattr(request, '_board_membership', None)
+    if membership is None or membership.user != request.user:
+        membership = BoardMembership(request.user)
+        request._board_membership = membership
+    return membership
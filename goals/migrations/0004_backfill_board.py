@@ -0,0 +1,39 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+BATCH_SIZE = 5000
+
+
+def _backfill(model, source_queryset) -> None:
+    # обновляем пачками по id, чтобы не держать блокировку на всей таблице
+    last_id = 0
+    while True:
+        ids = list(
+            model.objects.filter(id__gt=last_id, board__isnull=True)
+            .order_by('id').values_list('id', flat=True)[:BATCH_SIZE]
+        )
+        if not ids:
+            break
+        model.objects.filter(id__in=ids).update(board_id=Subquery(source_queryset.values('board_id')[:1]))
+        last_id = ids[-1]
+
+
+def backfill_board(apps, schema_editor):
+    Category = apps.get_model('goals', 'Category')
+    Goal = apps.get_model('goals', 'Goal')
+    Comment = apps.get_model('goals', 'Comment')
+
+    _backfill(Goal, Category.objects.filter(id=OuterRef('category_id')))
+    _backfill(Comment, Goal.objects.filter(id=OuterRef('goal_id')))
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('goals', '0003_goal_board_comment_board'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_board, migrations.RunPython.noop),
+    ]
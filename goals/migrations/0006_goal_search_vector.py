@@ -0,0 +1,56 @@
+# Generated by Django 4.2.2 on 2026-10-17 19:40
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery, TextField, Value
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 5000
+
+
+def fill_search_vector(apps, schema_editor):
+    Goal = apps.get_model('goals', 'Goal')
+    Comment = apps.get_model('goals', 'Comment')
+
+    comments = (
+        Comment.objects.filter(goal_id=OuterRef('pk')).order_by().values('goal_id')
+        .annotate(text=StringAgg('text', delimiter=' ')).values('text')
+    )
+    vector = (
+        SearchVector('title', weight='A', config=settings.SEARCH_CONFIG)
+        + SearchVector('description', weight='B', config=settings.SEARCH_CONFIG)
+        + SearchVector(Coalesce(Subquery(comments), Value(''), output_field=TextField()), weight='C', config=settings.SEARCH_CONFIG)
+    )
+
+    last_id = 0
+    while True:
+        ids = list(Goal.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:BATCH_SIZE])
+        if not ids:
+            break
+        Goal.objects.filter(id__in=ids).update(search_vector=vector)
+        last_id = ids[-1]
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('goals', '0005_alter_goal_board_alter_comment_board'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='goal',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_search_vector, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='goal',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='goal_search_vector'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.2 on 2026-10-17 19:50
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0006_goal_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='board',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='board_title_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='category_title_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.2 on 2026-10-17 19:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0008_board_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['board', 'updated', 'id'], name='category_board_updated'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['board', 'updated', 'id'], name='comment_board_updated'),
+        ),
+        migrations.AddIndex(
+            model_name='goal',
+            index=models.Index(fields=['board', 'updated', 'id'], name='goal_board_updated'),
+        ),
+    ]
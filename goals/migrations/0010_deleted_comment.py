@@ -0,0 +1,28 @@
+# Generated by Django 4.2.2 on 2026-10-17 20:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0009_sync_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedComment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('comment_id', models.BigIntegerField(verbose_name='Комментарий')),
+                ('updated', models.DateTimeField(verbose_name='Дата удаления')),
+                ('board', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deleted_comments', to='goals.board', verbose_name='Доска')),
+            ],
+            options={
+                'verbose_name': 'Удаленный комментарий',
+                'verbose_name_plural': 'Удаленные комментарии',
+                'indexes': [models.Index(fields=['board', 'updated', 'id'], name='deleted_comment_board_updated')],
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.2 on 2026-10-17 21:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0010_deleted_comment'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='deletedcomment',
+            name='deleted_comment_board_updated',
+        ),
+        migrations.RenameModel(
+            old_name='DeletedComment',
+            new_name='DeletedObject',
+        ),
+        migrations.AlterModelOptions(
+            name='deletedobject',
+            options={'verbose_name': 'Удаленный объект', 'verbose_name_plural': 'Удаленные объекты'},
+        ),
+        migrations.RenameField(
+            model_name='deletedobject',
+            old_name='comment_id',
+            new_name='object_id',
+        ),
+        migrations.AlterField(
+            model_name='deletedobject',
+            name='object_id',
+            field=models.BigIntegerField(verbose_name='Объект'),
+        ),
+        # существующие записи - об удаленных комментариях
+        migrations.AddField(
+            model_name='deletedobject',
+            name='kind',
+            field=models.CharField(choices=[('category', 'Категория'), ('goal', 'Цель'), ('comment', 'Комментарий')],
+                                   default='comment', max_length=16, verbose_name='Тип'),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='deletedobject',
+            name='board',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deleted_objects',
+                                    to='goals.board', verbose_name='Доска'),
+        ),
+        migrations.AddIndex(
+            model_name='deletedobject',
+            index=models.Index(fields=['board', 'updated', 'id'], name='deleted_object_board_updated'),
+        ),
+    ]
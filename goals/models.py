@@ -1,3 +1,5 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.utils import timezone
 from core.models import User
@@ -21,9 +23,15 @@ class Board(DatesModelMixin):
     class Meta:
         verbose_name = "Доска"
         verbose_name_plural = "Доски"
+        indexes = [
+            # триграммный индекс для автодополнения: ILIKE 'abc%' и нечеткое совпадение
+            GinIndex(fields=["title"], name="board_title_trgm", opclasses=["gin_trgm_ops"]),
+        ]
 
     title = models.CharField(verbose_name="Название", max_length=255)
     is_deleted = models.BooleanField(verbose_name="Удалена", default=False)
+    # растет при любом изменении доски, ее участников, категорий, целей и комментариев (goals.versions)
+    version = models.PositiveBigIntegerField(verbose_name="Версия", default=0, editable=False)
 
 
 class BoardParticipant(DatesModelMixin):
@@ -31,6 +39,10 @@ class BoardParticipant(DatesModelMixin):
         unique_together = ("board", "user")
         verbose_name = "Участник"
         verbose_name_plural = "Участники"
+        indexes = [
+            # роли пользователя {board_id: role} читаются одним index-only scan
+            models.Index(fields=["user", "board", "role"], name="participant_user_board_role"),
+        ]
 
     class Role(models.IntegerChoices):
         owner = 1, "Владелец"
@@ -68,6 +80,38 @@ class Category(DatesModelMixin):
     class Meta:
         verbose_name = "Категория"
         verbose_name_plural = "Категории"
+        indexes = [
+            models.Index(fields=["board", "title"], name="category_board_title",
+                         condition=models.Q(is_deleted=False)),
+            GinIndex(fields=["title"], name="category_title_trgm", opclasses=["gin_trgm_ops"]),
+            # изменения досок после курсора синхронизации (goals.sync)
+            models.Index(fields=["board", "updated", "id"], name="category_board_updated"),
+        ]
+
+    _loaded_board_id = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_board_id = instance.__dict__.get("board_id")
+        return instance
+
+    def save(self, *args, **kwargs):
+        result = super().save(*args, **kwargs)
+        # при переносе категории на другую доску переносим и board_id ее целей и комментариев,
+        # а для старой доски записываем, что они с нее пропали
+        if self._loaded_board_id is not None and self._loaded_board_id != self.board_id:
+            goals = Goal.objects.filter(category=self)
+            comments = Comment.objects.filter(goal__category=self)
+            DeletedObject.record(DeletedObject.Kind.category, [self.pk], self._loaded_board_id, self.updated)
+            DeletedObject.record(DeletedObject.Kind.goal, goals.values_list('id', flat=True),
+                                 self._loaded_board_id, self.updated)
+            DeletedObject.record(DeletedObject.Kind.comment, comments.values_list('id', flat=True),
+                                 self._loaded_board_id, self.updated)
+            goals.update(board_id=self.board_id, updated=self.updated)
+            comments.update(board_id=self.board_id, updated=self.updated)
+        self._loaded_board_id = self.board_id
+        return result
 
 
 class Goal(DatesModelMixin):
@@ -86,23 +130,109 @@ class Goal(DatesModelMixin):
     title = models.CharField(verbose_name="Текст комментария", max_length=255)
     description = models.TextField(blank=True)
     category = models.ForeignKey(Category, on_delete=models.PROTECT)
+    # денормализованная доска категории: проверка доступа к цели без join через категорию
+    board = models.ForeignKey(Board, verbose_name="Доска", on_delete=models.PROTECT, related_name="goals",
+                              editable=False)
     due_date = models.DateField(null=True, blank=True)
     user = models.ForeignKey(User, on_delete=models.PROTECT)
     status = models.PositiveSmallIntegerField(verbose_name="Статус", choices=Status.choices, default=Status.to_do)
     priority = models.PositiveSmallIntegerField(verbose_name="Приоритет", choices=Priority.choices,
                                                 default=Priority.medium)
     is_deleted = models.BooleanField(default=False)
+    # tsvector по названию, описанию и тексту комментариев, обновляется в goals.search
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         verbose_name = "Цель"
         verbose_name_plural = "Цели"
+        # частичные индексы только по неархивным целям - именно их выбирают списки и фильтры
+        indexes = [
+            models.Index(fields=["category", "status"], name="goal_category_status",
+                         condition=~models.Q(status=4)),
+            models.Index(fields=["category", "title"], name="goal_category_title",
+                         condition=~models.Q(status=4)),
+            models.Index(fields=["category", "created"], name="goal_category_created",
+                         condition=~models.Q(status=4)),
+            models.Index(fields=["category", "due_date"], name="goal_category_due_date",
+                         condition=~models.Q(status=4)),
+            models.Index(fields=["board", "title"], name="goal_board_title",
+                         condition=~models.Q(status=4)),
+            GinIndex(fields=["search_vector"], name="goal_search_vector"),
+            models.Index(fields=["board", "updated", "id"], name="goal_board_updated"),
+        ]
+
+    _loaded_board_id = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_board_id = instance.__dict__.get("board_id")
+        return instance
+
+    def save(self, *args, **kwargs):
+        # доска цели всегда совпадает с доской ее категории
+        self.board_id = self.category.board_id
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "category" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "board"}
+        result = super().save(*args, **kwargs)
+        # цель перенесли в категорию другой доски - переносим и ее комментарии
+        if self._loaded_board_id is not None and self._loaded_board_id != self.board_id:
+            comments = Comment.objects.filter(goal=self)
+            DeletedObject.record(DeletedObject.Kind.goal, [self.pk], self._loaded_board_id, self.updated)
+            DeletedObject.record(DeletedObject.Kind.comment, comments.values_list('id', flat=True),
+                                 self._loaded_board_id, self.updated)
+            comments.update(board_id=self.board_id, updated=self.updated)
+        self._loaded_board_id = self.board_id
+        return result
 
 
 class Comment(DatesModelMixin):
     user = models.ForeignKey(User, on_delete=models.PROTECT)
     goal = models.ForeignKey(Goal, on_delete=models.PROTECT)
+    board = models.ForeignKey(Board, verbose_name="Доска", on_delete=models.PROTECT, related_name="comments",
+                              editable=False)
     text = models.TextField()
 
     class Meta:
         verbose_name = "Комментарий"
         verbose_name_plural = "Комментарии"
+        indexes = [
+            models.Index(fields=["goal", "created"], name="comment_goal_created"),
+            models.Index(fields=["board", "updated", "id"], name="comment_board_updated"),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.board_id = self.goal.board_id
+        return super().save(*args, **kwargs)
+
+
+class DeletedObject(models.Model):
+    """
+    Запись для синхронизации клиентов (goals.sync) о том, что объект пропал с доски:
+    комментарий удален из БД, а категория, цель или комментарий перенесены на другую доску.
+    Изменения выбираются по доскам пользователя, поэтому без нее клиент, не видящий новую доску,
+    так и хранил бы копию объекта.
+    """
+    class Kind(models.TextChoices):
+        category = "category", "Категория"
+        goal = "goal", "Цель"
+        comment = "comment", "Комментарий"
+
+    kind = models.CharField(verbose_name="Тип", max_length=16, choices=Kind.choices)
+    object_id = models.BigIntegerField(verbose_name="Объект")
+    board = models.ForeignKey(Board, verbose_name="Доска", on_delete=models.CASCADE, related_name="deleted_objects")
+    # время удаления или переноса, по нему и по id записи идет keyset синхронизации, как у остальных моделей
+    updated = models.DateTimeField(verbose_name="Дата удаления")
+
+    class Meta:
+        verbose_name = "Удаленный объект"
+        verbose_name_plural = "Удаленные объекты"
+        indexes = [
+            models.Index(fields=["board", "updated", "id"], name="deleted_object_board_updated"),
+        ]
+
+    @classmethod
+    def record(cls, kind: str, object_ids, board_id: int, updated) -> None:
+        cls.objects.bulk_create(cls(kind=kind, object_id=object_id, board_id=board_id, updated=updated)
+                                for object_id in object_ids)
@@ -0,0 +1,190 @@
+import base64
+import datetime
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+class CursorLimitOffsetPagination(LimitOffsetPagination):
+    '''
+    По умолчанию работает как обычная пагинация limit/offset.
+    - ?cursor= (пустой для первой страницы) включает keyset-пагинацию: следующая страница
+      выбирается условием WHERE по полям сортировки (+ id для однозначности), а не OFFSET,
+      и COUNT(*) не выполняется. Курсор непрозрачный - это base64 от значений последней строки.
+    - ?count=false в режиме limit/offset отключает COUNT(*): берется limit + 1 строка,
+      чтобы узнать, есть ли следующая страница.
+    '''
+
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    cursor_default_limit = 50
+    invalid_cursor_message = 'Invalid cursor'
+
+    mode = 'offset'
+
+    def paginate_queryset(self, queryset: QuerySet, request: Request, view=None):
+        self.request = request
+        if self.cursor_query_param in request.query_params:
+            self.mode = 'cursor'
+            return self.paginate_keyset(queryset, request)
+        if request.query_params.get(self.count_query_param, '').lower() in ('false', '0'):
+            self.mode = 'no_count'
+            return self.paginate_without_count(queryset, request)
+        self.mode = 'offset'
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data) -> Response:
+        if self.mode == 'offset':
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_next_link(self) -> str | None:
+        if self.mode == 'cursor':
+            return self._cursor_link(self.next_position, reverse=False)
+        if self.mode == 'no_count':
+            if not self.has_next:
+                return None
+            url = self.request.build_absolute_uri()
+            url = replace_query_param(url, self.limit_query_param, self.limit)
+            return replace_query_param(url, self.offset_query_param, self.offset + self.limit)
+        return super().get_next_link()
+
+    def get_previous_link(self) -> str | None:
+        if self.mode == 'cursor':
+            return self._cursor_link(self.previous_position, reverse=True)
+        return super().get_previous_link()
+
+    # limit/offset без COUNT(*)
+
+    def paginate_without_count(self, queryset: QuerySet, request: Request):
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.offset = self.get_offset(request)
+        self.count = None
+        page = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(page) > self.limit
+        return page[:self.limit]
+
+    # keyset
+
+    def paginate_keyset(self, queryset: QuerySet, request: Request):
+        self.limit = self.get_limit(request) or self.cursor_default_limit
+        self.ordering = self.get_keyset_ordering(queryset)
+        self.model = queryset.model
+        position, reverse = self.decode_cursor(request)
+
+        ordering = [self._order_by(name, desc != reverse) for name, desc in self.ordering]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._keyset_filter(position, reverse))
+
+        page = list(queryset[:self.limit + 1])
+        has_more = len(page) > self.limit
+        page = page[:self.limit]
+        if reverse:
+            page.reverse()
+
+        # при движении назад следующая страница есть всегда - мы пришли с нее
+        if reverse:
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+        self.next_position = self._position(page[-1]) if page and has_next else None
+        self.previous_position = self._position(page[0]) if page and has_previous else None
+        return page
+
+    @staticmethod
+    def get_keyset_ordering(queryset: QuerySet) -> list[tuple[str, bool]]:
+        ordering = []
+        for field in queryset.query.order_by:
+            if not isinstance(field, str) or field == '?':
+                continue
+            ordering.append((field.lstrip('-'), field.startswith('-')))
+        if not any(name in ('id', 'pk') for name, _ in ordering):
+            ordering.append(('id', False))
+        return ordering
+
+    @staticmethod
+    def _order_by(name: str, desc: bool) -> str:
+        return f'-{name}' if desc else name
+
+    def _keyset_filter(self, position: list, reverse: bool) -> Q:
+        # (a, b, id) > (x, y, z) раскрывается в a > x OR (a = x AND b > y) OR (a = x AND b = y AND id > z)
+        condition = Q()
+        for index, (name, desc) in enumerate(self.ordering):
+            lookup = 'lt' if desc != reverse else 'gt'
+            step = Q(**{f'{name}__{lookup}': position[index]})
+            for prev_index, (prev_name, _) in enumerate(self.ordering[:index]):
+                step &= Q(**{prev_name: position[prev_index]})
+            condition |= step
+        return condition
+
+    def _position(self, obj) -> list:
+        position = []
+        for name, _ in self.ordering:
+            try:
+                attname = obj._meta.get_field(name).attname
+            except FieldDoesNotExist:
+                attname = name
+            position.append(getattr(obj, attname))
+        return position
+
+    def decode_cursor(self, request: Request) -> tuple[list | None, bool]:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            position, reverse = cursor['p'], bool(cursor['r'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return self._parse_position(position), reverse
+
+    def _parse_position(self, position: list) -> list:
+        # значения из курсора приводятся к типам полей, иначе подмененный курсор дошел бы до SQL
+        parsed = []
+        for (name, _), value in zip(self.ordering, position):
+            if value is None:
+                raise NotFound(self.invalid_cursor_message)
+            try:
+                field = self.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                parsed.append(value)
+                continue
+            try:
+                parsed.append(field.to_python(value))
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+        return parsed
+
+    @staticmethod
+    def _encode_value(value):
+        # isoformat, а не DjangoJSONEncoder: он обрезает микросекунды, и keyset повторял или пропускал строки
+        if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+            return value.isoformat()
+        return str(value)
+
+    def encode_cursor(self, position: list, reverse: bool) -> str:
+        data = json.dumps({'p': position, 'r': int(reverse)}, default=self._encode_value, separators=(',', ':'))
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def _cursor_link(self, position: list | None, reverse: bool) -> str | None:
+        if position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.offset_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(position, reverse))
@@ -1,9 +1,9 @@
-from typing import Any
 from rest_framework.generics import GenericAPIView
 from rest_framework.permissions import IsAuthenticated, SAFE_METHODS
 from rest_framework.request import Request
 
-from goals.models import Goal, Category, Comment, Board, BoardParticipant
+from goals.membership import get_membership
+from goals.models import Goal, Category, Comment, Board
 
 '''В коде мы:
 Определили метод has_object_permission, который должен вернуть True
@@ -12,6 +12,8 @@ from goals.models import Goal, Category, Comment, Board, BoardParticipant
 Если метод запроса входит в SAFE_METHODS (которые не изменяют данные, например GET), 
 то тогда просто проверяем, 
 что существует участник у данной доски.
+Роли пользователя на досках берутся из get_membership(request) -
+они загружаются один раз на запрос, а не отдельным запросом на каждую проверку.
 Если метод не входит (это значит, что мы пытаемся изменить или удалить доску), 
 то обязательно проверяем, 
 что наш текущий пользователь является создателем доски.'''
@@ -19,27 +21,27 @@ from goals.models import Goal, Category, Comment, Board, BoardParticipant
 
 class BoardPermission (IsAuthenticated):
     def has_object_permission(self, request: Request, view: GenericAPIView, obj: Board) -> bool:
-        _filters: dict[str, Any] = {'user': request.user, 'board': obj}
+        membership = get_membership(request)
         if request.method not in SAFE_METHODS:
-            _filters['role'] = BoardParticipant.Role.owner
-        return BoardParticipant.objects.filter(**_filters).exists()
+            return membership.is_owner(obj.id)
+        return membership.can_read(obj.id)
 
 
 class GoalCategoryPermission(IsAuthenticated):
     def has_object_permission(self, request: Request, view: GenericAPIView, obj: Category) -> bool:
-        _filters: dict[str, Any] = {'user': request.user, 'board': obj.board}
+        membership = get_membership(request)
         if request.method not in SAFE_METHODS:
-            _filters['role__in'] = [BoardParticipant.Role.owner, BoardParticipant.Role.writer]
-        return BoardParticipant.objects.filter(**_filters).exists()
+            return membership.can_write(obj.board_id)
+        return membership.can_read(obj.board_id)
 
 
 class GoalPermission(IsAuthenticated):
 
     def has_object_permission(self, request: Request, view: GenericAPIView, obj: Goal) -> bool:
-        _filters: dict[str, Any] = {'user': request.user, 'board': obj.category.board}
+        membership = get_membership(request)
         if request.method not in SAFE_METHODS:
-            _filters['role__in'] = [BoardParticipant.Role.owner, BoardParticipant.Role.writer]
-        return BoardParticipant.objects.filter(**_filters).exists()
+            return membership.can_write(obj.board_id)
+        return membership.can_read(obj.board_id)
 
 
 class GoalCommentPermission(IsAuthenticated):
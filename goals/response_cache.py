@@ -0,0 +1,55 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+from goals.membership import get_membership
+from goals.versions import board_versions_digest
+
+'''
+Кэш ответов небольших, редко меняющихся списков (доски, категории).
+Ключ - представление, пользователь и хэш параметров запроса с версиями его досок,
+поэтому любая запись, увеличивающая версию доски (goals.versions), и изменение набора досок
+пользователя сразу дают новый ключ, а старые записи истекают по RESPONSE_CACHE_TTL.
+Холодный ключ считает только один запрос: он берет блокировку через cache.add,
+остальные ждут его результат до RESPONSE_CACHE_LOCK_TIMEOUT секунд.
+'''
+
+
+def get_response_cache():
+    return caches[settings.RESPONSE_CACHE]
+
+
+class CachedListMixin:
+    cache_poll_interval = 0.05
+
+    def get_cache_key(self, request) -> str:
+        digest = board_versions_digest(request, get_membership(request).board_ids)
+        return f'response:{type(self).__name__}:{request.user.id}:{digest}'
+
+    def list(self, request, *args, **kwargs):
+        cache = get_response_cache()
+        key = self.get_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        lock_key = f'{key}:lock'
+        if not cache.add(lock_key, 1, timeout=settings.RESPONSE_CACHE_LOCK_TIMEOUT):
+            # ключ уже считает другой запрос - ждем его результат
+            deadline = time.monotonic() + settings.RESPONSE_CACHE_LOCK_TIMEOUT
+            while time.monotonic() < deadline:
+                time.sleep(self.cache_poll_interval)
+                data = cache.get(key)
+                if data is not None:
+                    return Response(data)
+            return super().list(request, *args, **kwargs)
+
+        try:
+            response = super().list(request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, timeout=settings.RESPONSE_CACHE_TTL)
+            return response
+        finally:
+            cache.delete(lock_key)
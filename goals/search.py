@@ -0,0 +1,71 @@
+from typing import Iterable
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector, SearchQuery, CombinedSearchVector, TrigramSimilarity
+from django.db.models import OuterRef, Subquery, TextField, Value, QuerySet, Q, Case, When, IntegerField, F, Lookup
+from django.db.models.functions import Coalesce
+
+from goals.models import Goal, Comment
+
+
+def goal_search_vector() -> CombinedSearchVector:
+    """
+    Выражение tsvector для цели: название (вес A), описание (B) и все комментарии (C).
+    Считается в БД одним UPDATE, без загрузки комментариев в память.
+    """
+    comments = (
+        Comment.objects.filter(goal_id=OuterRef('pk'))
+        .order_by()
+        .values('goal_id')
+        .annotate(text=StringAgg('text', delimiter=' '))
+        .values('text')
+    )
+    return (
+        SearchVector('title', weight='A', config=settings.SEARCH_CONFIG)
+        + SearchVector('description', weight='B', config=settings.SEARCH_CONFIG)
+        + SearchVector(Coalesce(Subquery(comments), Value(''), output_field=TextField()), weight='C', config=settings.SEARCH_CONFIG)
+    )
+
+
+def update_search_vector(goal_ids: Iterable[int]) -> None:
+    Goal.objects.filter(pk__in=list(goal_ids)).update(search_vector=goal_search_vector())
+
+
+def search_query(text: str) -> SearchQuery | None:
+    text = text.strip()
+    if not text:
+        return None
+    return SearchQuery(text, search_type='websearch', config=settings.SEARCH_CONFIG)
+
+
+class ILikePrefix(Lookup):
+    """
+    Префикс без учета регистра как title ILIKE 'text%'.
+    Стандартный istartswith компилируется в UPPER(title) LIKE UPPER('text%'),
+    а такое выражение индекс gin_trgm_ops по самому title не обслуживает.
+    """
+    lookup_name = 'ilike_prefix'
+
+    def as_sql(self, compiler, connection):
+        lhs_sql, lhs_params = self.process_lhs(compiler, connection)
+        rhs_sql, rhs_params = self.process_rhs(compiler, connection)
+        rhs_params = [connection.ops.prep_for_like_query(param) + '%' for param in rhs_params]
+        return f'{lhs_sql} ILIKE {rhs_sql}', [*lhs_params, *rhs_params]
+
+
+def autocomplete(queryset: QuerySet, text: str, limit: int) -> QuerySet:
+    """
+    Автодополнение по полю title: сначала совпадения по префиксу, затем нечеткие (pg_trgm).
+    Оба условия (ILIKE 'text%' и title % 'text') обслуживает триграммный GIN индекс по title.
+    """
+    is_prefix = ILikePrefix(F('title'), text)
+    return (
+        queryset.filter(Q(is_prefix) | Q(title__trigram_similar=text))
+        .annotate(
+            is_prefix=Case(When(is_prefix, then=0), default=1, output_field=IntegerField()),
+            similarity=TrigramSimilarity('title', text),
+        )
+        .order_by('is_prefix', '-similarity', 'title')
+        .values('id', 'title')[:limit]
+    )
@@ -1,10 +1,14 @@
+from django.conf import settings
 from django.core.exceptions import ValidationError, PermissionDenied
-from django.db import transaction
+from django.db import connection, transaction
+from django.utils import timezone
 from rest_framework import serializers
 
 from core.models import User
 from core.serializers import ProfileSerializer
-from goals.models import Category, Goal, Comment, Board, BoardParticipant
+from goals.events import publish_board_event
+from goals.membership import get_membership, invalidate_board_roles
+from goals.models import Category, Goal, Comment, Board, BoardParticipant, DeletedObject
 
 
 class BoardSerializer(serializers.ModelSerializer):
@@ -43,13 +47,28 @@ class BoardWithParticipantsSerializer(BoardSerializer):
         request_user: User = self.context['request'].user
 
         with transaction.atomic():
-            BoardParticipant.objects.filter(board=instance).exclude(user=request_user).delete()
+            # сигналы BoardParticipant сбросили бы кэш ролей, подняли версию доски и отправили событие
+            # на каждую строку, поэтому участники заменяются без сигналов, а все это делается один раз
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'DELETE FROM {BoardParticipant._meta.db_table} WHERE board_id = %s AND user_id <> %s '
+                    f'RETURNING user_id',
+                    [instance.id, request_user.id],
+                )
+                removed_user_ids = [user_id for user_id, in cursor.fetchall()]
+            # bulk_create не вызывает save(), даты проставляются здесь
+            now = timezone.now()
             participants = [
-                BoardParticipant(user=participant['user'], role=participant['role'], board=instance)
+                BoardParticipant(user=participant['user'], role=participant['role'], board=instance,
+                                 created=now, updated=now)
                 for participant in validated_data.get('participants', [])]
             BoardParticipant.objects.bulk_create(participants, ignore_conflicts=True)
+            invalidate_board_roles(*removed_user_ids, *(participant.user_id for participant in participants))
+            publish_board_event(instance.id, 'participants.changed')
+            get_membership(self.context['request']).reset()
             if title := validated_data.get('title'):
                 instance.title = title
+            # версия доски увеличивается сигналом сохранения доски
             instance.save()
         return instance
 
@@ -72,10 +91,7 @@ class CategoryCreateSerializer(serializers.ModelSerializer):
     def validate_board(self, board: Board) -> Board:
         if board.is_deleted:
             raise ValidationError('Board not exists')
-        if not BoardParticipant.objects.filter(
-                board_id=board.id,
-                user_id=self.context['request'].user.id,
-                role__in=[BoardParticipant.Role.owner, BoardParticipant.Role.writer], ).exists():
+        if not get_membership(self.context['request']).can_write(board.id):
             raise PermissionDenied
 
         return board
@@ -107,10 +123,7 @@ class GoalSerializer(serializers.ModelSerializer):
     def validate_category(self, category):
         if category.is_deleted:
             raise ValidationError('Category not exists')
-        if not BoardParticipant.objects.filter(
-                board_id=category.board_id,
-                user_id=self.context['request'].user.id,
-                role__in=[BoardParticipant.Role.owner, BoardParticipant.Role.writer], ).exists():
+        if not get_membership(self.context['request']).can_write(category.board_id):
             raise PermissionDenied
 
         return category
@@ -118,7 +131,42 @@ class GoalSerializer(serializers.ModelSerializer):
     class Meta:
         model = Goal
         read_only_fields = ("id", "created", "updated", "user")
-        fields = "__all__"
+        exclude = ("search_vector",)
+
+
+class GoalBatchItemSerializer(serializers.Serializer):
+    """
+    Одна операция пакетного запроса: без id - создание цели, с id - изменение переданных полей.
+    Категория принимается как id и загружается для всей пачки одним запросом.
+    """
+    id = serializers.IntegerField(required=False)
+    category = serializers.IntegerField(required=False)
+    title = serializers.CharField(max_length=255, required=False)
+    description = serializers.CharField(allow_blank=True, required=False)
+    due_date = serializers.DateField(allow_null=True, required=False)
+    status = serializers.ChoiceField(choices=Goal.Status.choices, required=False)
+    priority = serializers.ChoiceField(choices=Goal.Priority.choices, required=False)
+
+    def validate(self, attrs: dict) -> dict:
+        if 'id' not in attrs:
+            missing = {field: ['This field is required.'] for field in ('category', 'title') if field not in attrs}
+            if missing:
+                raise serializers.ValidationError(missing)
+        return attrs
+
+
+class GoalBatchSerializer(serializers.Serializer):
+    operations = serializers.ListField(
+        child=serializers.DictField(), allow_empty=False, max_length=settings.GOALS_BATCH_MAX_SIZE,
+    )
+
+
+class GoalTransitionSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=Goal.Status.choices)
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, allow_empty=False,
+        max_length=settings.GOALS_BATCH_MAX_SIZE,
+    )
 
 
 class GoalWithUserSerializer(serializers.ModelSerializer):
@@ -126,10 +174,14 @@ class GoalWithUserSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Goal
-        fields = "__all__"
+        exclude = ("search_vector",)
         read_only_fields = ("id", "created", "updated", "user")
 
 
+class GoalSearchSerializer(GoalSerializer):
+    rank = serializers.FloatField(read_only=True)
+
+
 class CommentCreateSerializer(serializers.ModelSerializer):
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
 
@@ -139,11 +191,7 @@ class CommentCreateSerializer(serializers.ModelSerializer):
     def validate_goal(self, goal):
         if goal.status == Goal.Status.archived:
             raise ValidationError('Goal not exists')
-        if not BoardParticipant.objects.filter(
-            board_id=goal.category.board_id,
-            user_id=self.context['request'].user.id,
-            role__in=[BoardParticipant.Role.owner, BoardParticipant.Role.writer],
-        ).exists():
+        if not get_membership(self.context['request']).can_write(goal.board_id):
             raise PermissionDenied
 
         return goal
@@ -165,3 +213,17 @@ class CommentSerializer(serializers.ModelSerializer):
         model = Comment
         fields = "__all__"
         read_only_fields = ("id", "created", "updated", "user")
+
+
+class DeletedObjectSerializer(serializers.ModelSerializer):
+    # клиенту нужен id пропавшего объекта, а не самой записи об удалении
+    id = serializers.IntegerField(source='object_id', read_only=True)
+
+    class Meta:
+        model = DeletedObject
+        fields = ("kind", "id", "board", "updated")
+
+
+class AutocompleteSerializer(serializers.Serializer):
+    id = serializers.IntegerField(read_only=True)
+    title = serializers.CharField(read_only=True)
@@ -0,0 +1,92 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import User
+from core.serializers import ProfileSerializer
+from goals.events import publish_board_event
+from goals.membership import invalidate_board_roles
+from goals.models import Board, BoardParticipant, Category, Goal, Comment, DeletedObject
+from goals.search import update_search_vector
+from goals.versions import bump_board_versions, boards_with_user
+
+SEARCH_FIELDS = {'title', 'description'}
+PROFILE_FIELDS = set(ProfileSerializer.Meta.fields)
+
+
+@receiver([post_save, post_delete], sender=BoardParticipant)
+def board_participant_changed(sender, instance: BoardParticipant, **kwargs) -> None:
+    invalidate_board_roles(instance.user_id)
+
+
+@receiver(post_save, sender=Goal)
+def goal_saved(sender, instance: Goal, update_fields=None, **kwargs) -> None:
+    # смена статуса и прочих полей поисковый вектор не меняет
+    if update_fields is not None and not SEARCH_FIELDS & set(update_fields):
+        return
+    update_search_vector([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def comment_changed(sender, instance: Comment, **kwargs) -> None:
+    update_search_vector([instance.goal_id])
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance: Comment, **kwargs) -> None:
+    # комментарий удаляется из БД, синхронизация узнает об этом по записи DeletedObject
+    DeletedObject.record(DeletedObject.Kind.comment, [instance.pk], instance.board_id, timezone.now())
+
+
+@receiver([post_save, post_delete], sender=BoardParticipant)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Goal)
+@receiver([post_save, post_delete], sender=Comment)
+def board_content_changed(sender, instance, **kwargs) -> None:
+    # при переносе на другую доску меняются обе
+    bump_board_versions([instance.board_id, getattr(instance, '_loaded_board_id', None)])
+
+
+@receiver(post_save, sender=Board)
+def board_saved(sender, instance: Board, created: bool, **kwargs) -> None:
+    if not created:
+        bump_board_versions([instance.id])
+
+
+@receiver(post_save, sender=User)
+def profile_saved(sender, instance: User, created: bool, update_fields=None, **kwargs) -> None:
+    # профиль есть в ответах досок, а вход меняет только last_login
+    if created or (update_fields is not None and not PROFILE_FIELDS & set(update_fields)):
+        return
+    bump_board_versions(boards_with_user(instance.id))
+
+
+@receiver([post_save, post_delete], sender=BoardParticipant)
+def participants_changed(sender, instance: BoardParticipant, **kwargs) -> None:
+    publish_board_event(instance.board_id, 'participants.changed')
+
+
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Goal)
+@receiver([post_save, post_delete], sender=Comment)
+def publish_content_event(sender, instance, created: bool = False, **kwargs) -> None:
+    kind = sender._meta.model_name
+    if kwargs['signal'] is post_delete or getattr(instance, 'is_deleted', False):
+        action = 'deleted'
+    elif created:
+        action = 'created'
+    elif sender is Goal and instance.status == Goal.Status.archived:
+        action = 'archived'
+    else:
+        action = 'updated'
+    publish_board_event(instance.board_id, f'{kind}.{action}', instance.pk)
+    # перенос на другую доску: для старой доски объект пропал
+    loaded_board_id = getattr(instance, '_loaded_board_id', None)
+    if loaded_board_id is not None and loaded_board_id != instance.board_id:
+        publish_board_event(loaded_board_id, f'{kind}.moved', instance.pk)
+
+
+@receiver(post_save, sender=Board)
+def publish_board_saved(sender, instance: Board, created: bool, **kwargs) -> None:
+    if not created:
+        publish_board_event(instance.id, 'board.deleted' if instance.is_deleted else 'board.updated')
@@ -0,0 +1,125 @@
+import base64
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+
+from goals.membership import get_membership
+from goals.models import Category, Goal, Comment, DeletedObject
+from goals.serializers import CategorySerializer, GoalSerializer, CommentSerializer, DeletedObjectSerializer
+
+'''
+Синхронизация клиента изменениями: категории, цели и комментарии досок пользователя,
+созданные, измененные или удаленные (is_deleted, статус "Архив") после курсора.
+Комментарии удаляются из БД, а объекты, перенесенные на другую доску, не попадают в выборку по старой:
+об этом клиент узнает из deleted по записям DeletedObject. Записи об объектах, которые после переноса
+остались на доступной пользователю доске, не отдаются - их актуальная версия приходит в своей секции.
+Изменения выбираются по DatesModelMixin.updated - его проставляет save, а bulk-операции
+(удаление доски и категории, перенос на другую доску) обновляют его явно.
+Курсор непрозрачный: для каждой модели позиция (updated, id) последней отданной строки
+и хэш набора досок. Если набор досок пользователя изменился, синхронизация начинается
+заново с reset=true - клиент сбрасывает локальные данные.
+updated проставляется до коммита, поэтому транзакция, закоммиченная позже чтения,
+может оказаться со временем раньше курсора. Чтобы ее не пропустить, курсор не уходит дальше
+now - SYNC_CURSOR_LAG: изменения за последние секунды приходят повторно, клиент применяет их по id.
+Если страница дошла до строк новее этой границы, курсор останавливается на ней и has_more не ставится:
+оставшиеся строки придут следующими запросами.
+'''
+
+SYNC_MODELS = {
+    'categories': (Category.objects.select_related('user'), CategorySerializer),
+    'goals': (Goal.objects.all(), GoalSerializer),
+    'comments': (Comment.objects.select_related('user'), CommentSerializer),
+    'deleted': (DeletedObject.objects.all(), DeletedObjectSerializer),
+}
+
+DELETED_KINDS = {
+    DeletedObject.Kind.category: Category,
+    DeletedObject.Kind.goal: Goal,
+    DeletedObject.Kind.comment: Comment,
+}
+
+INVALID_CURSOR_MESSAGE = 'Invalid cursor'
+
+
+def boards_digest(board_ids) -> str:
+    return hashlib.sha1(','.join(map(str, sorted(board_ids))).encode()).hexdigest()[:16]
+
+
+def encode_cursor(boards: str, positions: dict[str, tuple]) -> str:
+    # isoformat, а не DjangoJSONEncoder: он обрезает микросекунды, и keyset повторял бы строки
+    positions = {name: [updated.isoformat(), pk] for name, (updated, pk) in positions.items()}
+    data = json.dumps({'b': boards, 'p': positions}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def decode_cursor(encoded: str) -> tuple[str, dict[str, tuple]]:
+    try:
+        cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+        positions = {}
+        for name, (updated, pk) in cursor['p'].items():
+            if name not in SYNC_MODELS:
+                raise ValueError(name)
+            positions[name] = (parse_datetime(updated), int(pk))
+        if any(updated is None or timezone.is_naive(updated) for updated, _ in positions.values()):
+            raise ValueError(encoded)
+        return str(cursor['b']), positions
+    except (TypeError, ValueError, KeyError, AttributeError):
+        raise NotFound(INVALID_CURSOR_MESSAGE)
+
+
+def drop_visible(rows: list[DeletedObject], board_ids) -> list[DeletedObject]:
+    """Убирает записи об объектах, которые сейчас лежат на одной из досок пользователя"""
+    object_ids: dict[str, set[int]] = {}
+    for row in rows:
+        object_ids.setdefault(row.kind, set()).add(row.object_id)
+    visible = {
+        (kind, object_id)
+        for kind, ids in object_ids.items()
+        for object_id in DELETED_KINDS[kind].objects.filter(id__in=ids, board_id__in=board_ids)
+        .values_list('id', flat=True)
+    }
+    return [row for row in rows if (row.kind, row.object_id) not in visible]
+
+
+def collect_changes(request: Request, encoded_cursor: str | None) -> dict:
+    """Изменения после курсора: не больше SYNC_MAX_CHANGES строк каждой модели за ответ"""
+    board_ids = get_membership(request).board_ids
+    boards = boards_digest(board_ids)
+    positions: dict[str, tuple] = {}
+    reset = False
+    if encoded_cursor:
+        cursor_boards, positions = decode_cursor(encoded_cursor)
+        if cursor_boards != boards:
+            positions, reset = {}, True
+
+    limit = settings.SYNC_MAX_CHANGES
+    safe_position = (timezone.now() - timedelta(seconds=settings.SYNC_CURSOR_LAG), 0)
+    result = {'reset': reset, 'has_more': False}
+    for name, (queryset, serializer_class) in SYNC_MODELS.items():
+        queryset = queryset.filter(board_id__in=board_ids).order_by('updated', 'id')
+        position = positions.get(name)
+        if position is not None:
+            updated, pk = position
+            queryset = queryset.filter(Q(updated__gt=updated) | Q(updated=updated, id__gt=pk))
+
+        rows = list(queryset[:limit + 1])
+        has_more, rows = len(rows) > limit, rows[:limit]
+        if has_more and (rows[-1].updated, rows[-1].id) < safe_position:
+            result['has_more'] = True
+            positions[name] = (rows[-1].updated, rows[-1].id)
+        else:
+            # все строки до safe_position отданы, дальше него курсор не уходит
+            positions[name] = max(position, safe_position) if position is not None else safe_position
+        if name == 'deleted':
+            rows = drop_visible(rows, board_ids)
+        result[name] = serializer_class(rows, many=True, context={'request': request}).data
+
+    result['cursor'] = encode_cursor(boards, positions)
+    return result
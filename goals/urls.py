@@ -6,20 +6,30 @@ urlpatterns = [
     # Board
     path('board/create', views.BoardCreateView.as_view(), name='create-board'),
     path('board/list', views.BoardListView.as_view(), name='board-list'),
+    path('board/autocomplete', views.BoardAutocompleteView.as_view(), name='board-autocomplete'),
     path('board/<int:pk>', views.BoardDetailView.as_view(), name='board-details'),
+    path('board/<int:pk>/events', views.BoardEventsView.as_view(), name='board-events'),
+    path('board/<int:pk>/export', views.BoardExportView.as_view(), name='board-export'),
 
     # Categories
     path('goal_category/create', views.CategoryCreateView.as_view(), name='create-category'),
     path('goal_category/list', views.CategoryListView.as_view(), name='categories-list'),
+    path('goal_category/autocomplete', views.CategoryAutocompleteView.as_view(), name='category-autocomplete'),
     path('goal_category/<int:pk>', views.CategoryDetailView.as_view(), name='category-details'),
 
     # Goals
     path('goal/create', views.GoalCreateView.as_view(), name='create-goal'),
+    path('goal/batch', views.GoalBatchView.as_view(), name='goal-batch'),
+    path('goal/transition', views.GoalTransitionView.as_view(), name='goal-transition'),
     path('goal/list', views.GoalListView.as_view(), name='goal-list'),
+    path('goal/search', views.GoalSearchView.as_view(), name='goal-search'),
     path('goal/<int:pk>', views.GoalDetailView.as_view(), name='goal-details'),
 
     # Comments
     path('goal_comment/create', views.CommentCreateView.as_view(), name='create-comment'),
     path('goal_comment/list', views.CommentListView.as_view(), name='comment-list'),
-    path('goal_comment/<int:pk>', views.CommentDetailView.as_view(), name='comment-details')
+    path('goal_comment/<int:pk>', views.CommentDetailView.as_view(), name='comment-details'),
+
+    # Sync
+    path('sync', views.SyncView.as_view(), name='goals-sync'),
 ]
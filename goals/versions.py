@@ -0,0 +1,77 @@
+import hashlib
+
+from django.db.models import F
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from goals.membership import get_membership
+from goals.models import Board, BoardParticipant, Category, Goal, Comment
+
+'''
+Версии досок и условные GET запросы.
+Board.version увеличивается в той же транзакции, что и любое изменение доски, ее участников,
+категорий, целей и комментариев: сигналами для save/delete (goals.signals) и явно для bulk-операций.
+Ответы досок содержат и профили пользователей (участники, авторы), поэтому изменение профиля
+увеличивает версии всех досок, где пользователь участник или автор (boards_with_user).
+Списки и доска отдают слабый ETag по версиям досок пользователя и параметрам запроса,
+а на совпавший If-None-Match отвечают 304 без основного запроса и сериализации.
+'''
+
+
+def bump_board_versions(board_ids) -> None:
+    board_ids = {board_id for board_id in board_ids if board_id is not None}
+    if board_ids:
+        Board.objects.filter(id__in=board_ids).update(version=F('version') + 1)
+
+
+def boards_with_user(user_id: int) -> list[int]:
+    """Доски, в ответах которых есть профиль пользователя: он участник или автор категории, цели, комментария"""
+    querysets = [model.objects.filter(user_id=user_id).order_by().values_list('board_id', flat=True)
+                 for model in (BoardParticipant, Category, Goal, Comment)]
+    return list(querysets[0].union(*querysets[1:]))
+
+
+def board_versions_digest(request, board_ids) -> str:
+    """Хэш пути с параметрами и версий досок, считается один раз на запрос"""
+    board_ids = tuple(sorted(board_ids))
+    digests = request.__dict__.setdefault('_board_versions_digests', {})
+    if board_ids not in digests:
+        versions = Board.objects.filter(id__in=board_ids).order_by('id').values_list('id', 'version')
+        digests[board_ids] = hashlib.sha1(f'{request.get_full_path()}|{list(versions)}'.encode()).hexdigest()
+    return digests[board_ids]
+
+
+def board_etag(request, board_ids) -> str:
+    return f'W/"{board_versions_digest(request, board_ids)}"'
+
+
+def etag_matches(etag: str, if_none_match: str | None) -> bool:
+    if not if_none_match:
+        return False
+    # слабое сравнение: W/ не учитывается
+    etags = {tag.removeprefix('W/') for tag in parse_etags(if_none_match)}
+    return '*' in etags or etag.removeprefix('W/') in etags
+
+
+class BoardVersionETagMixin:
+    """
+    Условный GET для представлений, чей ответ зависит только от данных досок get_etag_board_ids.
+    Если get_etag_board_ids вернул None, запрос обрабатывается как обычно.
+    """
+
+    def get_etag_board_ids(self):
+        return get_membership(self.request).board_ids
+
+    def get(self, request, *args, **kwargs):
+        board_ids = self.get_etag_board_ids()
+        if board_ids is None:
+            return super().get(request, *args, **kwargs)
+
+        etag = board_etag(request, board_ids)
+        if etag_matches(etag, request.headers.get('If-None-Match')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+        return response
@@ -1,14 +1,37 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.postgres.search import SearchRank
 from django.db import transaction
+from django.db.models import F, Prefetch
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpRequest, HttpResponse, StreamingHttpResponse, Http404
+from django.utils import timezone
+from django.views import View
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import permissions, filters, generics
+from rest_framework.exceptions import ValidationError, PermissionDenied
 from rest_framework.generics import CreateAPIView, ListAPIView, RetrieveUpdateDestroyAPIView
 from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
 
+from goals.batch import apply_goal_batch
+from goals.events import BoardEventHub, get_event_hub, publish_goals_changed
+from goals.export import EXPORT_FORMATS, aiter_chunks, export_chunks
 from goals.filters import GoalDateFilter
+from goals.membership import get_membership
 from goals.models import Category, Goal, Comment, Board, BoardParticipant
+from goals.pagination import CursorLimitOffsetPagination
 from goals.permissions import BoardPermission, GoalCategoryPermission, GoalPermission, GoalCommentPermission
+from goals.response_cache import CachedListMixin
+from goals.search import search_query, autocomplete
 from goals.serializers import CategoryCreateSerializer, CategorySerializer, GoalSerializer, \
-    CommentSerializer, BoardSerializer, BoardWithParticipantsSerializer, GoalWithUserSerializer, CommentCreateSerializer
+    CommentSerializer, BoardSerializer, BoardWithParticipantsSerializer, GoalWithUserSerializer, CommentCreateSerializer, \
+    GoalSearchSerializer, AutocompleteSerializer, GoalBatchSerializer, GoalTransitionSerializer
+from goals.sync import collect_changes
+from goals.versions import BoardVersionETagMixin, bump_board_versions
 
 '''
 Если указываешь свойство queryset,  либо определяешь методы get_object/get_queryset,  
@@ -30,7 +53,7 @@ class BoardCreateView(generics.CreateAPIView):
                 BoardParticipant.objects.create(user=user, board=board)
 
 
-class BoardListView(generics.ListAPIView):
+class BoardListView(CachedListMixin, generics.ListAPIView):
     permissions = [BoardPermission]
     serializer_class = BoardSerializer
     filter_backends = [filters.OrderingFilter]
@@ -40,19 +63,132 @@ class BoardListView(generics.ListAPIView):
         return Board.objects.filter(participants__user=self.request.user).exclude(is_deleted=True)
 
 
-class BoardDetailView(generics.RetrieveUpdateDestroyAPIView):
+class AutocompleteView(ListAPIView):
+    """
+    Подсказки при вводе: ?q=<текст>&limit=<n>, возвращает только id и title.
+    Количество результатов жестко ограничено max_results.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = AutocompleteSerializer
+    pagination_class = None
+    filter_backends = []
+    max_results = 10
+
+    def get_base_queryset(self):
+        """Записи, среди которых ищутся подсказки, по умолчанию queryset вида"""
+        return super().get_queryset()
+
+    def get_queryset(self):
+        text = self.request.query_params.get('q', '').strip()
+        if not text:
+            return []
+        try:
+            limit = min(int(self.request.query_params.get('limit', self.max_results)), self.max_results)
+        except ValueError:
+            limit = self.max_results
+        return autocomplete(self.get_base_queryset(), text, max(limit, 1))
+
+
+class BoardAutocompleteView(AutocompleteView):
+    def get_base_queryset(self):
+        return Board.objects.filter(id__in=get_membership(self.request).board_ids, is_deleted=False)
+
+
+class BoardDetailView(BoardVersionETagMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [BoardPermission]
     serializer_class = BoardWithParticipantsSerializer
 
+    def get_etag_board_ids(self):
+        board_id = int(self.kwargs['pk'])
+        return [board_id] if get_membership(self.request).can_read(board_id) else None
+
     def get_queryset(self):
-        return Board.objects.prefetch_related('participants__user').exclude(is_deleted=True)
+        # участники вместе с пользователями одним запросом - для SlugRelatedField(username)
+        participants = BoardParticipant.objects.select_related('user')
+        return Board.objects.prefetch_related(Prefetch('participants', queryset=participants)).exclude(is_deleted=True)
 
     def perform_destroy(self, instance: Board) -> None:
         with transaction.atomic():
             instance.is_deleted = True
             instance.save()
-            instance.categories.update(is_deleted=True)
-            Goal.objects.filter(category__board=instance).update(status=Goal.Status.archived)
+            # update не проставляет updated сам, а по нему клиенты забирают изменения (goals.sync)
+            instance.categories.update(is_deleted=True, updated=instance.updated)
+            Goal.objects.filter(category__board=instance).update(status=Goal.Status.archived,
+                                                                 updated=instance.updated)
+
+
+class BoardEventsView(View):
+    """
+    GET /goals/board/<pk>/events - поток Server-Sent Events с событиями доски (goals.events),
+    только для участников доски. Работает под ASGI (todolist/asgi.py): ожидание событий
+    не занимает поток. Раз в BOARD_EVENTS_MAX_AGE секунд поток закрывается и EventSource
+    переподключается - так отключившиеся клиенты не копятся в подписчиках.
+    """
+
+    async def get(self, request: HttpRequest, pk: int) -> HttpResponse:
+        # под WSGI поток был бы прочитан в память целиком, а хаб пересоздавался бы на каждый запрос
+        if not isinstance(request, ASGIRequest):
+            return HttpResponse('Board events require an ASGI server', status=503)
+        if not await sync_to_async(self.can_read)(request, pk):
+            return HttpResponse(status=403)
+        hub = get_event_hub()
+        queue = await hub.subscribe(pk)
+        response = StreamingHttpResponse(self.stream(request, hub, pk, queue), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    @staticmethod
+    def can_read(request: HttpRequest, board_id: int) -> bool:
+        return request.user.is_authenticated and get_membership(request).can_read(board_id)
+
+    @staticmethod
+    def is_participant(request: HttpRequest, board_id: int) -> bool:
+        # напрямую из БД: локальный кэш ролей этого процесса мог еще не узнать об изменении
+        return BoardParticipant.objects.filter(board_id=board_id, user=request.user).exists()
+
+    async def stream(self, request: HttpRequest, hub: BoardEventHub, board_id: int, queue: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.BOARD_EVENTS_MAX_AGE
+        try:
+            yield 'retry: 3000\n\n'
+            while (timeout := deadline - loop.time()) > 0:
+                try:
+                    event = await asyncio.wait_for(queue.get(), min(timeout, settings.BOARD_EVENTS_KEEPALIVE))
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+                    continue
+                if event['type'] == 'participants.changed' and \
+                        not await sync_to_async(self.is_participant)(request, board_id):
+                    yield 'event: revoked\ndata: {}\n\n'
+                    return
+                yield f"event: {event['type']}\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
+        finally:
+            hub.unsubscribe(board_id, queue)
+
+
+class BoardExportView(View):
+    """
+    GET /goals/board/<pk>/export?format=ndjson|csv - все категории, цели и комментарии доски
+    одним потоковым ответом (goals.export), только для участников доски.
+    """
+
+    def get(self, request: HttpRequest, pk: int) -> HttpResponse:
+        export_format = request.GET.get('format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return HttpResponse(f'Unknown format, use one of: {", ".join(EXPORT_FORMATS)}', status=400)
+        if not request.user.is_authenticated or not get_membership(request).can_read(pk):
+            return HttpResponse(status=403)
+        if not Board.objects.filter(id=pk, is_deleted=False).exists():
+            raise Http404
+
+        chunks = export_chunks(pk, export_format)
+        # под ASGI синхронный итератор был бы прочитан в память целиком
+        if isinstance(request, ASGIRequest):
+            chunks = aiter_chunks(chunks)
+        response = StreamingHttpResponse(chunks, content_type=f'{EXPORT_FORMATS[export_format]}; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="board-{pk}.{export_format}"'
+        return response
 
 
 class CategoryCreateView(CreateAPIView):
@@ -63,12 +199,13 @@ class CategoryCreateView(CreateAPIView):
     serializer_class = CategoryCreateSerializer
 
 
-class CategoryListView(ListAPIView):
+class CategoryListView(BoardVersionETagMixin, CachedListMixin, ListAPIView):
     # разрешен доступ только для аутентифицированных пользователей
     permission_classes = [GoalCategoryPermission]
     serializer_class = CategorySerializer
-    # позволяет ограничить количество объектов на странице с помощью параметров `limit` и `offset`.
-    pagination_class = LimitOffsetPagination
+    # позволяет ограничить количество объектов на странице с помощью параметров `limit` и `offset`,
+    # либо листать страницы курсором (`cursor`) без OFFSET и COUNT(*)
+    pagination_class = CursorLimitOffsetPagination
     filter_backends = [filters.OrderingFilter, filters.SearchFilter, ]
     # `filterset_fields` - определяет поля, по которым можно сортировать результаты запроса.
     ordering_fields = ["title", "created"]
@@ -78,7 +215,13 @@ class CategoryListView(ListAPIView):
     # данный метод возвращает только те объекты модели GoalCategory,
     # которые принадлежат текущему пользователю и не являются удаленными.
     def get_queryset(self):
-        return Category.objects.filter(board__participants__user=self.request.user).exclude(is_deleted=True)
+        return Category.objects.select_related('user').filter(
+            board_id__in=get_membership(self.request).board_ids).exclude(is_deleted=True)
+
+
+class CategoryAutocompleteView(AutocompleteView):
+    def get_base_queryset(self):
+        return Category.objects.filter(board_id__in=get_membership(self.request).board_ids, is_deleted=False)
 
 
 class CategoryDetailView(RetrieveUpdateDestroyAPIView):
@@ -92,7 +235,7 @@ class CategoryDetailView(RetrieveUpdateDestroyAPIView):
 
     serializer_class = CategorySerializer
     permission_classes = [GoalCategoryPermission]
-    queryset = Category.objects.exclude(is_deleted=True)
+    queryset = Category.objects.select_related('user').exclude(is_deleted=True)
 
     # Чтобы категория не удалялась, при вызове delete,
     # мы определим метод perform_destroy у вью
@@ -100,7 +243,8 @@ class CategoryDetailView(RetrieveUpdateDestroyAPIView):
         with transaction.atomic():
             instance.is_deleted = True
             instance.save()
-            instance.goal_set.update(status=Goal.Status.archived)
+            instance.goal_set.update(status=Goal.Status.archived, updated=instance.updated)
+            publish_goals_changed([instance.board_id])
 
 
 class GoalCreateView(CreateAPIView):
@@ -109,11 +253,83 @@ class GoalCreateView(CreateAPIView):
     serializer_class = GoalSerializer
 
 
-class GoalListView(ListAPIView):
+class GoalBatchView(generics.GenericAPIView):
+    """
+    POST /goals/goal/batch - до GOALS_BATCH_MAX_SIZE операций создания/изменения целей за один запрос:
+    {"operations": [{"category": 1, "title": "..."}, {"id": 5, "status": 3}, ...]}
+    В ответе результат по каждой операции в том же порядке.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = GoalBatchSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = apply_goal_batch(request, serializer.validated_data['operations'])
+        return Response({'results': results})
+
+
+class GoalTransitionView(generics.GenericAPIView):
+    """
+    POST /goals/goal/transition - перевод целей в статус status одним UPDATE.
+    Цели задаются списком ids в теле запроса, либо фильтрами GoalDateFilter в query params
+    (например, ?category__in=1,2&status__in=3). Меняются только цели на досках,
+    где пользователь владелец или редактор; если хотя бы одна из ids недоступна - ничего не меняется.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = GoalTransitionSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data.get('ids')
+
+        membership = get_membership(request)
+        goals = Goal.objects.filter(
+            board_id__in=membership.writable_board_ids(),
+            category__is_deleted=False,
+        ).exclude(status=Goal.Status.archived)
+
+        if ids is not None:
+            goals = goals.filter(id__in=ids)
+        else:
+            goal_filter = GoalDateFilter(request.query_params, queryset=goals, request=request)
+            if not goal_filter.form.changed_data:
+                raise ValidationError({'ids': ['Pass ids or at least one filter']})
+            if not goal_filter.is_valid():
+                raise ValidationError(goal_filter.errors)
+            goals = goal_filter.qs
+
+        with transaction.atomic():
+            board_ids = set(goals.values_list('board_id', flat=True).distinct())
+            updated = goals.update(status=serializer.validated_data['status'], updated=timezone.now())
+            bump_board_versions(board_ids)
+            publish_goals_changed(board_ids)
+            if ids is not None and updated != len(set(ids)):
+                transaction.set_rollback(True)
+                raise PermissionDenied('Some goals do not exist or are not editable')
+        return Response({'updated': updated})
+
+
+class SyncView(generics.GenericAPIView):
+    """
+    GET /goals/sync?cursor=<курсор> - категории, цели и комментарии всех досок пользователя,
+    измененные после курсора (без курсора - все), и в deleted - удаленные или перенесенные на недоступную доску.
+    В ответе новый курсор для следующего запроса;
+    has_more - изменений больше, чем поместилось в ответ, reset - набор досок изменился
+    и клиент должен заменить локальные данные ответом.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        return Response(collect_changes(request, request.query_params.get('cursor')))
+
+
+class GoalListView(BoardVersionETagMixin, ListAPIView):
     model = Goal
     permission_classes = [GoalPermission]
     serializer_class = GoalSerializer
-    pagination_class = LimitOffsetPagination
+    pagination_class = CursorLimitOffsetPagination
     filterset_class = GoalDateFilter
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter]
 
@@ -122,12 +338,35 @@ class GoalListView(ListAPIView):
     search_fields = ["title"]
 
     def get_queryset(self):
+        # доступ проверяется по денормализованному board_id и ролям из кэша - без join участников
         return Goal.objects.filter(
-            category__board__participants__user=self.request.user,
+            board_id__in=get_membership(self.request).board_ids,
             category__is_deleted=False,
         ).exclude(status=Goal.Status.archived)
 
 
+class GoalSearchView(ListAPIView):
+    """
+    GET /goals/goal/search?q=<текст> - полнотекстовый поиск по названию, описанию
+    и комментариям целей на досках пользователя, самые релевантные цели первыми.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = GoalSearchSerializer
+    pagination_class = LimitOffsetPagination
+
+    def get_queryset(self):
+        query = search_query(self.request.query_params.get('q', ''))
+        if query is None:
+            return Goal.objects.none()
+        return Goal.objects.filter(
+            board_id__in=get_membership(self.request).board_ids,
+            category__is_deleted=False,
+            search_vector=query,
+        ).exclude(status=Goal.Status.archived).annotate(
+            rank=SearchRank(F('search_vector'), query),
+        ).order_by('-rank', 'id')
+
+
 class GoalDetailView(RetrieveUpdateDestroyAPIView):
     '''
     GET /goals/goal/<pk> — просмотр категории.
@@ -139,7 +378,7 @@ class GoalDetailView(RetrieveUpdateDestroyAPIView):
 
     serializer_class = GoalWithUserSerializer
     permission_classes = [GoalPermission]
-    queryset = Goal.objects.exclude(status=Goal.Status.archived)
+    queryset = Goal.objects.select_related('user').exclude(status=Goal.Status.archived)
 
     def perform_destroy(self, instance):
         instance.status = Goal.Status.archived
@@ -156,14 +395,14 @@ class CommentListView(ListAPIView):
     model = Comment
     permission_classes = [GoalCommentPermission]
     serializer_class = CommentSerializer
-    pagination_class = LimitOffsetPagination
+    pagination_class = CursorLimitOffsetPagination
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ["goal"]
 
     # ordering = ["-created"]
 
     def get_queryset(self):
-        return Comment.objects.filter(goal__category__board__participants__user=self.request.user)
+        return Comment.objects.select_related('user').filter(board_id__in=get_membership(self.request).board_ids)
 
 
 class CommentDetailView(RetrieveUpdateDestroyAPIView):
@@ -180,5 +419,4 @@ class CommentDetailView(RetrieveUpdateDestroyAPIView):
     queryset = Comment.objects.select_related('user')
 
     def get_queryset(self):
-        return Comment.objects.select_related('user').filter(
-            goal__category__board__participants__user=self.request.user)
+        return Comment.objects.select_related('user').filter(board_id__in=get_membership(self.request).board_ids)
@@ -0,0 +1,88 @@
+import asyncio
+import json
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.db import transaction
+from django.test import AsyncClient, Client
+from django.urls import reverse
+
+from core.models import User
+from goals.events import get_event_hub
+from goals.models import Board, BoardParticipant, Category, Goal
+
+
+@pytest.fixture
+def events_data():
+    user = User.objects.create(username="test_user")
+    board = Board.objects.create(title="Test Board")
+    BoardParticipant.objects.create(user=user, board=board)
+    category = Category.objects.create(board=board, user=user, title="Test Category")
+    client = AsyncClient()
+    client.force_login(user)
+    return client, user, board, category
+
+
+async def next_event(stream) -> tuple[str, dict]:
+    while True:
+        chunk = (await asyncio.wait_for(anext(stream), timeout=5)).decode()
+        if chunk.startswith('event: '):
+            name, data = chunk.strip().split('\n')
+            return name.removeprefix('event: '), json.loads(data.removeprefix('data: '))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_board_events_stream(events_data):
+    client, user, board, category = events_data
+    other_board = Board.objects.create(title="Other Board")
+    other_category = Category.objects.create(board=other_board, user=user, title="Other Category")
+
+    @sync_to_async
+    def write():
+        # откаченная транзакция событий не отправляет, чужая доска в поток не попадает
+        with transaction.atomic():
+            Goal.objects.create(category=category, user=user, title="Rolled back")
+            transaction.set_rollback(True)
+        Goal.objects.create(category=other_category, user=user, title="Other")
+        return Goal.objects.create(category=category, user=user, title="Goal")
+
+    @sync_to_async
+    def remove_participant():
+        BoardParticipant.objects.filter(board=board, user=user).delete()
+
+    async def run():
+        response = await client.get(reverse('board-events', kwargs={'pk': board.id}))
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'text/event-stream'
+        stream = response.streaming_content
+        try:
+            await anext(stream)
+            goal = await write()
+            assert await next_event(stream) == ('goal.created', {'board': board.id, 'type': 'goal.created',
+                                                                 'id': goal.id})
+            await remove_participant()
+            assert (await next_event(stream))[0] == 'revoked'
+        finally:
+            get_event_hub().close()
+
+    async_to_sync(run)()
+
+
+@pytest.mark.django_db
+def test_board_events_only_for_participants(events_data):
+    client, user, board, category = events_data
+    other_board = Board.objects.create(title="Other Board")
+
+    async def get(board_id):
+        return await client.get(reverse('board-events', kwargs={'pk': board_id}))
+
+    assert async_to_sync(get)(other_board.id).status_code == 403
+
+
+@pytest.mark.django_db
+def test_board_events_require_asgi(events_data):
+    client, user, board, category = events_data
+    wsgi_client = Client()
+    wsgi_client.force_login(user)
+
+    assert wsgi_client.get(reverse('board-events', kwargs={'pk': board.id})).status_code == 503
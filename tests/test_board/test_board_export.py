@@ -0,0 +1,68 @@
+import csv
+import io
+import json
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, Client
+from django.urls import reverse
+
+from core.models import User
+from goals.models import Board, BoardParticipant, Category, Goal, Comment
+
+
+@pytest.fixture
+def export_data(settings):
+    settings.EXPORT_CHUNK_SIZE = 2
+    settings.EXPORT_BUFFER_SIZE = 100
+    user = User.objects.create(username="test_user")
+    board = Board.objects.create(title="Test Board")
+    BoardParticipant.objects.create(user=user, board=board)
+    category = Category.objects.create(board=board, user=user, title="Категория")
+    goals = [Goal.objects.create(category=category, user=user, title=f"Goal {i}") for i in range(5)]
+    Comment.objects.create(goal=goals[0], user=user, text="text, with comma")
+    return user, board
+
+
+@pytest.mark.django_db
+def test_export_ndjson_streams_all_rows(export_data):
+    user, board = export_data
+    client = Client()
+    client.force_login(user)
+
+    response = client.get(reverse('board-export', kwargs={'pk': board.id}))
+    assert response.status_code == 200 and response.streaming
+    chunks = list(response.streaming_content)
+    assert len(chunks) > 1
+    rows = [json.loads(line) for line in b''.join(chunks).decode().splitlines()]
+    assert [row['type'] for row in rows] == ['category'] + ['goal'] * 5 + ['comment']
+    assert rows[0]['title'] == 'Категория'
+    # время выгружается с микросекундами
+    goal = Goal.objects.get(id=rows[1]['id'])
+    assert rows[1]['created'] == goal.created.isoformat()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_export_csv_under_asgi(export_data):
+    user, board = export_data
+    client = AsyncClient()
+    client.force_login(user)
+
+    async def export():
+        response = await client.get(reverse('board-export', kwargs={'pk': board.id}), {'format': 'csv'})
+        return response, b''.join([chunk async for chunk in response.streaming_content])
+
+    response, content = async_to_sync(export)()
+    assert response['Content-Type'] == 'text/csv; charset=utf-8'
+    rows = list(csv.DictReader(io.StringIO(content.decode())))
+    assert len(rows) == 7
+    assert rows[-1]['type'] == 'comment' and rows[-1]['text'] == 'text, with comma'
+
+
+@pytest.mark.django_db
+def test_export_only_for_participants(export_data):
+    user, board = export_data
+    client = Client()
+    client.force_login(User.objects.create(username="other_user"))
+
+    assert client.get(reverse('board-export', kwargs={'pk': board.id})).status_code == 403
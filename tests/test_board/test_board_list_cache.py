@@ -0,0 +1,74 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.db import connection
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import User
+from goals.models import Board, BoardParticipant
+from goals.response_cache import get_response_cache
+from goals.views import BoardListView
+
+
+@pytest.fixture
+def board_client():
+    get_response_cache().clear()
+    user = User.objects.create(username="test_user")
+    board = Board.objects.create(title="Test Board")
+    BoardParticipant.objects.create(user=user, board=board)
+    client = APIClient()
+    client.force_authenticate(user)
+    return client, user, board
+
+
+@pytest.mark.django_db
+def test_list_cached_until_board_changes(board_client, django_assert_num_queries):
+    client, user, board = board_client
+    client.get(reverse('board-list'))
+
+    # роли из кэша, только версии досок
+    with django_assert_num_queries(1):
+        response = client.get(reverse('board-list'))
+    assert [item['title'] for item in response.data] == ['Test Board']
+
+    board.title = 'Renamed'
+    board.save()
+    other_board = Board.objects.create(title='Another Board')
+    BoardParticipant.objects.create(user=user, board=other_board)
+    response = client.get(reverse('board-list'))
+    assert [item['title'] for item in response.data] == ['Another Board', 'Renamed']
+
+    client.get(reverse('categories-list'))
+    client.post(reverse('create-category'), {'title': 'New', 'board': board.id})
+    response = client.get(reverse('categories-list'))
+    assert [item['title'] for item in response.data] == ['New']
+
+
+@pytest.mark.django_db(transaction=True)
+def test_cold_key_computed_once(board_client, monkeypatch):
+    client, user, board = board_client
+    calls = []
+    get_queryset = BoardListView.get_queryset
+
+    def slow_get_queryset(self):
+        calls.append(1)
+        time.sleep(0.3)
+        return get_queryset(self)
+
+    monkeypatch.setattr(BoardListView, 'get_queryset', slow_get_queryset)
+
+    def fetch(_):
+        try:
+            thread_client = APIClient()
+            thread_client.force_authenticate(user)
+            return thread_client.get(reverse('board-list')).data
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(fetch, range(4)))
+
+    assert len(calls) == 1
+    assert all([item['title'] for item in result] == ['Test Board'] for result in results)
@@ -0,0 +1,96 @@
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+
+class FakeTelegram:
+    """Локальный HTTP сервер с методами getUpdates и sendMessage Bot API"""
+
+    def __init__(self):
+        self.updates: list[dict] = []
+        self.sent: list[tuple[int, str]] = []
+        self.send_delays: dict[int, float] = {}
+        # ответы с ошибкой (status, body), отдаются на ближайшие запросы до обычных
+        self.errors: list[tuple[int, dict]] = []
+        # ошибки sendMessage для конкретного чата, когда порядок запросов разных чатов не определен
+        self.chat_errors: dict[int, list[tuple[int, dict]]] = {}
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server.server_port}'
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def add_update(self, chat_id: int, text: str) -> None:
+        with self.lock:
+            update_id = len(self.updates) + 1
+            self.updates.append({'update_id': update_id, 'message': {'chat': {'id': chat_id}, 'text': text}})
+
+    def sent_to(self, chat_id: int) -> list[str]:
+        with self.lock:
+            return [text for sent_chat_id, text in self.sent if sent_chat_id == chat_id]
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {key: values[0] for key, values in parse_qs(url.query).items()}
+                method = url.path.rsplit('/', 1)[-1]
+                with fake.lock:
+                    error = fake.errors.pop(0) if fake.errors else None
+                    chat_errors = fake.chat_errors.get(int(params.get('chat_id', 0)))
+                    if error is None and method == 'sendMessage' and chat_errors:
+                        error = chat_errors.pop(0)
+                if error:
+                    self._reply(error[1], status=error[0])
+                else:
+                    self._reply(getattr(fake, f'_{method}')(params))
+
+            def _reply(self, data: dict, status: int = 200) -> None:
+                body = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def _getUpdates(self, params: dict) -> dict:
+        offset = int(params.get('offset', 0))
+        with self.lock:
+            result = [update for update in self.updates if update['update_id'] >= offset]
+        return {'ok': True, 'result': result}
+
+    def _sendMessage(self, params: dict) -> dict:
+        chat_id = int(params['chat_id'])
+        time.sleep(self.send_delays.get(chat_id, 0))
+        with self.lock:
+            self.sent.append((chat_id, params['text']))
+        return {'ok': True, 'result': {'chat': {'id': chat_id}, 'text': params['text']}}
+
+
+@pytest.fixture
+def fake_telegram(settings):
+    fake = FakeTelegram()
+    fake.start()
+    settings.TG_API_URL = fake.url
+    yield fake
+    fake.stop()
@@ -0,0 +1,39 @@
+import pytest
+
+from bot.management.commands.runbot import Command
+from bot.models import TgUser
+from bot.tg.schemas import UpdateObj
+from core.models import User
+from goals.models import Board, BoardParticipant, Category
+from tests.test_bot.fake_telegram import fake_telegram  # noqa: F401
+
+
+def make_updates(messages: list[tuple[int, str]]) -> list[UpdateObj]:
+    return [UpdateObj(update_id=i, message={'chat': {'id': chat_id}, 'text': text})
+            for i, (chat_id, text) in enumerate(messages, start=1)]
+
+
+@pytest.mark.django_db
+def test_batch_loads_and_flushes_users_once(fake_telegram, django_assert_num_queries):
+    user = User.objects.create(username='test_user')
+    board = Board.objects.create(title='Board')
+    BoardParticipant.objects.create(user=user, board=board)
+    Category.objects.create(board=board, user=user, title='Category')
+    for chat_id in range(1, 6):
+        TgUser.objects.create(chat_id=chat_id, user=user)
+    updates = make_updates([(chat_id, 'help') for chat_id in range(1, 6)] + [(1, '/create'), (6, '/start')])
+
+    command = Command()
+    # чтение пользователей, вставка нового и его чтение, категории для /create,
+    # код верификации нового пользователя
+    with django_assert_num_queries(5):
+        command.begin_batch(updates)
+        for update in updates:
+            command.handle_message(update.message)
+        command.end_batch(updates)
+    command.sender.close()
+
+    assert command.state_store.get(1).state == 1
+    new_user = TgUser.objects.get(chat_id=6)
+    assert new_user.user is None and new_user.verification_code
+    assert '\n'.join(fake_telegram.sent_to(1)) == 'Unknown command\nВыберите категорию: [\'Category\']\n'
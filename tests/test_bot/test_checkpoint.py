@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from bot.checkpoint import UpdateCheckpoint
+from bot.models import BotCheckpoint, ProcessedUpdate
+from bot.runtime import BotRuntime
+from bot.tg.client import TgClient
+from tests.test_bot.fake_telegram import fake_telegram  # noqa: F401
+
+
+def run_once(runtime: BotRuntime) -> None:
+    async def _run():
+        runtime.offset = await runtime.dispatcher.run_sync(runtime.checkpoint.load)
+        await runtime.poll_once()
+        await runtime.join()
+        runtime.dispatcher.close()
+
+    asyncio.run(_run())
+
+
+@pytest.mark.django_db(transaction=True)
+def test_restart_skips_processed_updates(fake_telegram):
+    handled = []
+    client = TgClient(token='test')
+
+    def make_runtime(interval: float) -> BotRuntime:
+        return BotRuntime(client, lambda update: handled.append(update.update_id), poll_timeout=0,
+                          checkpoint=UpdateCheckpoint(interval=interval))
+
+    for text in ['a', 'b']:
+        fake_telegram.add_update(1, text)
+    run_once(make_runtime(interval=0))
+    assert BotCheckpoint.objects.get(name='runbot').update_id == 2
+    assert not ProcessedUpdate.objects.exists()
+
+    # контрольная точка еще не сохранена, но обработанные id записаны
+    fake_telegram.add_update(1, 'c')
+    run_once(make_runtime(interval=60))
+    assert list(ProcessedUpdate.objects.values_list('update_id', flat=True)) == [3]
+
+    # после перезапуска Telegram отдает 3 повторно, обрабатывается только новое
+    fake_telegram.add_update(1, 'd')
+    runtime = make_runtime(interval=60)
+    run_once(runtime)
+
+    assert handled == [1, 2, 3, 4]
+    assert runtime.offset == 5
@@ -0,0 +1,101 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import pytest
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from bot.models import TgUser, OutboxMessage
+from bot.outbox import OutboxDispatcher, enqueue_message
+from bot.tg.client import TgClient
+from bot.tg.scheduler import SendScheduler
+from core.models import User
+from tests.test_bot.fake_telegram import fake_telegram  # noqa: F401
+
+
+@pytest.mark.django_db
+def test_verification_enqueues_message_without_calling_telegram(settings):
+    # недоступный Telegram не влияет на ответ
+    settings.TG_API_URL = 'http://127.0.0.1:1'
+    user = User.objects.create(username='test_user')
+    TgUser.objects.create(chat_id=10, verification_code='code')
+    client = APIClient()
+    client.force_authenticate(user)
+
+    for _ in range(2):
+        response = client.patch(reverse('verify-user'), {'verification_code': 'code'})
+        assert response.status_code == 200
+
+    assert TgUser.objects.get(chat_id=10).user == user
+    message = OutboxMessage.objects.get()
+    assert (message.chat_id, message.status) == (10, OutboxMessage.Status.pending)
+
+
+@pytest.mark.django_db
+def test_dispatcher_sends_in_chat_order_and_deduplicates(fake_telegram):
+    for text in ['a', 'b', 'c']:
+        enqueue_message(1, text, dedup_key=f'1:{text}')
+    enqueue_message(1, 'a', dedup_key='1:a')
+    enqueue_message(2, 'x')
+
+    sent = OutboxDispatcher(SendScheduler(TgClient(token='test')), batch_size=2).drain()
+
+    assert sent == 4
+    # сообщения чата из одной пачки склеиваются
+    assert fake_telegram.sent_to(1) == ['a\nb', 'c']
+    assert fake_telegram.sent_to(2) == ['x']
+    assert not OutboxMessage.objects.filter(status=OutboxMessage.Status.pending).exists()
+
+
+@pytest.mark.django_db
+def test_dispatcher_delays_chat_after_error(fake_telegram, settings):
+    settings.TG_MAX_RETRIES = 0
+    enqueue_message(1, 'a')
+    enqueue_message(1, 'b')
+    enqueue_message(2, 'x')
+    enqueue_message(3, 'y')
+    fake_telegram.chat_errors = {
+        1: [(502, {'ok': False, 'description': 'Bad Gateway'})],
+        2: [(403, {'ok': False, 'description': 'Forbidden: bot was blocked by the user'})],
+    }
+    # без склейки: 'a' и 'b' уходят отдельными запросами
+    dispatcher = OutboxDispatcher(SendScheduler(TgClient(token='test'), max_length=1))
+
+    dispatcher.drain()
+
+    first = OutboxMessage.objects.get(text='a')
+    assert first.status == OutboxMessage.Status.pending
+    assert first.attempts == 1 and first.available_at > timezone.now()
+    # 'b' не отправлялся и ждет, пока не уйдет 'a'
+    second = OutboxMessage.objects.get(text='b')
+    assert (second.status, second.attempts) == (OutboxMessage.Status.pending, 0)
+    assert OutboxMessage.objects.get(text='x').status == OutboxMessage.Status.failed
+    assert fake_telegram.sent == [(3, 'y')]
+
+    OutboxMessage.objects.filter(text='a').update(available_at=timezone.now() - timedelta(seconds=1))
+    dispatcher.drain()
+    assert fake_telegram.sent_to(1) == ['a', 'b']
+
+
+@pytest.mark.django_db(transaction=True)
+def test_dispatcher_sends_outside_transaction(fake_telegram):
+    fake_telegram.send_delays = {1: 0.5}
+    enqueue_message(1, 'a')
+    enqueue_message(2, 'x')
+    dispatcher = OutboxDispatcher(SendScheduler(TgClient(token='test')))
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        sending = executor.submit(dispatcher.dispatch_batch)
+        deadline = time.monotonic() + 5
+        while not fake_telegram.sent_to(2) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # пока идет отправка, строки не заблокированы, а захваченная помечена sending
+        with transaction.atomic():
+            locked = list(OutboxMessage.objects.select_for_update(nowait=True).values_list('text', 'status'))
+        assert (('a', OutboxMessage.Status.sending) in locked)
+        assert sending.result() == 2
+
+    assert set(OutboxMessage.objects.values_list('status', flat=True)) == {OutboxMessage.Status.sent}
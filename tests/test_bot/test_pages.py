@@ -0,0 +1,62 @@
+import pytest
+from django.utils import timezone
+
+from bot.management.commands.runbot import Command
+from bot.models import TgUser
+from bot.pages import render_goals_page
+from bot.tg.schemas import UpdateObj
+from core.models import User
+from goals.models import Board, BoardParticipant, Category, Goal
+from tests.test_bot.fake_telegram import fake_telegram  # noqa: F401
+
+
+@pytest.fixture
+def user_with_goals():
+    now = timezone.now()
+    user = User.objects.create(username='test_user')
+    board = Board.objects.create(title='Board')
+    BoardParticipant.objects.create(user=user, board=board)
+    category = Category.objects.create(board=board, user=user, title='Category')
+    Goal.objects.bulk_create(
+        Goal(category=category, board=board, user=user, title=f'Goal {i:03} ' + 'x' * 100, created=now, updated=now)
+        for i in range(100)
+    )
+    Goal.objects.filter(title__startswith='Goal 050').update(status=Goal.Status.archived)
+    return user
+
+
+@pytest.mark.django_db
+def test_goals_pages_fit_message_limit(user_with_goals, settings):
+    settings.BOT_GOALS_CHUNK_SIZE = 10
+    titles, after, number = [], 0, 1
+    while after is not None:
+        text, after = render_goals_page(user_with_goals.id, after=after, number=number)
+        assert len(text) <= settings.TG_MESSAGE_MAX_LENGTH
+        titles += [line.split('. ', 1)[1][:8] for line in text.split('\n') if line[0].isdigit()]
+        number += 1
+
+    assert number > 3
+    assert titles == [f'Goal {i:03}' for i in range(100) if i != 50]
+
+
+@pytest.mark.django_db
+def test_goals_paging_commands(user_with_goals, fake_telegram):
+    TgUser.objects.create(chat_id=1, user=user_with_goals)
+    command = Command()
+
+    def send(text: str) -> str:
+        updates = [UpdateObj(update_id=1, message={'chat': {'id': 1}, 'text': text})]
+        command.begin_batch(updates)
+        command.handle_message(updates[0].message)
+        command.end_batch(updates)
+        command.sender.flush()
+        return fake_telegram.sent[-1][1]
+
+    first = send('/goals')
+    assert first.startswith('Ваши цели, страница 1:\n')
+    assert '/prev' not in first
+    assert send('/prev') == 'Это первая страница'
+    second = send('/next')
+    assert second.startswith('Ваши цели, страница 2:\n') and '/prev' in second
+    assert send('/prev') == first
+    command.sender.close()
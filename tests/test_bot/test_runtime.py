@@ -0,0 +1,102 @@
+import asyncio
+import threading
+
+import pytest
+
+from bot.checkpoint import UpdateCheckpoint
+from bot.management.commands.runbot import Command
+from bot.models import TgUser
+from bot.runtime import BotRuntime
+from bot.tg.client import TgClient
+from bot.tg.schemas import UpdateObj
+from tests.test_bot.fake_telegram import fake_telegram  # noqa: F401
+
+
+def run_batch(runtime: BotRuntime) -> None:
+    async def _run():
+        await runtime.poll_once()
+        await runtime.join()
+        runtime.dispatcher.close()
+
+    asyncio.run(_run())
+
+
+def test_runtime_orders_per_chat_and_runs_chats_concurrently(fake_telegram):
+    fake_telegram.send_delays[1] = 0.2
+    for text in ['a', 'b', 'c']:
+        fake_telegram.add_update(1, text)
+    fake_telegram.add_update(2, 'x')
+
+    client = TgClient(token='test')
+    runtime = BotRuntime(client, lambda update: client.send_message(update.message.chat.id, update.message.text),
+                         concurrency=4, poll_timeout=0)
+    run_batch(runtime)
+
+    assert fake_telegram.sent_to(1) == ['a', 'b', 'c']
+    # медленный чат 1 не задерживает чат 2
+    assert fake_telegram.sent[0] == (2, 'x')
+    assert runtime.offset == 5
+
+
+@pytest.mark.django_db(transaction=True)
+def test_runtime_with_bot_handlers(fake_telegram):
+    fake_telegram.add_update(10, '/start')
+    fake_telegram.add_update(20, '/start')
+
+    command = Command()
+    runtime = BotRuntime(command.tg_client, lambda update: command.handle_message(update.message),
+                         concurrency=2, poll_timeout=0, begin_batch=command.begin_batch, end_batch=command.end_batch)
+    run_batch(runtime)
+    command.sender.flush()
+
+    for chat_id in (10, 20):
+        tg_user = TgUser.objects.get(chat_id=chat_id)
+        # подряд идущие сообщения чата планировщик может склеить в одно
+        assert '\n'.join(fake_telegram.sent_to(chat_id)) == (
+            f'Hello!\nYour verification code is {tg_user.verification_code}'
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_runtime_polls_while_batch_drains_and_commits_prefix():
+    release = threading.Event()
+    handled = []
+
+    def handler(update: UpdateObj) -> None:
+        if update.update_id == 1:
+            release.wait(5)
+        handled.append(update.update_id)
+
+    # update_id 3 чата 1 стоит в очереди за медленным 1, поэтому третья пачка не завершена
+    batches = {0: [(1, 1)], 2: [(2, 2)], 3: [(3, 1), (4, 3)], 5: [(5, 2)]}
+
+    async def fetch_updates(offset: int) -> list[UpdateObj]:
+        return [UpdateObj(update_id=update_id, message={'chat': {'id': chat_id}, 'text': 'x'})
+                for update_id, chat_id in batches.get(offset, [])]
+
+    checkpoint = UpdateCheckpoint(interval=60)
+    runtime = BotRuntime(TgClient(token='test'), handler, concurrency=2, max_pending=3, checkpoint=checkpoint,
+                         fetch_updates=fetch_updates)
+
+    async def run():
+        for _ in range(3):
+            await runtime.poll_once()
+        while len(handled) < 2:
+            await asyncio.sleep(0.01)
+        # вторая пачка обработана, но контрольная точка ждет первую, а в работе max_pending обновлений
+        committed = set(checkpoint.processed)
+        blocked = asyncio.create_task(runtime.poll_once())
+        await asyncio.sleep(0.05)
+        offset_while_full = runtime.offset
+        release.set()
+        await blocked
+        await runtime.join()
+        runtime.dispatcher.close()
+        return committed, offset_while_full
+
+    committed, offset_while_full = asyncio.run(run())
+
+    assert committed == set() and offset_while_full == 5
+    assert sorted(handled[:2]) == [2, 4] and handled.index(1) < handled.index(3)
+    assert runtime.offset == 6
+    assert checkpoint.processed == {1, 2, 3, 4, 5}
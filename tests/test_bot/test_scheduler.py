@@ -0,0 +1,46 @@
+import time
+
+from bot.tg.client import TgClient
+from bot.tg.scheduler import SendScheduler, TokenBucket
+from tests.test_bot.fake_telegram import fake_telegram  # noqa: F401
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=2, capacity=2)
+    now = time.monotonic()
+    bucket.consume(now)
+    bucket.consume(now)
+    assert bucket.delay(now) == 0.5
+    assert bucket.delay(now + 0.5) == 0
+
+
+def test_scheduler_coalesces_throttled_chat(fake_telegram):
+    fake_telegram.send_delays[1] = 0.2
+    scheduler = SendScheduler(TgClient(token='test'), chat_rate=100, chat_burst=1, max_length=10)
+
+    futures = [scheduler.send_message(1, 'first')]
+    while not scheduler.metrics()['in_flight']:
+        time.sleep(0.01)
+    # пока первое сообщение чата 1 в пути, остальные ждут и склеиваются
+    futures += [scheduler.send_message(1, text) for text in ['a', 'b', 'c', 'long text']]
+    scheduler.send_message(2, 'x')
+    assert scheduler.metrics()['max_chat_depth'] == 4
+    scheduler.close()
+
+    assert fake_telegram.sent_to(1) == ['first', 'a\nb\nc', 'long text']
+    assert fake_telegram.sent_to(2) == ['x']
+    assert all(future.result().ok for future in futures)
+    metrics = scheduler.metrics()
+    assert (metrics['queued'], metrics['requests'], metrics['messages'], metrics['coalesced']) == (0, 4, 6, 2)
+
+
+def test_scheduler_respects_chat_rate(fake_telegram):
+    scheduler = SendScheduler(TgClient(token='test'), chat_rate=10, chat_burst=1, max_length=1)
+
+    started = time.monotonic()
+    for text in ['a', 'b', 'c']:
+        scheduler.send_message(1, text)
+    scheduler.close()
+
+    assert fake_telegram.sent_to(1) == ['a', 'b', 'c']
+    assert time.monotonic() - started >= 0.2
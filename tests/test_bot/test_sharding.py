@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+from django.db import connection
+
+from bot.models import TgUser
+from bot.sharding import ShardedBotRuntime, shard_for
+from bot.tg.client import TgClient
+from bot.tg.scheduler import SendScheduler
+from bot.tg.schemas import UpdateObj
+from tests.test_bot.fake_telegram import fake_telegram  # noqa: F401
+
+
+def make_updates(start: int, chat_ids: list[int]) -> list[UpdateObj]:
+    return [UpdateObj(update_id=start + i, message={'chat': {'id': chat_id}, 'text': '/start'})
+            for i, chat_id in enumerate(chat_ids)]
+
+
+def test_shard_for_keeps_chat_on_one_shard():
+    assert {shard_for(chat_id, 3) for chat_id in [4, 7, 10]} == {1}
+    assert [shard_for(chat_id, 2) for chat_id in [10, 11]] == [0, 1]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_sharded_runtime_processes_batches_and_resizes(fake_telegram, settings, monkeypatch):
+    settings.TG_GLOBAL_RATE = 30
+    # процессы запускаются через spawn и берут настройки из окружения: тестовая БД и фейковый Telegram
+    monkeypatch.setenv('DB_NAME', connection.settings_dict['NAME'])
+    monkeypatch.setenv('TG_API_URL', fake_telegram.url)
+    sender = SendScheduler(TgClient(token='test'))
+    runtime = ShardedBotRuntime(TgClient(token='test'), workers=2, concurrency=2, poll_timeout=0, sender=sender)
+
+    async def run():
+        await runtime.start()
+        pids = {worker.process.pid for worker in runtime.workers}
+        # общий лимит делят два процесса-обработчика и родитель
+        rates = [sender.global_bucket.rate, *(worker.global_rate for worker in runtime.workers)]
+        await runtime.process_batch(make_updates(1, [10, 11, 12]))
+
+        runtime.resize(3)
+        await runtime.process_batch(make_updates(4, [13, 14]))
+        resized = len(runtime.workers)
+        runtime.close()
+        runtime.dispatcher.close()
+        return pids, resized, rates
+
+    pids, resized, rates = asyncio.run(run())
+
+    assert len(pids) == 2 and resized == 3
+    assert rates == [10, 10, 10] and sender.global_bucket.rate == 7.5
+    assert set(TgUser.objects.values_list('chat_id', flat=True)) == {10, 11, 12, 13, 14}
+    for chat_id in range(10, 15):
+        assert 'Your verification code is' in '\n'.join(fake_telegram.sent_to(chat_id))
@@ -0,0 +1,71 @@
+import pytest
+
+from bot.management.commands.runbot import Command
+from bot.models import TgUser
+from bot.state import DialogState, MemoryStateStore, CacheStateStore
+from bot.tg.schemas import UpdateObj
+from core.models import User
+from goals.models import Board, BoardParticipant, Category, Goal
+from tests.test_bot.fake_telegram import fake_telegram  # noqa: F401
+
+
+@pytest.mark.parametrize('store_class', [MemoryStateStore, CacheStateStore])
+def test_state_expires_after_ttl(store_class):
+    store = store_class(ttl=60)
+    store.set(1, DialogState(state=1))
+    assert store.get(1).state == 1
+
+    store.set(1, DialogState())
+    assert store.get(1) is None
+
+    store.ttl = 0
+    store.set(2, DialogState(state=2))
+    assert store.get(2) is None
+
+
+@pytest.mark.django_db
+def test_create_dialog_steps_without_state_writes(fake_telegram, django_assert_num_queries):
+    user = User.objects.create(username='test_user')
+    board = Board.objects.create(title='Board')
+    BoardParticipant.objects.create(user=user, board=board)
+    category = Category.objects.create(board=board, user=user, title='Category')
+    TgUser.objects.create(chat_id=1, user=user)
+    command = Command()
+
+    def send(text: str) -> None:
+        updates = [UpdateObj(update_id=1, message={'chat': {'id': 1}, 'text': text})]
+        command.begin_batch(updates)
+        command.handle_message(updates[0].message)
+        command.end_batch(updates)
+
+    send('/create')
+    # выбор категории: только чтение TgUser пачки
+    with django_assert_num_queries(1):
+        send('Category')
+    send('Goal')
+    command.sender.close()
+
+    goal = Goal.objects.get()
+    assert (goal.title, goal.category) == ('Goal', category)
+    assert command.state_store.get(1) is None
+    assert TgUser.objects.get(chat_id=1).state == 0
+
+
+@pytest.mark.django_db
+def test_state_write_back():
+    user = User.objects.create(username='test_user')
+    board = Board.objects.create(title='Board')
+    category = Category.objects.create(board=board, user=user, title='Category')
+    TgUser.objects.bulk_create([TgUser(chat_id=1, user=user), TgUser(chat_id=2, user=user, state=1)])
+    store = MemoryStateStore(write_back_interval=60)
+
+    store.set(1, DialogState(state=2, category_id=category.id))
+    store.set(2, DialogState())
+    assert store.write_back() == 0
+    assert store.write_back(force=True) == 2
+
+    tg_users = {tg_user.chat_id: tg_user for tg_user in TgUser.objects.all()}
+    assert (tg_users[1].state, tg_users[1].category_id) == (2, category.id)
+    assert (tg_users[2].state, tg_users[2].category_id) == (0, None)
+    # после перезапуска состояние восстанавливается из TgUser
+    assert MemoryStateStore(write_back_interval=60).load(tg_users[1]).category_id == category.id
@@ -0,0 +1,117 @@
+import asyncio
+import socket
+import time
+
+import pytest
+
+from bot.management.commands.runbot import Command
+from bot.tg.client import TgClient, AsyncTgClient, TgClientError
+from tests.test_bot.fake_telegram import fake_telegram  # noqa: F401
+
+
+def test_client_retries_after_flood_wait(fake_telegram, settings):
+    settings.TG_BACKOFF_BASE = 0
+    fake_telegram.errors = [
+        (429, {'ok': False, 'description': 'Too Many Requests', 'parameters': {'retry_after': 0}}),
+        (429, {'ok': False, 'description': 'Too Many Requests'}),
+    ]
+    client = TgClient(token='test')
+
+    response = client.send_message(1, 'hello')
+
+    assert response.result.text == 'hello'
+    assert fake_telegram.sent_to(1) == ['hello']
+    metrics = client.metrics.snapshot()['sendMessage']
+    assert metrics['requests'] == 3
+    assert metrics['errors'] == 2
+    assert metrics['retries'] == 2
+
+
+def test_runbot_logs_transport_metrics(fake_telegram, settings, caplog):
+    settings.BOT_METRICS_INTERVAL = 0.01
+    command = Command()
+    command.tg_client.send_message(1, 'hello')
+    command.sender.send_message(2, 'hi')
+    command.sender.flush()
+
+    async def run():
+        task = asyncio.create_task(command.log_metrics_periodically())
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+    with caplog.at_level('INFO', logger='bot.management.commands.runbot'):
+        asyncio.run(run())
+    command.sender.close()
+
+    assert 'Bot API sendMessage: requests=2 errors=0 retries=0' in caplog.text
+    assert 'Send scheduler: queued=0 chats=0 max_chat_depth=0 in_flight=0 requests=1' in caplog.text
+
+
+def test_client_does_not_retry_client_errors(fake_telegram):
+    fake_telegram.errors = [(400, {'ok': False, 'description': 'Bad Request: chat not found'})]
+    client = TgClient(token='test')
+
+    with pytest.raises(TgClientError) as e:
+        client.send_message(1, 'hello')
+
+    assert e.value.status_code == 400
+    assert client.metrics.snapshot()['sendMessage']['retries'] == 0
+
+
+def test_send_message_not_retried_when_it_may_be_delivered(fake_telegram, settings):
+    settings.TG_BACKOFF_BASE = 0
+    settings.TG_READ_TIMEOUT = 0.2
+    fake_telegram.errors = [(502, {'ok': False, 'description': 'Bad Gateway'})]
+    client = TgClient(token='test')
+
+    with pytest.raises(TgClientError) as e:
+        client.send_message(1, 'hello')
+    assert e.value.status_code == 502
+
+    # ответ не дождались, но сообщение дошло: повтор отправил бы его второй раз
+    fake_telegram.send_delays = {1: 0.5}
+    with pytest.raises(TgClientError) as e:
+        client.send_message(1, 'hello')
+    assert e.value.status_code is None
+    time.sleep(0.5)
+    assert fake_telegram.sent_to(1) == ['hello']
+    assert client.metrics.snapshot()['sendMessage']['retries'] == 0
+
+
+def test_send_message_retried_on_connection_error(settings):
+    settings.TG_BACKOFF_BASE = 0
+    settings.TG_MAX_RETRIES = 1
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        settings.TG_API_URL = f'http://127.0.0.1:{sock.getsockname()[1]}'
+    client = TgClient(token='test')
+
+    with pytest.raises(TgClientError):
+        client.send_message(1, 'hello')
+    assert client.metrics.snapshot()['sendMessage']['retries'] == 1
+
+
+def test_client_gives_up_after_max_retries(fake_telegram, settings):
+    settings.TG_BACKOFF_BASE = 0
+    settings.TG_MAX_RETRIES = 1
+    fake_telegram.errors = [(500, {'ok': False, 'description': 'Internal'})] * 2
+    client = TgClient(token='test')
+
+    with pytest.raises(TgClientError):
+        client.get_updates(timeout=0)
+    assert client.metrics.snapshot()['getUpdates']['retries'] == 1
+
+    fake_telegram.errors = [(502, {'ok': False, 'description': 'Bad Gateway'})]
+    fake_telegram.add_update(1, '/start')
+    assert [update.update_id for update in client.get_updates(timeout=0).result] == [1]
+
+
+def test_async_client_shares_transport(fake_telegram):
+    fake_telegram.add_update(1, '/start')
+    client = TgClient(token='test')
+    async_client = AsyncTgClient(client)
+
+    response = asyncio.run(async_client.get_updates(timeout=0))
+
+    assert [update.update_id for update in response.result] == [1]
+    assert async_client.metrics.snapshot()['getUpdates']['requests'] == 1
@@ -0,0 +1,92 @@
+import json
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import Client
+from django.urls import reverse
+
+from bot.checkpoint import UpdateCheckpoint
+from bot.management.commands.runbot import Command
+from bot.models import TgUser, ProcessedUpdate, WebhookUpdate
+from bot.webhook import WebhookInbox
+from tests.test_bot.fake_telegram import fake_telegram  # noqa: F401
+
+HEADERS = {'X-Telegram-Bot-Api-Secret-Token': 'secret'}
+
+
+def update(update_id: int, chat_id: int, text: str) -> str:
+    return json.dumps({'update_id': update_id, 'message': {'chat': {'id': chat_id}, 'text': text}})
+
+
+@pytest.fixture
+def webhook_settings(settings):
+    settings.BOT_MODE = 'webhook'
+    settings.BOT_WEBHOOK_SECRET = 'secret'
+    return settings
+
+
+def post(*bodies: str) -> list[int]:
+    client = Client()
+    return [client.post(reverse('bot-webhook'), body, content_type='application/json', headers=HEADERS).status_code
+            for body in bodies]
+
+
+@pytest.mark.django_db
+def test_webhook_stores_each_update_once(webhook_settings):
+    statuses = post(
+        update(2, 20, '/start'),
+        update(1, 10, '/start'),
+        # Telegram повторил доставку
+        update(1, 10, '/start'),
+        json.dumps({'update_id': 3, 'edited_message': {}}),
+    )
+
+    assert statuses == [200, 200, 200, 200]
+    assert sorted(WebhookUpdate.objects.values_list('update_id', flat=True)) == [1, 2]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_runbot_is_the_single_consumer(fake_telegram, webhook_settings):
+    post(update(2, 20, '/start'), update(1, 10, '/start'))
+    command = Command()
+    checkpoint = UpdateCheckpoint(name='webhook', interval=0)
+    inbox = WebhookInbox(checkpoint, poll_interval=0)
+    runtime = command.build_runtime(2, checkpoint=checkpoint, fetch_updates=inbox.fetch)
+
+    async def consume():
+        await runtime.start()
+        processed = await runtime.poll_once()
+        await runtime.join()
+        await runtime.poll_once()
+        await runtime.join()
+        return processed
+
+    # пачка берется по возрастанию update_id, контрольная точка сохраняется в БД
+    assert async_to_sync(consume)() == 2
+    assert set(TgUser.objects.values_list('chat_id', flat=True)) == {10, 20}
+    assert checkpoint.update_id == 2 and not ProcessedUpdate.objects.exists()
+    # сохраненные в контрольной точке строки удалены при следующей выборке
+    assert not WebhookUpdate.objects.exists()
+    sent = len(fake_telegram.sent)
+
+    # запоздалый повтор уже обработанного обновления отсекается контрольной точкой
+    post(update(1, 10, '/start'))
+    assert async_to_sync(consume)() == 0
+    assert len(fake_telegram.sent) == sent
+    runtime.dispatcher.close()
+
+
+@pytest.mark.django_db
+def test_webhook_rejects_wrong_secret(webhook_settings):
+    client = Client()
+
+    def post_with(**headers):
+        return client.post(reverse('bot-webhook'), update(1, 10, '/start'), content_type='application/json',
+                           headers=headers)
+
+    assert post_with().status_code == 403
+    assert post_with(**{'X-Telegram-Bot-Api-Secret-Token': 'wrong'}).status_code == 403
+
+    webhook_settings.BOT_MODE = 'polling'
+    assert post_with(**HEADERS).status_code == 404
+    assert not WebhookUpdate.objects.exists()
@@ -0,0 +1,72 @@
+import pytest
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.models import User
+from goals.models import Board, BoardParticipant, Category
+from goals.search import autocomplete
+
+
+@pytest.mark.django_db
+def test_category_autocomplete():
+    user = User.objects.create(username="test_user")
+    board = Board.objects.create(title="Test Board")
+    foreign_board = Board.objects.create(title="Foreign Board")
+    BoardParticipant.objects.create(user=user, board=board, role=BoardParticipant.Role.reader)
+    for title in ["Покупки", "Спорт", "Работа", "Покупки на неделю"]:
+        Category.objects.create(board=board, user=user, title=title)
+    Category.objects.create(board=foreign_board, user=user, title="Покупки чужие")
+
+    client = APIClient()
+    client.force_authenticate(user)
+    url = reverse('category-autocomplete')
+
+    response = client.get(url, {'q': 'пок'})
+    assert response.status_code == 200
+    assert [category['title'] for category in response.data] == ["Покупки", "Покупки на неделю"]
+    assert set(response.data[0]) == {'id', 'title'}
+
+    # опечатка находится нечетким поиском
+    response = client.get(url, {'q': 'Рабoта'})
+    assert [category['title'] for category in response.data] == ["Работа"]
+
+    response = client.get(url, {'q': 'пок', 'limit': 100})
+    assert len(response.data) == 2
+    response = client.get(url, {'q': 'пок', 'limit': 1})
+    assert len(response.data) == 1
+
+
+@pytest.mark.django_db
+def test_board_autocomplete():
+    user = User.objects.create(username="test_user")
+    for title in ["Дом", "Дача", "Офис"]:
+        board = Board.objects.create(title=title)
+        BoardParticipant.objects.create(user=user, board=board)
+
+    client = APIClient()
+    client.force_authenticate(user)
+    response = client.get(reverse('board-autocomplete'), {'q': 'да'})
+
+    assert response.status_code == 200
+    assert [board['title'] for board in response.data] == ["Дача"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_autocomplete_uses_trigram_index():
+    now = timezone.now()
+    user = User.objects.create(username="test_user")
+    board = Board.objects.create(title="Test Board")
+    Category.objects.bulk_create(
+        Category(board=board, user=user, title=f"Категория {i}", created=now, updated=now) for i in range(10000)
+    )
+    with connection.cursor() as cursor:
+        # VACUUM переносит строки из pending list GIN индекса в сам индекс и обновляет статистику
+        cursor.execute("VACUUM ANALYZE goals_category")
+
+    plan = autocomplete(Category.objects.filter(board=board, is_deleted=False), 'Пок', 10).explain()
+    # префикс ищется через title ILIKE 'Пок%', а не UPPER(title) LIKE, поэтому оба условия идут по индексу
+    assert "Index Cond: ((title)::text ~~* 'Пок%'::text)" in plan
+    assert "Index Cond: ((title)::text % 'Пок'::text)" in plan
+    assert 'category_title_trgm' in plan and 'Seq Scan' not in plan
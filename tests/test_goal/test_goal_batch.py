@@ -0,0 +1,86 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import User
+from goals.models import Board, BoardParticipant, Category, Goal, Comment, DeletedObject
+
+
+@pytest.fixture
+def batch_setup():
+    user = User.objects.create(username="test_user")
+    board = Board.objects.create(title="Test Board")
+    other_board = Board.objects.create(title="Other Board")
+    read_board = Board.objects.create(title="Read Board")
+    BoardParticipant.objects.create(user=user, board=board, role=BoardParticipant.Role.writer)
+    BoardParticipant.objects.create(user=user, board=other_board)
+    BoardParticipant.objects.create(user=user, board=read_board, role=BoardParticipant.Role.reader)
+    categories = {
+        'own': Category.objects.create(board=board, user=user, title="Category"),
+        'other': Category.objects.create(board=other_board, user=user, title="Other Category"),
+        'read': Category.objects.create(board=read_board, user=user, title="Read Category"),
+    }
+    client = APIClient()
+    client.force_authenticate(user)
+    return client, user, categories
+
+
+@pytest.mark.django_db
+def test_goal_batch_create(batch_setup, django_assert_max_num_queries):
+    client, user, categories = batch_setup
+    operations = [{'category': categories['own'].id, 'title': f'Goal {i}'} for i in range(500)]
+
+    with django_assert_max_num_queries(8):
+        response = client.post(reverse('goal-batch'), {'operations': operations}, format='json')
+
+    assert response.status_code == 200
+    assert [result['result'] for result in response.data['results']] == ['created'] * 500
+    goals = Goal.objects.filter(category=categories['own'])
+    assert goals.count() == 500
+    assert set(goals.values_list('board_id', flat=True)) == {categories['own'].board_id}
+    assert not goals.filter(search_vector=None).exists()
+
+
+@pytest.mark.django_db
+def test_goal_batch_update_and_errors(batch_setup):
+    client, user, categories = batch_setup
+    goal = Goal.objects.create(category=categories['own'], user=user, title="Goal")
+    comment = Comment.objects.create(goal=goal, user=user, text="Comment")
+    read_goal = Goal.objects.create(category=categories['read'], user=user, title="Read Goal")
+
+    operations = [
+        {'id': goal.id, 'status': Goal.Status.done, 'category': categories['other'].id},
+        {'id': read_goal.id, 'title': 'New title'},
+        {'category': categories['read'].id, 'title': 'Goal'},
+        {'category': categories['own'].id},
+        {'id': 0, 'title': 'Missing'},
+    ]
+    response = client.post(reverse('goal-batch'), {'operations': operations}, format='json')
+
+    assert response.status_code == 200
+    results = response.data['results']
+    assert results[0] == {'index': 0, 'id': goal.id, 'result': 'updated'}
+    assert results[1]['errors'] == {'id': ['Permission denied']}
+    assert results[2]['errors'] == {'category': ['Permission denied']}
+    assert 'title' in results[3]['errors']
+    assert results[4]['errors'] == {'id': ['Goal not exists']}
+
+    goal.refresh_from_db()
+    comment.refresh_from_db()
+    assert goal.status == Goal.Status.done
+    assert goal.board_id == comment.board_id == categories['other'].board_id
+    # для старой доски остались записи о переносе, по ним синхронизация сообщит о пропаже
+    assert sorted(DeletedObject.objects.values_list('kind', 'object_id', 'board_id')) == [
+        ('comment', comment.id, categories['own'].board_id), ('goal', goal.id, categories['own'].board_id)]
+    read_goal.refresh_from_db()
+    assert read_goal.title == "Read Goal"
+
+
+@pytest.mark.django_db
+def test_goal_batch_size_limit(batch_setup):
+    client, user, categories = batch_setup
+    operations = [{'category': categories['own'].id, 'title': 'Goal'}] * 501
+
+    response = client.post(reverse('goal-batch'), {'operations': operations}, format='json')
+
+    assert response.status_code == 400
@@ -0,0 +1,54 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import User
+from goals.models import Board, BoardParticipant, Category, Goal, Comment
+
+
+@pytest.mark.django_db
+def test_goal_and_comment_follow_category_board():
+    user = User.objects.create(username="test_user")
+    board = Board.objects.create(title="Test Board")
+    other_board = Board.objects.create(title="Other Board")
+    category = Category.objects.create(board=board, user=user, title="Test Category")
+    other_category = Category.objects.create(board=other_board, user=user, title="Other Category")
+
+    goal = Goal.objects.create(category=category, user=user, title="Test Goal")
+    comment = Comment.objects.create(goal=goal, user=user, text="Test Comment")
+    assert goal.board_id == comment.board_id == board.id
+
+    goal = Goal.objects.get(id=goal.id)
+    goal.category = other_category
+    goal.save()
+    comment.refresh_from_db()
+    assert goal.board_id == comment.board_id == other_board.id
+
+    other_category = Category.objects.get(id=other_category.id)
+    other_category.board = board
+    other_category.save()
+    goal.refresh_from_db()
+    comment.refresh_from_db()
+    assert goal.board_id == comment.board_id == board.id
+
+
+@pytest.mark.django_db
+def test_goal_and_comment_lists_filtered_by_board():
+    user = User.objects.create(username="test_user")
+    stranger = User.objects.create(username="stranger")
+    board = Board.objects.create(title="Test Board")
+    foreign_board = Board.objects.create(title="Foreign Board")
+    BoardParticipant.objects.create(user=user, board=board, role=BoardParticipant.Role.reader)
+    BoardParticipant.objects.create(user=stranger, board=foreign_board)
+    for owner, goal_board in ((user, board), (stranger, foreign_board)):
+        category = Category.objects.create(board=goal_board, user=owner, title="Category")
+        goal = Goal.objects.create(category=category, user=owner, title="Goal")
+        Comment.objects.create(goal=goal, user=owner, text="Comment")
+
+    client = APIClient()
+    client.force_authenticate(user)
+
+    goals = client.get(reverse('goal-list')).data
+    comments = client.get(reverse('comment-list')).data
+    assert [goal['board'] for goal in goals] == [board.id]
+    assert [comment['board'] for comment in comments] == [board.id]
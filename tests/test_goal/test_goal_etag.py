@@ -0,0 +1,86 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import User
+from goals.models import Board, BoardParticipant, Category, Goal, Comment
+
+
+@pytest.fixture
+def board_data():
+    user = User.objects.create(username="test_user")
+    board = Board.objects.create(title="Test Board")
+    BoardParticipant.objects.create(user=user, board=board)
+    category = Category.objects.create(board=board, user=user, title="Test Category")
+    goal = Goal.objects.create(category=category, user=user, title="Test Goal")
+    client = APIClient()
+    client.force_authenticate(user)
+    return client, user, board, category, goal
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url_name', ['goal-list', 'categories-list', 'board-details'])
+def test_not_modified_without_list_query(board_data, django_assert_num_queries, url_name):
+    client, user, board, category, goal = board_data
+    url = reverse(url_name, kwargs={'pk': board.id} if url_name == 'board-details' else None)
+
+    response = client.get(url)
+    etag = response['ETag']
+    assert response.status_code == 200 and etag.startswith('W/"')
+
+    # только версии досок, роли уже в кэше
+    with django_assert_num_queries(1):
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response['ETag'] == etag
+
+    Comment.objects.create(goal=goal, user=user, text="text")
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+
+
+@pytest.mark.django_db
+def test_board_version_bumped_by_writes(board_data):
+    client, user, board, category, goal = board_data
+    other_board = Board.objects.create(title="Other Board")
+    BoardParticipant.objects.create(user=user, board=other_board)
+
+    def versions():
+        return dict(Board.objects.values_list('id', 'version'))
+
+    before = versions()
+    client.post(reverse('goal-transition'), {'ids': [goal.id], 'status': Goal.Status.done}, format='json')
+    after_transition = versions()
+    assert after_transition[board.id] > before[board.id]
+    assert after_transition[other_board.id] == before[other_board.id]
+
+    other_category = Category.objects.create(board=other_board, user=user, title="Other Category")
+    client.post(reverse('goal-batch'), {'operations': [{'id': goal.id, 'category': other_category.id}]},
+                format='json')
+    after_batch = versions()
+    # цель ушла с доски - меняются обе
+    assert after_batch[board.id] > after_transition[board.id]
+    assert after_batch[other_board.id] > after_transition[other_board.id]
+
+    response = client.get(reverse('goal-list'), {'limit': 10})
+    etag = response['ETag']
+    assert client.get(reverse('goal-list'), {'limit': 10}, HTTP_IF_NONE_MATCH=etag).status_code == 304
+    assert client.get(reverse('goal-list'), {'limit': 20}, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url_name', ['categories-list', 'board-details'])
+def test_profile_change_invalidates_etag(board_data, url_name):
+    client, user, board, category, goal = board_data
+    url = reverse(url_name, kwargs={'pk': board.id} if url_name == 'board-details' else None)
+    etag = client.get(url)['ETag']
+
+    # вход обновляет только last_login, ответы не меняются
+    user.save(update_fields=['last_login'])
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    user.first_name = 'Ivan'
+    user.save()
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200 and response['ETag'] != etag
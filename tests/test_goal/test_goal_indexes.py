@@ -0,0 +1,75 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.utils import timezone
+
+from core.models import User
+from goals.models import Board, BoardParticipant, Category, Goal, Comment
+
+STATUSES = [Goal.Status.to_do, Goal.Status.in_progress, Goal.Status.archived] + [Goal.Status.done] * 17
+
+
+@pytest.fixture
+def seeded_board():
+    """
+    Seq scan не запрещается: планировщик должен сам предпочесть индекс всем прочим планам,
+    поэтому у проверяемых доски, категории и цели строк много, а фильтры по статусу и сроку избирательны.
+    Статистику собирает VACUUM ANALYZE, он не работает в транзакции - поэтому тест transactional,
+    и после него таблицы очищаются TRUNCATE, не оставляя другим тестам раздутых таблиц и статистики.
+    """
+    now = timezone.now()
+    dates = {'created': now, 'updated': now}
+    users = User.objects.bulk_create(User(username=f"user_{i}") for i in range(2000))
+    user = users[0]
+    boards = Board.objects.bulk_create(Board(title=f"Board {i}", **dates) for i in range(40))
+    BoardParticipant.objects.bulk_create(
+        BoardParticipant(user=participant, board=board, **dates)
+        for index, board in enumerate(boards) for participant in users[index * 50:(index + 1) * 50]
+    )
+    categories = Category.objects.bulk_create(
+        Category(board=board, user=user, title=f"Category {i}", **dates)
+        for index, board in enumerate(boards) for i in range(1000 if index == 0 else 20)
+    )
+    goals = Goal.objects.bulk_create(
+        Goal(category=categories[0], board=boards[0], user=user, title=f"Goal {i}",
+             status=STATUSES[i % len(STATUSES)], due_date=now - timedelta(days=i), **dates)
+        for i in range(2000)
+    ) + Goal.objects.bulk_create(
+        Goal(category=category, board_id=category.board_id, user=user, title=f"Goal {i}",
+             status=Goal.Status.done, due_date=now - timedelta(days=3000), **dates)
+        for category in categories[1:] for i in range(5)
+    )
+    Comment.objects.bulk_create(
+        Comment(goal=goal, board_id=goal.board_id, user=user, text="text", **dates)
+        for index, goal in enumerate(goals[::100]) for _ in range(1000 if index == 0 else 20)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute("VACUUM ANALYZE")
+    return user, boards[0], categories[0], goals[0]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_hot_queries_use_indexes(seeded_board):
+    user, board, category, goal = seeded_board
+
+    plans = {
+        "participant_user_board_role": BoardParticipant.objects.filter(user=user).values_list("board_id", "role"),
+        "category_board_title": Category.objects.filter(board=board, is_deleted=False).order_by("title"),
+        "goal_category_status": Goal.objects.filter(
+            category=category, status__in=[Goal.Status.to_do, Goal.Status.in_progress]).exclude(
+            status=Goal.Status.archived),
+        "goal_category_title": Goal.objects.filter(category=category).exclude(
+            status=Goal.Status.archived).order_by("title"),
+        "goal_category_created": Goal.objects.filter(category=category).exclude(
+            status=Goal.Status.archived).order_by("created"),
+        "goal_category_due_date": Goal.objects.filter(
+            category=category, due_date__gte=timezone.now() - timedelta(days=30)).exclude(
+            status=Goal.Status.archived),
+        "comment_goal_created": Comment.objects.filter(goal=goal).order_by("created"),
+    }
+
+    for index_name, queryset in plans.items():
+        # списки отдаются постранично, поэтому проверяем план с LIMIT
+        plan = queryset[:20].explain()
+        assert index_name in plan, plan
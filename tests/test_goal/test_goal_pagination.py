@@ -0,0 +1,84 @@
+import base64
+import json
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import User
+from goals.models import Board, BoardParticipant, Category, Goal
+
+
+@pytest.fixture
+def goals_client():
+    user = User.objects.create(username="test_user")
+    board = Board.objects.create(title="Test Board")
+    BoardParticipant.objects.create(user=user, board=board, role=BoardParticipant.Role.owner)
+    category = Category.objects.create(board=board, user=user, title="Test Category")
+    # повторяющиеся названия, чтобы порядок внутри одинаковых значений решал id
+    for title in ["b", "a", "c", "a", "b", "a", "d"]:
+        Goal.objects.create(category=category, user=user, title=title)
+
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.mark.django_db
+def test_goal_list_cursor_pagination(goals_client):
+    url = reverse('goal-list')
+    expected = list(Goal.objects.order_by('-title', 'id').values_list('id', flat=True))
+
+    pages, next_url = [], f'{url}?ordering=-title&limit=3&cursor='
+    while next_url:
+        response = goals_client.get(next_url)
+        assert response.status_code == 200
+        assert 'count' not in response.data
+        pages.append([goal['id'] for goal in response.data['results']])
+        next_url = response.data['next']
+
+    assert [goal_id for page in pages for goal_id in page] == expected
+    assert [len(page) for page in pages] == [3, 3, 1]
+
+    response = goals_client.get(response.data['previous'])
+    assert [goal['id'] for goal in response.data['results']] == pages[1]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('ordering', ['created', '-created'])
+def test_goal_list_cursor_by_created(goals_client, ordering):
+    url = reverse('goal-list')
+    expected = list(Goal.objects.order_by(ordering, 'id').values_list('id', flat=True))
+
+    goal_ids, next_url = [], f'{url}?ordering={ordering}&limit=2&cursor='
+    while next_url:
+        response = goals_client.get(next_url)
+        goal_ids += [goal['id'] for goal in response.data['results']]
+        next_url = response.data['next']
+
+    # микросекунды created не теряются в курсоре: строки не повторяются и не пропускаются
+    assert goal_ids == expected
+
+
+@pytest.mark.django_db
+def test_goal_list_invalid_cursor(goals_client):
+    response = goals_client.get(reverse('goal-list'), {'cursor': 'broken'})
+    assert response.status_code == 404
+
+    cursor = base64.urlsafe_b64encode(json.dumps({'p': ['x', 1], 'r': 0}).encode()).decode()
+    response = goals_client.get(reverse('goal-list'), {'ordering': 'created', 'cursor': cursor})
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_goal_list_without_count(goals_client):
+    response = goals_client.get(reverse('goal-list'), {'limit': 5, 'count': 'false'})
+
+    assert response.status_code == 200
+    assert 'count' not in response.data
+    assert len(response.data['results']) == 5
+    assert 'offset=5' in response.data['next']
+
+    response = goals_client.get(response.data['next'])
+    assert len(response.data['results']) == 2
+    assert response.data['next'] is None
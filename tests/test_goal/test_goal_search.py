@@ -0,0 +1,46 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import User
+from goals.models import Board, BoardParticipant, Category, Goal, Comment
+from goals.search import search_query
+
+
+@pytest.mark.django_db
+def test_goal_search_ranked_and_filtered_by_board():
+    user = User.objects.create(username="test_user")
+    stranger = User.objects.create(username="stranger")
+    board = Board.objects.create(title="Test Board")
+    foreign_board = Board.objects.create(title="Foreign Board")
+    BoardParticipant.objects.create(user=user, board=board, role=BoardParticipant.Role.reader)
+    category = Category.objects.create(board=board, user=user, title="Category")
+    foreign_category = Category.objects.create(board=foreign_board, user=stranger, title="Category")
+
+    title_goal = Goal.objects.create(category=category, user=user, title="Купить молоко")
+    comment_goal = Goal.objects.create(category=category, user=user, title="Магазин")
+    Comment.objects.create(goal=comment_goal, user=user, text="не забыть молоко")
+    Goal.objects.create(category=category, user=user, title="Прочитать книгу")
+    Goal.objects.create(category=foreign_category, user=stranger, title="Молоко")
+
+    client = APIClient()
+    client.force_authenticate(user)
+    response = client.get(reverse('goal-search'), {'q': 'молоко'})
+
+    assert response.status_code == 200
+    assert [goal['id'] for goal in response.data] == [title_goal.id, comment_goal.id]
+    assert 'search_vector' not in response.data[0]
+
+
+@pytest.mark.django_db
+def test_goal_search_vector_follows_title():
+    user = User.objects.create(username="test_user")
+    board = Board.objects.create(title="Test Board")
+    category = Category.objects.create(board=board, user=user, title="Category")
+    goal = Goal.objects.create(category=category, user=user, title="Старое название")
+
+    goal.title = "Новое название"
+    goal.save()
+
+    assert list(Goal.objects.filter(search_vector=search_query("новое"))) == [goal]
+    assert not Goal.objects.filter(search_vector=search_query("старое")).exists()
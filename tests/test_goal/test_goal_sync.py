@@ -0,0 +1,147 @@
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.models import User
+from goals.models import Board, BoardParticipant, Category, Goal, Comment
+from goals.sync import decode_cursor
+
+
+@pytest.fixture
+def sync_data(settings):
+    settings.SYNC_CURSOR_LAG = 0
+    user = User.objects.create(username="test_user")
+    board = Board.objects.create(title="Test Board")
+    BoardParticipant.objects.create(user=user, board=board)
+    category = Category.objects.create(board=board, user=user, title="Test Category")
+    goal = Goal.objects.create(category=category, user=user, title="Test Goal")
+    Comment.objects.create(goal=goal, user=user, text="text")
+    client = APIClient()
+    client.force_authenticate(user)
+    return client, user, board, category, goal
+
+
+def sync(client, cursor=None):
+    response = client.get(reverse('goals-sync'), {'cursor': cursor} if cursor else None)
+    assert response.status_code == 200
+    return response.data
+
+
+@pytest.mark.django_db
+def test_sync_returns_changes_since_cursor(sync_data):
+    client, user, board, category, goal = sync_data
+    data = sync(client)
+    assert [len(data[name]) for name in ('categories', 'goals', 'comments')] == [1, 1, 1]
+    assert not data['has_more'] and not data['reset']
+
+    data = sync(client, data['cursor'])
+    assert [len(data[name]) for name in ('categories', 'goals', 'comments')] == [0, 0, 0]
+
+    # удаление категории архивирует цели через update - они тоже должны попасть в изменения
+    client.delete(reverse('category-details', kwargs={'pk': category.id}))
+    data = sync(client, data['cursor'])
+    assert [item['is_deleted'] for item in data['categories']] == [True]
+    assert [item['status'] for item in data['goals']] == [Goal.Status.archived]
+    assert data['comments'] == []
+
+
+@pytest.mark.django_db
+def test_sync_returns_deleted_comments(sync_data):
+    client, user, board, category, goal = sync_data
+    comment = Comment.objects.get(goal=goal)
+    data = sync(client)
+    assert data['deleted'] == []
+
+    assert client.delete(reverse('comment-details', kwargs={'pk': comment.id})).status_code == 204
+    data = sync(client, data['cursor'])
+    assert data['comments'] == []
+    assert [(item['kind'], item['id']) for item in data['deleted']] == [('comment', comment.id)]
+
+    data = sync(client, data['cursor'])
+    assert data['deleted'] == []
+
+
+@pytest.mark.django_db
+def test_sync_reports_objects_moved_to_foreign_board(sync_data):
+    owner_client, owner, board, category, goal = sync_data
+    comment = Comment.objects.get(goal=goal)
+    reader = User.objects.create(username="reader")
+    BoardParticipant.objects.create(user=reader, board=board, role=BoardParticipant.Role.reader)
+    reader_client = APIClient()
+    reader_client.force_authenticate(reader)
+    other_board = Board.objects.create(title="Other Board")
+    BoardParticipant.objects.create(user=owner, board=other_board)
+    other_category = Category.objects.create(board=other_board, user=owner, title="Other Category")
+    reader_cursor = sync(reader_client)['cursor']
+    owner_cursor = sync(owner_client)['cursor']
+
+    # цель ушла на доску, которую читатель не видит
+    goal.category = other_category
+    goal.save()
+
+    data = sync(reader_client, reader_cursor)
+    reader_cursor = data['cursor']
+    assert data['goals'] == [] and data['comments'] == []
+    assert sorted((item['kind'], item['id']) for item in data['deleted']) == [('comment', comment.id),
+                                                                              ('goal', goal.id)]
+    # владелец видит обе доски: цель приходит обновленной, а не удаленной
+    data = sync(owner_client, owner_cursor)
+    assert [item['id'] for item in data['goals']] == [goal.id]
+    assert data['deleted'] == []
+
+    category.board = other_board
+    category.save()
+    data = sync(reader_client, reader_cursor)
+    assert [(item['kind'], item['id']) for item in data['deleted']] == [('category', category.id)]
+
+
+@pytest.mark.django_db
+def test_sync_cursor_not_ahead_of_lag(sync_data, settings):
+    client, user, board, category, goal = sync_data
+    settings.SYNC_CURSOR_LAG = 60
+    settings.SYNC_MAX_CHANGES = 1
+    Goal.objects.create(category=category, user=user, title="Second Goal")
+
+    # обе цели новее границы: страница отдается, но курсор остается на границе
+    data = sync(client)
+    assert [item['id'] for item in data['goals']] == [goal.id]
+    assert not data['has_more']
+    updated, _ = decode_cursor(data['cursor'])[1]['goals']
+    assert updated < goal.updated
+
+    assert [item['id'] for item in sync(client, data['cursor'])['goals']] == [goal.id]
+
+
+@pytest.mark.django_db
+def test_sync_pages_rows_with_same_timestamp(sync_data, settings):
+    client, user, board, category, goal = sync_data
+    settings.SYNC_MAX_CHANGES = 2
+    now = timezone.now()
+    Goal.objects.bulk_create([Goal(category=category, board=board, user=user, title=f'Goal {i}',
+                                   created=now, updated=now) for i in range(5)])
+
+    goal_ids, cursor = [], None
+    while True:
+        data = sync(client, cursor)
+        goal_ids += [item['id'] for item in data['goals']]
+        cursor = data['cursor']
+        if not data['has_more']:
+            break
+    assert sorted(goal_ids) == sorted(Goal.objects.values_list('id', flat=True))
+
+
+@pytest.mark.django_db
+def test_sync_resets_when_boards_change(sync_data):
+    client, user, board, category, goal = sync_data
+    cursor = sync(client)['cursor']
+
+    other_board = Board.objects.create(title="Other Board")
+    Category.objects.create(board=other_board, user=user, title="Other Category")
+    BoardParticipant.objects.create(user=user, board=other_board, role=BoardParticipant.Role.reader)
+
+    data = sync(client, cursor)
+    assert data['reset']
+    assert sorted(item['title'] for item in data['categories']) == ['Other Category', 'Test Category']
+
+    assert client.get(reverse('goals-sync'), {'cursor': 'broken'}).status_code == 404
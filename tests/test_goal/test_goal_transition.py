@@ -0,0 +1,67 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import User
+from goals.models import Board, BoardParticipant, Category, Goal
+
+
+@pytest.fixture
+def transition_setup():
+    user = User.objects.create(username="test_user")
+    board = Board.objects.create(title="Test Board")
+    read_board = Board.objects.create(title="Read Board")
+    BoardParticipant.objects.create(user=user, board=board)
+    BoardParticipant.objects.create(user=user, board=read_board, role=BoardParticipant.Role.reader)
+    category = Category.objects.create(board=board, user=user, title="Category")
+    other_category = Category.objects.create(board=board, user=user, title="Other Category")
+    read_category = Category.objects.create(board=read_board, user=user, title="Read Category")
+    goals = [Goal.objects.create(category=category, user=user, title=f"Goal {i}") for i in range(3)]
+    other_goal = Goal.objects.create(category=other_category, user=user, title="Other Goal")
+    read_goal = Goal.objects.create(category=read_category, user=user, title="Read Goal")
+
+    client = APIClient()
+    client.force_authenticate(user)
+    return client, category, goals, other_goal, read_goal
+
+
+@pytest.mark.django_db
+def test_goal_transition_by_ids(transition_setup, django_assert_num_queries):
+    client, category, goals, other_goal, read_goal = transition_setup
+    ids = [goal.id for goal in goals]
+    old_updated = goals[0].updated
+
+    # роли пользователя, доски целей, UPDATE целей и версий досок, события досок (и savepoint транзакции)
+    with django_assert_num_queries(7):
+        response = client.post(reverse('goal-transition'), {'ids': ids, 'status': Goal.Status.done}, format='json')
+
+    assert response.status_code == 200
+    assert response.data == {'updated': 3}
+    assert set(Goal.objects.filter(id__in=ids).values_list('status', flat=True)) == {Goal.Status.done}
+    assert Goal.objects.get(id=goals[0].id).updated > old_updated
+
+
+@pytest.mark.django_db
+def test_goal_transition_by_filter(transition_setup):
+    client, category, goals, other_goal, read_goal = transition_setup
+    url = f"{reverse('goal-transition')}?category__in={category.id}"
+
+    response = client.post(url, {'status': Goal.Status.archived}, format='json')
+
+    assert response.data == {'updated': 3}
+    assert Goal.objects.get(id=other_goal.id).status == Goal.Status.to_do
+
+
+@pytest.mark.django_db
+def test_goal_transition_not_editable(transition_setup):
+    client, category, goals, other_goal, read_goal = transition_setup
+
+    response = client.post(
+        reverse('goal-transition'), {'ids': [goals[0].id, read_goal.id], 'status': Goal.Status.done}, format='json',
+    )
+
+    assert response.status_code == 403
+    assert Goal.objects.get(id=goals[0].id).status == Goal.Status.to_do
+
+    response = client.post(reverse('goal-transition'), {'status': Goal.Status.done}, format='json')
+    assert response.status_code == 400
@@ -0,0 +1,62 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import User
+from goals.membership import BoardMembership
+from goals.models import Board, BoardParticipant, Category, Goal
+
+
+@pytest.mark.django_db
+def test_membership_roles_loaded_once(django_assert_num_queries):
+    user = User.objects.create(username="test_user")
+    own_board = Board.objects.create(title="Own Board")
+    read_board = Board.objects.create(title="Read Board")
+    BoardParticipant.objects.create(user=user, board=own_board, role=BoardParticipant.Role.owner)
+    BoardParticipant.objects.create(user=user, board=read_board, role=BoardParticipant.Role.reader)
+
+    membership = BoardMembership(user)
+    # роли для чтения из кэша ролей, для записи - из БД, каждые по одному запросу
+    with django_assert_num_queries(2):
+        assert membership.is_owner(own_board.id)
+        assert membership.can_write(own_board.id)
+        assert membership.can_read(read_board.id)
+        assert not membership.can_write(read_board.id)
+        assert not membership.can_read(read_board.id + 1000)
+
+
+@pytest.mark.django_db
+def test_membership_write_checks_ignore_role_cache():
+    user = User.objects.create(username="test_user")
+    board = Board.objects.create(title="Test Board")
+    participant = BoardParticipant.objects.create(user=user, board=board, role=BoardParticipant.Role.owner)
+    BoardMembership(user).roles
+    # роль поменялась в обход сигналов, кэш ролей устарел
+    BoardParticipant.objects.filter(id=participant.id).update(role=BoardParticipant.Role.reader)
+
+    membership = BoardMembership(user)
+    assert membership.role(board.id) == BoardParticipant.Role.owner
+    assert not membership.is_owner(board.id)
+    assert not membership.can_write(board.id)
+    assert membership.writable_board_ids() == []
+
+
+@pytest.mark.django_db
+def test_goal_detail_single_membership_query(django_assert_num_queries):
+    user = User.objects.create(username="test_user")
+    board = Board.objects.create(title="Test Board")
+    BoardParticipant.objects.create(user=user, board=board, role=BoardParticipant.Role.reader)
+    category = Category.objects.create(board=board, user=user, title="Test Category")
+    goal = Goal.objects.create(category=category, user=user, title="Test Goal")
+
+    client = APIClient()
+    client.force_authenticate(user)
+    url = reverse('goal-details', kwargs={'pk': goal.id})
+
+    # цель с автором, роли пользователя
+    with django_assert_num_queries(2):
+        response = client.get(url)
+    assert response.status_code == 200
+
+    response = client.put(url, {'title': 'New title', 'category': category.id})
+    assert response.status_code == 403
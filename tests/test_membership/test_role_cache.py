@@ -0,0 +1,134 @@
+import pytest
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import User
+from goals import membership
+from goals.membership import get_board_roles, role_cache_stats, invalidate_board_roles
+from goals.models import Board, BoardParticipant
+
+
+@pytest.fixture
+def owner_board():
+    user = User.objects.create(username="owner")
+    board = Board.objects.create(title="Test Board")
+    BoardParticipant.objects.create(user=user, board=board, role=BoardParticipant.Role.owner)
+    return user, board
+
+
+@pytest.mark.django_db
+def test_roles_served_from_cache(owner_board, django_assert_num_queries):
+    user, board = owner_board
+    assert get_board_roles(user.id) == {board.id: BoardParticipant.Role.owner}
+
+    hits = role_cache_stats()['l1_hits']
+    with django_assert_num_queries(0):
+        assert get_board_roles(user.id) == {board.id: BoardParticipant.Role.owner}
+    assert role_cache_stats()['l1_hits'] == hits + 1
+
+
+@pytest.mark.django_db
+def test_roles_invalidated_by_signals(owner_board):
+    user, board = owner_board
+    other_board = Board.objects.create(title="Other Board")
+    get_board_roles(user.id)
+
+    participant = BoardParticipant.objects.create(user=user, board=other_board, role=BoardParticipant.Role.reader)
+    assert get_board_roles(user.id)[other_board.id] == BoardParticipant.Role.reader
+
+    participant.delete()
+    assert other_board.id not in get_board_roles(user.id)
+
+
+@pytest.mark.django_db
+def test_roles_invalidated_by_board_participants_update(owner_board):
+    owner, board = owner_board
+    reader = User.objects.create(username="reader")
+    BoardParticipant.objects.create(user=reader, board=board, role=BoardParticipant.Role.reader)
+    assert board.id in get_board_roles(reader.id)
+
+    client = APIClient()
+    client.force_authenticate(owner)
+    response = client.put(
+        reverse('board-details', kwargs={'pk': board.id}),
+        {'title': 'Test Board', 'participants': []},
+        format='json',
+    )
+
+    assert response.status_code == 200
+    assert board.id not in get_board_roles(reader.id)
+
+
+@pytest.mark.django_db
+def test_board_participants_update_notifies_once(owner_board):
+    owner, board = owner_board
+    readers = [User.objects.create(username=f"reader{i}") for i in range(3)]
+    for reader in readers:
+        BoardParticipant.objects.create(user=reader, board=board, role=BoardParticipant.Role.reader)
+    writer = User.objects.create(username="writer")
+    assert board.id not in get_board_roles(writer.id)
+    version = Board.objects.get(id=board.id).version
+
+    client = APIClient()
+    client.force_authenticate(owner)
+    with CaptureQueriesContext(connection) as queries:
+        response = client.put(
+            reverse('board-details', kwargs={'pk': board.id}),
+            {'title': 'Test Board', 'participants': [{'user': 'writer', 'role': BoardParticipant.Role.writer}]},
+            format='json',
+        )
+
+    assert response.status_code == 200
+    # одно событие и одно увеличение версии на всю замену участников
+    assert sum('participants.changed' in query['sql'] for query in queries.captured_queries) == 1
+    assert Board.objects.get(id=board.id).version == version + 1
+    assert all(board.id not in get_board_roles(reader.id) for reader in readers)
+    assert get_board_roles(writer.id)[board.id] == BoardParticipant.Role.writer
+
+
+@pytest.fixture
+def l2_cache(settings):
+    settings.CACHES = {
+        **settings.CACHES,
+        'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'shared'},
+    }
+    settings.BOARD_ROLES_L2_CACHE = 'shared'
+    yield caches['shared']
+    caches['shared'].clear()
+
+
+@pytest.mark.django_db
+def test_roles_l2_cache(owner_board, l2_cache, django_assert_num_queries):
+    user, board = owner_board
+    get_board_roles(user.id)
+    caches['board_roles'].clear()
+
+    hits = role_cache_stats()['l2_hits']
+    with django_assert_num_queries(0):
+        assert get_board_roles(user.id) == {board.id: BoardParticipant.Role.owner}
+    assert role_cache_stats()['l2_hits'] == hits + 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_stale_roles_not_cached_after_invalidation(owner_board, l2_cache, monkeypatch):
+    user, board = owner_board
+    load_board_roles = membership.load_board_roles
+
+    def load_then_remove(user_id):
+        # параллельный запрос прочитал роли, а потом участника удалили и транзакция закоммитилась
+        roles = load_board_roles(user_id)
+        with transaction.atomic():
+            BoardParticipant.objects.filter(user_id=user_id).delete()
+            invalidate_board_roles(user_id)
+        return roles
+
+    monkeypatch.setattr(membership, 'load_board_roles', load_then_remove)
+    assert get_board_roles(user.id) == {board.id: BoardParticipant.Role.owner}
+    monkeypatch.setattr(membership, 'load_board_roles', load_board_roles)
+
+    # старые роли остались в L1 этого процесса, но в L2 лежат под устаревшей версией
+    caches['board_roles'].clear()
+    assert get_board_roles(user.id) == {}
@@ -0,0 +1,78 @@
+import pytest
+from django.core.cache import caches
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.models import User
+from goals.models import Board, BoardParticipant, Category, Goal, Comment
+
+ROWS = [1, 10, 1000]
+
+
+@pytest.fixture
+def seed():
+    """Доска пользователя, в которой по rows досок/участников/категорий/целей/комментариев"""
+
+    def _seed(rows: int) -> dict:
+        now = timezone.now()
+        dates = {'created': now, 'updated': now}
+        user = User.objects.create(username="test_user")
+        boards = Board.objects.bulk_create(Board(title=f"Board {i}", **dates) for i in range(rows))
+        board = boards[0]
+        BoardParticipant.objects.bulk_create(BoardParticipant(user=user, board=b, **dates) for b in boards)
+        users = User.objects.bulk_create(User(username=f"user_{i}") for i in range(rows))
+        BoardParticipant.objects.bulk_create(
+            BoardParticipant(user=u, board=board, role=BoardParticipant.Role.reader, **dates) for u in users
+        )
+        categories = Category.objects.bulk_create(
+            Category(board=board, user=u, title=f"Category {i}", **dates) for i, u in enumerate(users)
+        )
+        goals = Goal.objects.bulk_create(
+            Goal(category=categories[0], board=board, user=u, title=f"Goal {i}", **dates)
+            for i, u in enumerate(users)
+        )
+        Goal.objects.update(search_vector="goal")
+        comments = Comment.objects.bulk_create(
+            Comment(goal=goals[0], board=board, user=u, text=f"Comment {i}", **dates) for i, u in enumerate(users)
+        )
+        caches['board_roles'].clear()
+
+        client = APIClient()
+        client.force_authenticate(user)
+        return {'client': client, 'board': board, 'category': categories[0], 'goal': goals[0],
+                'comment': comments[0]}
+
+    return _seed
+
+
+# (имя url, объект из сида для pk, query params, запросов) - число запросов не зависит от количества строк;
+# списки и доска дополнительно читают версии досок для ETag
+ENDPOINTS = [
+    ('board-list', None, {}, 3),
+    ('board-details', 'board', {}, 4),
+    ('board-autocomplete', None, {'q': 'Board'}, 2),
+    ('categories-list', None, {}, 3),
+    ('category-details', 'category', {}, 2),
+    ('category-autocomplete', None, {'q': 'Category'}, 2),
+    ('goal-list', None, {}, 3),
+    ('goal-list', None, {'limit': 10}, 4),
+    ('goal-details', 'goal', {}, 2),
+    ('goal-search', None, {'q': 'goal'}, 2),
+    ('comment-list', None, {}, 2),
+    ('comment-details', 'comment', {}, 2),
+    ('core:profile', None, {}, 0),
+]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('rows', ROWS)
+@pytest.mark.parametrize('url_name, pk_from, params, queries', ENDPOINTS)
+def test_query_budget(seed, django_assert_num_queries, rows, url_name, pk_from, params, queries):
+    data = seed(rows)
+    kwargs = {'pk': data[pk_from].id} if pk_from else None
+
+    with django_assert_num_queries(queries):
+        response = data['client'].get(reverse(url_name, kwargs=kwargs), params)
+
+    assert response.status_code == 200
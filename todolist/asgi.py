@@ -5,6 +5,9 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+
+Board change streams (goals/board/<pk>/events, Server-Sent Events) are served
+only by this application, see goals.events.
 """
 
 import os
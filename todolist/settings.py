@@ -27,6 +27,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'django_filters',
     'social_django',
@@ -133,6 +134,57 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend']
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # локальный кэш процесса для ролей на досках, короткий TTL ограничивает устаревание между процессами
+    'board_roles': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'board-roles',
+        'TIMEOUT': int(os.environ.get('BOARD_ROLES_L1_TIMEOUT', 5)),
+    },
+}
+
+# общий кэш для нескольких процессов (например, redis), подключается через переменные окружения
+if os.environ.get('SHARED_CACHE_LOCATION'):
+    CACHES['shared'] = {
+        'BACKEND': os.environ.get('SHARED_CACHE_BACKEND', 'django.core.cache.backends.redis.RedisCache'),
+        'LOCATION': os.environ.get('SHARED_CACHE_LOCATION'),
+        'TIMEOUT': int(os.environ.get('SHARED_CACHE_TIMEOUT', 300)),
+    }
+
+BOARD_ROLES_L1_CACHE = 'board_roles'
+BOARD_ROLES_L2_CACHE = 'shared' if 'shared' in CACHES else None
+
+# кэш ответов списков досок и категорий (goals.response_cache): алиас кэша, время жизни
+# и сколько секунд остальные запросы ждут, пока холодный ключ считает первый
+RESPONSE_CACHE = os.environ.get('RESPONSE_CACHE', 'shared' if 'shared' in CACHES else 'default')
+RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 60))
+RESPONSE_CACHE_LOCK_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_LOCK_TIMEOUT', 5))
+
+# конфигурация полнотекстового поиска Postgres для целей и комментариев
+SEARCH_CONFIG = os.environ.get('SEARCH_CONFIG', 'russian')
+
+# максимальное число операций в одном запросе goals/goal/batch
+GOALS_BATCH_MAX_SIZE = int(os.environ.get('GOALS_BATCH_MAX_SIZE', 500))
+
+# синхронизация goals/sync: строк каждой модели в ответе и на сколько секунд курсор отстает от текущего
+# времени, чтобы не пропустить транзакции, закоммиченные позже проставленного ими updated
+SYNC_MAX_CHANGES = int(os.environ.get('SYNC_MAX_CHANGES', 500))
+SYNC_CURSOR_LAG = int(os.environ.get('SYNC_CURSOR_LAG', 5))
+
+# события досок (goals.events): канал LISTEN/NOTIFY, сколько событий ждет медленного подписчика,
+# интервал keepalive потока SSE и через сколько секунд поток закрывается, чтобы клиент переподключился
+BOARD_EVENTS_CHANNEL = os.environ.get('BOARD_EVENTS_CHANNEL', 'board_events')
+BOARD_EVENTS_QUEUE_SIZE = int(os.environ.get('BOARD_EVENTS_QUEUE_SIZE', 100))
+BOARD_EVENTS_KEEPALIVE = int(os.environ.get('BOARD_EVENTS_KEEPALIVE', 15))
+BOARD_EVENTS_MAX_AGE = int(os.environ.get('BOARD_EVENTS_MAX_AGE', 300))
+
+# выгрузка доски (goals.export): строк за одно чтение серверного курсора и размер буфера ответа в символах
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 2000))
+EXPORT_BUFFER_SIZE = int(os.environ.get('EXPORT_BUFFER_SIZE', 64 * 1024))
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -163,6 +215,55 @@ LOGGING = {
 }
 
 BOT_TOKEN = os.environ.get('BOT_TOKEN')
+TG_API_URL = os.environ.get('TG_API_URL', 'https://api.telegram.org')
+# сколько чатов runbot обрабатывает одновременно
+BOT_CONCURRENCY = int(os.environ.get('BOT_CONCURRENCY', 8))
+# число процессов-обработчиков бота, чаты делятся между ними по chat_id (bot.sharding)
+BOT_WORKERS = int(os.environ.get('BOT_WORKERS', 1))
+# следующая пачка getUpdates запрашивается, пока предыдущие обрабатываются, если в работе меньше
+# BOT_MAX_PENDING обновлений; контрольная точка сдвигается только за полностью обработанные пачки
+BOT_MAX_PENDING = int(os.environ.get('BOT_MAX_PENDING', 1000))
+# HTTP транспорт Bot API: таймауты в секундах, повторы с экспоненциальной задержкой, размер пула соединений
+TG_CONNECT_TIMEOUT = float(os.environ.get('TG_CONNECT_TIMEOUT', 3.05))
+TG_READ_TIMEOUT = float(os.environ.get('TG_READ_TIMEOUT', 10))
+TG_MAX_RETRIES = int(os.environ.get('TG_MAX_RETRIES', 3))
+TG_BACKOFF_BASE = float(os.environ.get('TG_BACKOFF_BASE', 0.5))
+TG_BACKOFF_MAX = float(os.environ.get('TG_BACKOFF_MAX', 30))
+TG_POOL_SIZE = int(os.environ.get('TG_POOL_SIZE', BOT_CONCURRENCY + 2))
+# раз в сколько секунд runbot пишет в лог счетчики запросов к Bot API и очереди отправки, 0 - не писать
+BOT_METRICS_INTERVAL = float(os.environ.get('BOT_METRICS_INTERVAL', 60))
+# лимиты отправки Bot API (bot.tg.scheduler): сообщений в секунду всего и на чат, максимальная длина сообщения
+TG_GLOBAL_RATE = float(os.environ.get('TG_GLOBAL_RATE', 30))
+TG_CHAT_RATE = float(os.environ.get('TG_CHAT_RATE', 1))
+TG_CHAT_BURST = float(os.environ.get('TG_CHAT_BURST', 3))
+TG_MESSAGE_MAX_LENGTH = int(os.environ.get('TG_MESSAGE_MAX_LENGTH', 4096))
+# состояние диалогов бота (bot.state): memory - в процессе бота, cache - в кэше Django BOT_STATE_CACHE;
+# время жизни в секундах и интервал записи в TgUser (0 - не писать в БД)
+BOT_STATE_BACKEND = os.environ.get('BOT_STATE_BACKEND', 'memory')
+BOT_STATE_CACHE = os.environ.get('BOT_STATE_CACHE', 'shared' if 'shared' in CACHES else 'default')
+BOT_STATE_TTL = int(os.environ.get('BOT_STATE_TTL', 3600))
+BOT_STATE_MAX_SIZE = int(os.environ.get('BOT_STATE_MAX_SIZE', 100000))
+BOT_STATE_WRITE_BACK_INTERVAL = float(os.environ.get('BOT_STATE_WRITE_BACK_INTERVAL', 0))
+# как часто runbot сохраняет последнее обработанное обновление, в секундах
+BOT_CHECKPOINT_INTERVAL = float(os.environ.get('BOT_CHECKPOINT_INTERVAL', 5))
+# сколько целей за раз читается из курсора при постраничном выводе /goals
+BOT_GOALS_CHUNK_SIZE = int(os.environ.get('BOT_GOALS_CHUNK_SIZE', 100))
+# получение обновлений: polling - runbot опрашивает getUpdates, webhook - Telegram присылает их в bot/webhook,
+# веб-приложение сохраняет их в БД, а runbot разбирает пачками по BOT_WEBHOOK_BATCH_SIZE (bot.webhook)
+# и при пустой очереди ждет BOT_WEBHOOK_POLL_INTERVAL секунд
+BOT_MODE = os.environ.get('BOT_MODE', 'polling')
+BOT_WEBHOOK_URL = os.environ.get('BOT_WEBHOOK_URL')
+BOT_WEBHOOK_SECRET = os.environ.get('BOT_WEBHOOK_SECRET')
+BOT_WEBHOOK_BATCH_SIZE = int(os.environ.get('BOT_WEBHOOK_BATCH_SIZE', 100))
+BOT_WEBHOOK_POLL_INTERVAL = float(os.environ.get('BOT_WEBHOOK_POLL_INTERVAL', 0.2))
+# очередь исходящих сообщений (bot.outbox): размер пачки, повторы, пауза при пустой очереди в секундах
+OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', 100))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', 10))
+OUTBOX_BACKOFF_BASE = float(os.environ.get('OUTBOX_BACKOFF_BASE', 1))
+OUTBOX_BACKOFF_MAX = float(os.environ.get('OUTBOX_BACKOFF_MAX', 600))
+OUTBOX_POLL_INTERVAL = float(os.environ.get('OUTBOX_POLL_INTERVAL', 1))
+# на сколько секунд диспетчер захватывает пачку; не отправленная за это время пачка достается другому
+OUTBOX_LEASE = float(os.environ.get('OUTBOX_LEASE', 300))
 SOCIAL_AUTH_JSONFIELD_ENABLED = True
 SOCIAL_AUTH_JSONFIELD_CUSTOM = 'django.db.models.JSONField'
 AUTHENTICATION_BACKENDS = (